@@ -10,6 +10,15 @@ WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
 WHATSAPP_BUSINESS_ACCOUNT_ID = os.getenv("WHATSAPP_BUSINESS_ACCOUNT_ID")
 WHATSAPP_APP_SECRET = os.getenv("WHATSAPP_APP_SECRET")
 WEBHOOK_VERIFY_TOKEN = os.getenv("WEBHOOK_VERIFY_TOKEN", "verify_token")
+WEBHOOK_ASYNC_INGEST = os.getenv("WEBHOOK_ASYNC_INGEST", "false").lower() == "true"
+WEBHOOK_WORKER_CONCURRENCY = int(os.getenv("WEBHOOK_WORKER_CONCURRENCY", "8"))
+WEBHOOK_SHARD_QUEUE_SIZE = int(os.getenv("WEBHOOK_SHARD_QUEUE_SIZE", "100"))
+WEBHOOK_QUEUE_POLL_INTERVAL = float(os.getenv("WEBHOOK_QUEUE_POLL_INTERVAL", "1.0"))
+WEBHOOK_QUEUE_VISIBILITY_TIMEOUT = float(os.getenv("WEBHOOK_QUEUE_VISIBILITY_TIMEOUT", "60"))
+# Deliveries of a queued payload whose events failed before it stays failed
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+# NDJSON capture of verified webhook payloads for scripts/webhook_replay.py
+WEBHOOK_RECORD_PATH = os.getenv("WEBHOOK_RECORD_PATH", "")
 
 
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
@@ -23,8 +32,61 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
 
 MAX_MESSAGES_PER_SECOND = int(os.getenv("MAX_MESSAGES_PER_SECOND", "80"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", str(MAX_MESSAGES_PER_SECOND)))
+BULK_MIN_SHARE = float(os.getenv("BULK_MIN_SHARE", "0.2"))
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "50"))
+BULK_FLUSH_INTERVAL = float(os.getenv("BULK_FLUSH_INTERVAL", "2.0"))
+CONTACT_IMPORT_BATCH_SIZE = int(os.getenv("CONTACT_IMPORT_BATCH_SIZE", "1000"))
+CAMPAIGN_HEARTBEAT_INTERVAL = float(os.getenv("CAMPAIGN_HEARTBEAT_INTERVAL", "10"))
+CAMPAIGN_LEASE_TIMEOUT = float(os.getenv("CAMPAIGN_LEASE_TIMEOUT", "60"))
 MESSAGE_DELAY = float(os.getenv("MESSAGE_DELAY", "1.0"))
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "50"))
+AIMD_MIN_RATE = float(os.getenv("AIMD_MIN_RATE", "1"))
+AIMD_MAX_RATE = float(os.getenv("AIMD_MAX_RATE", str(MAX_MESSAGES_PER_SECOND)))
+AIMD_START_RATE = float(os.getenv("AIMD_START_RATE", "10"))
+AIMD_INCREASE = float(os.getenv("AIMD_INCREASE", "2"))
+AIMD_DECREASE_FACTOR = float(os.getenv("AIMD_DECREASE_FACTOR", "0.5"))
+AIMD_WINDOW = float(os.getenv("AIMD_WINDOW", "1.0"))
+AIMD_LATENCY_SPIKE_FACTOR = float(os.getenv("AIMD_LATENCY_SPIKE_FACTOR", "2.5"))
+AIMD_MAX_ERROR_RATE = float(os.getenv("AIMD_MAX_ERROR_RATE", "0.05"))
+DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_COUNTRY_CODE", "91")
+
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30.0"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5.0"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30.0"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10.0"))
+
+
+GRAPH_API_MAX_ATTEMPTS = int(os.getenv("GRAPH_API_MAX_ATTEMPTS", "3"))
+GRAPH_API_DEFAULT_RETRY_AFTER = float(os.getenv("GRAPH_API_DEFAULT_RETRY_AFTER", "60"))
+# Longest an agent's send waits out throttling/open circuit before failing fast
+INTERACTIVE_MAX_WAIT = float(os.getenv("INTERACTIVE_MAX_WAIT", "10"))
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", "30"))
+READ_RECEIPT_CONCURRENCY = int(os.getenv("READ_RECEIPT_CONCURRENCY", "4"))
+STATUS_BATCH_SIZE = int(os.getenv("STATUS_BATCH_SIZE", "500"))
+STATUS_FLUSH_INTERVAL = float(os.getenv("STATUS_FLUSH_INTERVAL", "0.2"))
+# Statuses can beat their message into the database (e.g. still buffered by the
+# bulk result writer); they are retried on each flush for this long
+STATUS_UNMATCHED_RETRY_SECONDS = float(os.getenv("STATUS_UNMATCHED_RETRY_SECONDS", "10"))
+WEBHOOK_DEDUP_CACHE_SIZE = int(os.getenv("WEBHOOK_DEDUP_CACHE_SIZE", "50000"))
+
+
+SUPPRESSION_REFRESH_INTERVAL = float(os.getenv("SUPPRESSION_REFRESH_INTERVAL", "300"))
+# 131026 undeliverable / not on WhatsApp, 131021 recipient is the sender,
+# 131050 user stopped marketing messages
+HARD_FAILURE_ERROR_CODES = {
+    int(code) for code in os.getenv("HARD_FAILURE_ERROR_CODES", "131026,131021,131050").split(",") if code.strip()
+}
+OPT_OUT_KEYWORDS = {
+    word.strip().lower() for word in os.getenv("OPT_OUT_KEYWORDS", "stop,unsubscribe,stop all,opt out").split(",")
+}
+OPT_IN_KEYWORDS = {
+    word.strip().lower() for word in os.getenv("OPT_IN_KEYWORDS", "start,subscribe").split(",")
+}
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import PyMongoError
+from app.utils.logger import logger
+
+
+# Every index the app relies on, applied in the background at startup.
+# create_indexes is a no-op for indexes that already exist, so this is safe to
+# run on every boot. Building a new index on a large collection can take a
+# while; the app serves requests meanwhile, only the queries it serves are
+# slower until it is ready. To avoid that on big deployments, build them
+# ahead of the release with POST /api/admin/indexes/ensure (or createIndexes
+# from the shell using the same specs).
+INDEXES: Dict[str, List[IndexModel]] = {
+    "messages": [
+        # Status updates and webhook dedup; unique is the redelivery backstop
+        IndexModel([("message_id", ASCENDING)], unique=True,
+                   partialFilterExpression={"message_id": {"$type": "string"}}),
+        # Chat timelines: {user_id} sorted by timestamp, optional date range;
+        # _id is the keyset pagination tiebreak so pages never sort in memory
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        # Campaign results and the already-sent check on resume
+        IndexModel([("campaign_id", ASCENDING), ("timestamp", ASCENDING)],
+                   partialFilterExpression={"campaign_id": {"$exists": True}}),
+        # Message search. Chats mix English, Hindi and Hinglish, so no
+        # language-specific stemming or stop words - just tokens, case and
+        # diacritics folded
+        IndexModel([("body", TEXT)], name="body_text", default_language="none"),
+    ],
+    "conversations": [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+        IndexModel([("is_archived", ASCENDING), ("last_message_timestamp", DESCENDING), ("_id", DESCENDING)]),
+        # Type-ahead user search (utils.contact_search): anchored prefix scans
+        IndexModel([("search_keys", ASCENDING)]),
+        # Lets the planner walk recent conversations instead when a short
+        # search prefix matches too many keys
+        IndexModel([("last_message_timestamp", DESCENDING)]),
+    ],
+    "campaigns": [
+        IndexModel([("created_at", DESCENDING)]),
+        # Stale-campaign claims
+        IndexModel([("status", ASCENDING), ("heartbeat_at", ASCENDING)]),
+    ],
+    "campaign_contacts": [
+        IndexModel([("campaign_id", ASCENDING), ("seq", ASCENDING)], unique=True),
+        # Backstop for the import dedup: a number is stored once per campaign
+        IndexModel([("campaign_id", ASCENDING), ("phone", ASCENDING)], unique=True),
+    ],
+    "suppressions": [
+        IndexModel([("phone", ASCENDING)], unique=True),
+    ],
+    "queues": [
+        # MongoDBQueue.pop and the stale-lock sweep
+        IndexModel([("queue", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+}
+
+
+# Representative shapes of the hot queries, checked with explain() by the
+# admin index report: (name, collection, filter, sort)
+HOT_QUERIES: List[Tuple[str, str, Dict, Optional[List[Tuple[str, int]]]]] = [
+    ("message timeline", "messages", {"user_id": "0"}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("message status update", "messages", {"message_id": "0"}, None),
+    ("message search", "messages", {"$text": {"$search": "hello"}, "user_id": "0"}, None),
+    ("campaign results", "messages", {"campaign_id": "0"}, [("timestamp", ASCENDING)]),
+    ("conversation list", "conversations", {"is_archived": False},
+     [("last_message_timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("conversation upsert", "conversations", {"user_id": "0"}, None),
+    ("user search", "conversations", {"search_keys": {"$regex": "^p:9876"}}, [("last_message_timestamp", DESCENDING)]),
+    ("campaign contacts", "campaign_contacts", {"campaign_id": "0"}, [("seq", ASCENDING)]),
+    ("suppression lookup", "suppressions", {"phone": "0"}, None),
+    ("queue pop", "queues", {"queue": "webhook", "status": "pending"}, [("created_at", ASCENDING)]),
+]
+
+
+# Progress and outcome of the last ensure_indexes run, reported by /health
+_status = {"building": False, "ensured": [], "failed": []}
+
+
+def index_names(collection: str) -> List[str]:
+    """Names of the registered indexes for a collection"""
+    return [model.document["name"] for model in INDEXES.get(collection, [])]
+
+
+async def ensure_indexes(database) -> Dict[str, List[str]]:
+    """
+    Create all registered indexes. Each index is created on its own so one
+    failure (e.g. duplicates blocking a unique index) doesn't stop the rest.
+    Returns {"ensured": [...], "failed": [...]} as "collection.index" names.
+    """
+    result = {"ensured": [], "failed": []}
+    _status["building"] = True
+
+    try:
+        for collection, models in INDEXES.items():
+            for model in models:
+                name = f"{collection}.{model.document['name']}"
+                try:
+                    await database[collection].create_indexes([model])
+                    result["ensured"].append(name)
+                except PyMongoError as e:
+                    logger.error(f"❌ Could not create index {name}: {e}")
+                    if getattr(e, "code", None) == 11000:
+                        logger.error(
+                            f"❌ Duplicate keys block unique index {name}; "
+                            f"clean them up with POST /api/admin/messages/dedup and re-run POST /api/admin/indexes/ensure"
+                        )
+                    result["failed"].append(name)
+    finally:
+        _status.update(result, building=False)
+
+    logger.info(f"📇 Indexes ensured: {len(result['ensured'])} ok, {len(result['failed'])} failed")
+    return result
+
+
+def get_index_status() -> Dict:
+    """Whether a build is running, and registered indexes the last run could not create"""
+    return {"building": _status["building"], "ensured": len(_status["ensured"]), "failed": list(_status["failed"])}
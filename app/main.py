@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -5,8 +6,21 @@ from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
 from app.config import *
 from app.database.mongodb import db
+from app.database.indexes import ensure_indexes, get_index_status
+from app.services.backoff import get_backoff_controller
+from app.services.campaigns import campaign_service
+from app.services.http_client import close_http_client
+from app.services.outbound_scheduler import get_outbound_scheduler
+from app.services.read_receipts import read_receipt_dispatcher
+from app.services.inbox import InboxService
+from app.services.message_dedup import recent_message_ids
+from app.services.status_batcher import status_batcher
+from app.services.suppression import suppression_list
+from app.services.webhook_ingest import webhook_ingest
 from app.utils.logger import logger
-from app.routes import webhook, messages, conversations, bulk_send, notification
+from app.utils.webhook_parser import extract_events
+from app.utils.webhook_recorder import webhook_recorder
+from app.routes import webhook, messages, conversations, bulk_send, notification, admin
 from datetime import datetime
 
 
@@ -16,11 +30,27 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 WhatsApp Business API starting up...")
     
+    index_build = search_backfill = None
     try:
         # Connect to MongoDB (async)
         await db.connect_async()
         logger.info("✅ Database connected successfully")
         
+        # Index builds can take minutes on large collections; don't hold up startup
+        index_build = asyncio.create_task(ensure_indexes(db.async_db))
+        # Conversations from before search keys existed; runs in the background
+        search_backfill = asyncio.create_task(InboxService().backfill_search_keys())
+        await suppression_list.load()
+        await read_receipt_dispatcher.start()
+        await campaign_service.start()
+        
+        if WEBHOOK_ASYNC_INGEST:
+            inbox_service = InboxService()
+            await webhook_ingest.start(
+                lambda kind, event: webhook.process_webhook_event(kind, event, inbox_service, raise_errors=True),
+                extract_events
+            )
+        
         yield
         
     except Exception as e:
@@ -30,6 +60,15 @@ async def lifespan(app: FastAPI):
     finally:
         # Shutdown
         logger.info("👋 WhatsApp Business API shutting down...")
+        for task in (index_build, search_backfill):
+            if task is not None:
+                task.cancel()
+        await webhook_ingest.stop()
+        await status_batcher.stop()
+        await campaign_service.shutdown()
+        await read_receipt_dispatcher.stop()
+        await close_http_client()
+        await webhook_recorder.close()
         await db.close_async()
 
 
@@ -98,6 +137,7 @@ app.include_router(messages.router)
 app.include_router(conversations.router)
 app.include_router(bulk_send.router)
 app.include_router(notification.router)
+app.include_router(admin.router)
 
 @app.get("/")
 async def root():
@@ -120,6 +160,14 @@ async def health_check():
                 "status": "healthy",
                 "database": "connected",
                 "database_name": db.DB_NAME,
+                "graph_api": get_backoff_controller(WHATSAPP_PHONE_NUMBER_ID).get_status(),
+                "outbound": get_outbound_scheduler(WHATSAPP_PHONE_NUMBER_ID).get_stats(),
+                "read_receipts": read_receipt_dispatcher.get_stats(),
+                "suppressions": suppression_list.get_stats(),
+                "webhook_ingest": webhook_ingest.get_stats(),
+                "status_updates": status_batcher.get_stats(),
+                "webhook_dedup": recent_message_ids.get_stats(),
+                "indexes": get_index_status(),
                 "timestamp": datetime.utcnow().isoformat()
             }
         else:
@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from pydantic import BaseModel, Field, ConfigDict
+from enum import Enum
+
+
+class CampaignStatus(str, Enum):
+    IMPORTING = "importing"
+    QUEUED = "queued"
+    RUNNING = "running"
+    CANCELLING = "cancelling"
+    CANCELLED = "cancelled"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class Campaign(BaseModel):
+    """Bulk send campaign model for MongoDB"""
+
+    # Fields
+    id: Optional[str] = Field(None, alias="_id")
+    status: CampaignStatus = CampaignStatus.IMPORTING
+    message_template: str
+    delay: float = 1.0
+    concurrency: Optional[int] = None
+    adaptive: bool = False
+    current_rate: Optional[float] = None
+    total: int = Field(default=0, ge=0)
+    processed: int = Field(default=0, ge=0)
+    successful: int = Field(default=0, ge=0)
+    failed: int = Field(default=0, ge=0)
+    invalid: int = Field(default=0, ge=0)
+    invalid_contacts: list[dict] = Field(default_factory=list)
+    skipped_suppressed: int = Field(default=0, ge=0)
+    skipped_duplicate: int = Field(default=0, ge=0)
+    checkpoint_seq: int = Field(default=0, ge=0)
+    worker_id: Optional[str] = None
+    heartbeat_at: Optional[datetime] = None
+    resume_count: int = Field(default=0, ge=0)
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    # Configuration
+    model_config = ConfigDict(
+        use_enum_values=True,
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_encoders={ObjectId: str}
+    )
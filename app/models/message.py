@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from bson import ObjectId
 from pydantic import BaseModel, Field, ConfigDict
 from enum import Enum
@@ -14,6 +14,25 @@ class MessageStatus(str, Enum):
     PENDING = "pending"
 
 
+# Outbound delivery progression. Failed is terminal and can only follow pending/sent.
+STATUS_PROGRESSION = [MessageStatus.PENDING.value, MessageStatus.SENT.value,
+                      MessageStatus.DELIVERED.value, MessageStatus.READ.value]
+
+
+def previous_statuses(status: str) -> List[Optional[str]]:
+    """Statuses a message may be in for `status` to be a forward transition"""
+    if status == MessageStatus.FAILED.value:
+        return [None, MessageStatus.PENDING.value, MessageStatus.SENT.value]
+    if status not in STATUS_PROGRESSION:
+        return []
+    return [None] + STATUS_PROGRESSION[:STATUS_PROGRESSION.index(status)]
+
+
+def is_status_advance(current: Optional[str], new: str) -> bool:
+    """True when moving from current to new is a forward transition"""
+    return current in previous_statuses(new)
+
+
 class MessageDirection(str, Enum):
     INBOUND = "inbound"
     OUTBOUND = "outbound"
@@ -49,8 +68,13 @@ class Message(BaseModel):
     template_name: Optional[str] = None
     template_params: Optional[dict] = None
     error_reason: Optional[str] = None
+    sent_at: Optional[datetime] = None
+    delivered_at: Optional[datetime] = None
+    read_at: Optional[datetime] = None
+    failed_at: Optional[datetime] = None
     retry_count: int = Field(default=0, ge=0)
     campaign_id: Optional[str] = None
+    campaign_seq: Optional[int] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
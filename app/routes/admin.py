@@ -0,0 +1,138 @@
+from fastapi import APIRouter, HTTPException
+from typing import Dict, List
+from app.database.indexes import HOT_QUERIES, INDEXES, ensure_indexes, index_names
+from app.database.mongodb import db
+from app.services.inbox import InboxService
+from app.utils.logger import logger
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+def _get_db():
+    """Get database instance"""
+    if db.async_db is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    return db.async_db
+
+
+def _plan_stages(plan: Dict) -> List[str]:
+    """Flatten an explain() winning plan into its stage names, root first"""
+    # Slot-based engine (MongoDB 7+) nests the classic plan under queryPlan
+    plan = plan.get("queryPlan", plan)
+    stages = [plan.get("stage", "?")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+@router.get("/indexes")
+async def get_index_usage():
+    """
+    Index usage per collection from $indexStats (counters reset on restart).
+    Flags registered indexes that are missing and existing ones never used.
+    """
+    try:
+        database = _get_db()
+        report = {}
+
+        for collection in INDEXES:
+            stats = await database[collection].aggregate([{"$indexStats": {}}]).to_list(None)
+            registered = index_names(collection)
+            existing = {stat["name"] for stat in stats}
+
+            indexes = sorted(
+                (
+                    {
+                        "name": stat["name"],
+                        "key": dict(stat.get("key", {})),
+                        "ops": stat.get("accesses", {}).get("ops", 0),
+                        "since": stat.get("accesses", {}).get("since"),
+                        "registered": stat["name"] in registered
+                    }
+                    for stat in stats
+                ),
+                key=lambda index: index["ops"],
+                reverse=True
+            )
+
+            report[collection] = {
+                "indexes": indexes,
+                "missing": [name for name in registered if name not in existing],
+                "unused": [index["name"] for index in indexes if index["ops"] == 0 and index["name"] != "_id_"]
+            }
+
+        return {"collections": report}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error reading index stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/indexes/explain")
+async def explain_hot_queries():
+    """Run explain() on the hot query shapes and flag any that scan the whole collection"""
+    try:
+        database = _get_db()
+        queries = []
+
+        for name, collection, query, sort in HOT_QUERIES:
+            cursor = database[collection].find(query).limit(1)
+            if sort:
+                cursor = cursor.sort(sort)
+            explain = await cursor.explain()
+
+            stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+            queries.append({
+                "name": name,
+                "collection": collection,
+                "filter": query,
+                "stages": stages,
+                "collection_scan": "COLLSCAN" in stages,
+                "in_memory_sort": "SORT" in stages
+            })
+
+        scans = [query["name"] for query in queries if query["collection_scan"]]
+        if scans:
+            logger.warning(f"⚠️ Collection scans in hot queries: {', '.join(scans)}")
+
+        return {"queries": queries, "collection_scans": scans}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error explaining queries: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/indexes/ensure")
+async def ensure_registered_indexes():
+    """Re-apply the index registry (same as at startup)"""
+    try:
+        return await ensure_indexes(_get_db())
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error ensuring indexes: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/messages/dedup")
+async def dedup_messages(dry_run: bool = True):
+    """
+    Remove duplicate message_id documents that block the unique messages index,
+    then re-apply the index registry. Defaults to a dry run that only counts them.
+    """
+    try:
+        result = await InboxService().dedup_message_ids(dry_run=dry_run)
+        if not dry_run:
+            result["indexes"] = await ensure_indexes(_get_db())
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error removing duplicate messages: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, UploadFile, File, Form
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field, validator
+from app.config import BULK_MAX_CONCURRENCY, MAX_UPLOAD_SIZE
 from app.services.bulk_sender import BulkMessageSender
+from app.services.campaigns import campaign_service
+from app.services.suppression import SuppressionReason, suppression_list
 from app.services.whatsapp import WhatsAppService
+from app.utils.contact_import import iter_contact_batches
+from app.utils.message_template import compile_template, contact_values, missing_fields_message, normalize_field_name
+from app.utils.phone import normalize_phone, phone_error_message
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/api/bulk", tags=["bulk"])
@@ -16,27 +22,42 @@ class Contact(BaseModel):
     """Contact model for bulk sending"""
     phone: str = Field(..., description="Phone number with country code (e.g., 919876543210)")
     name: str = Field(..., description="Contact name for personalization")
+    fields: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Extra values for template placeholders, e.g. {\"city\": \"Delhi\"}"
+    )
     
     @validator('phone')
     def validate_phone(cls, v):
-        # Remove spaces and special characters
-        cleaned = ''.join(filter(str.isdigit, v))
-        if len(cleaned) < 10:
-            raise ValueError('Phone number must have at least 10 digits')
-        return cleaned
+        # Normalize to E.164 digits (same rules as list validation)
+        normalized, error = normalize_phone(v)
+        if error:
+            raise ValueError(phone_error_message(error, v))
+        return normalized
     
     @validator('name')
     def validate_name(cls, v):
         if not v or not v.strip():
             raise ValueError('Name cannot be empty')
         return v.strip()
+    
+    @validator('fields')
+    def validate_fields(cls, v):
+        return {normalize_field_name(key): value for key, value in v.items()}
+
+
+class ContactInput(BaseModel):
+    """Unvalidated contact row; problems are reported per row instead of 422"""
+    phone: str = ""
+    name: str = ""
+    fields: Dict[str, str] = Field(default_factory=dict)
 
 
 class BulkSendRequest(BaseModel):
     """Request model for bulk message sending"""
     message_template: str = Field(
         ..., 
-        description="Message template. Use {name} for personalization (optional). Example: 'Hello {name}, welcome!' or 'Hello, check our offers!'",
+        description="Message template. Use {name} or any contact field for personalization (optional), with {field|default} for fallbacks. Example: 'Hello {name}, welcome to {city|our store}!' or 'Hello, check our offers!'",
         min_length=1,
         max_length=4096
     )
@@ -52,22 +73,37 @@ class BulkSendRequest(BaseModel):
         ge=0.5,
         le=5.0
     )
+    concurrency: Optional[int] = Field(
+        default=None,
+        description="Max concurrent sends. When set, sends are paced by the shared rate limiter and delay is ignored",
+        ge=1,
+        le=BULK_MAX_CONCURRENCY
+    )
+    adaptive: bool = Field(
+        default=False,
+        description="Adaptive pacing: start slow and raise the send rate while the API stays healthy, backing off on 429s, 5xx or latency spikes. Delay is ignored"
+    )
 
 
 class BulkSendResponse(BaseModel):
-    """Response model for bulk send"""
+    """Response model for bulk send (campaign runs in the background)"""
+    campaign_id: str
+    status: str
     total: int
-    successful: int
-    failed: int
-    success_rate: float
-    successful_contacts: List[dict]
-    failed_contacts: List[dict]
+    invalid: int
+    invalid_contacts: List[dict]
+    skipped_suppressed: int = 0
+    skipped_duplicate: int = 0
 
 
-@router.post("/send", response_model=BulkSendResponse)
+@router.post("/send", response_model=BulkSendResponse, status_code=202)
 async def send_bulk_messages(request: BulkSendRequest):
     """
-    Send bulk WhatsApp messages with personalization
+    Start a bulk WhatsApp campaign with personalization
+    
+    Returns immediately with a campaign id. Track progress with
+    `GET /api/bulk/campaigns/{campaign_id}` and per-contact results with
+    `GET /api/bulk/campaigns/{campaign_id}/results`.
     
     **Request Body:**
     ```json
@@ -81,6 +117,25 @@ async def send_bulk_messages(request: BulkSendRequest):
     }
     ```
     
+    **Concurrent sending (paced by the API rate limit instead of a fixed delay):**
+    ```json
+    {
+      "message_template": "Hello {name}, we have a special offer for you!",
+      "contacts": [...],
+      "concurrency": 20
+    }
+    ```
+    
+    **Adaptive pacing (rate settles near the API limit on its own; the
+    current rate is reported as `current_rate` in campaign progress):**
+    ```json
+    {
+      "message_template": "Hello {name}, we have a special offer for you!",
+      "contacts": [...],
+      "adaptive": true
+    }
+    ```
+    
     **OR without {name} placeholder (same message for everyone):**
     ```json
     {
@@ -96,63 +151,208 @@ async def send_bulk_messages(request: BulkSendRequest):
     **Response:**
     ```json
     {
+      "campaign_id": "6760f0c2a1b2c3d4e5f60718",
+      "status": "queued",
       "total": 2,
-      "successful": 2,
-      "failed": 0,
-      "success_rate": 100.0,
-      "successful_contacts": [
-        {"phone": "919876543210", "name": "Rahul Kumar"},
-        {"phone": "919123456789", "name": "Priya Sharma"}
-      ],
-      "failed_contacts": []
+      "invalid": 0,
+      "invalid_contacts": [],
+      "skipped_suppressed": 0,
+      "skipped_duplicate": 0
     }
     ```
     
+    Numbers on the suppression list (opt-outs, permanent failures) and
+    repeats of a number already in the list are skipped and counted.
+    
     **Message Personalization:**
     - With {name}: Template "Hello {name}, welcome!" → Sent to Rahul: "Hello Rahul Kumar, welcome!"
     - Without {name}: Template "Hello, welcome!" → Everyone gets: "Hello, welcome!"
+    - Contact fields: "Hi {name}, visit our {city|nearest} branch" with
+      `"fields": {"city": "Pune"}` → "Hi Rahul Kumar, visit our Pune branch"
+    - A placeholder without a default (`{city}`) is required: contacts that
+      have the field but leave it blank are rejected as invalid (code
+      `missing_field`). Placeholders that aren't contact fields, like
+      `{SAVE10}`, are sent as written
+    - Use `{{` and `}}` for literal braces
     """
     
     try:
         logger.info(f"Bulk send request: {len(request.contacts)} contacts")
         
-        # Validate contacts
+        # Validate contacts (including values for template fields without a default)
         validation = bulk_sender.validate_contacts(
-            [c.dict() for c in request.contacts]
+            [c.dict() for c in request.contacts],
+            template=compile_template(request.message_template)
         )
         
         if validation['total_invalid'] > 0:
             logger.warning(f"Found {validation['total_invalid']} invalid contacts")
         
-        # If all contacts are invalid, return error
+        # If no contact is left to send to, return error
         if validation['total_valid'] == 0:
             raise HTTPException(
                 status_code=400,
                 detail={
-                    "error": "All contacts are invalid",
-                    "invalid_contacts": validation['invalid']
+                    "error": "All contacts are invalid or suppressed",
+                    "invalid_contacts": validation['invalid'],
+                    "skipped_suppressed": validation['skipped_suppressed']
                 }
             )
         
-        # Send messages
-        result = await bulk_sender.send_bulk_messages(
+        # Start the campaign in the background
+        campaign_id = await campaign_service.create_campaign(
             message_template=request.message_template,
             contacts=validation['valid'],
-            delay=request.delay
+            delay=request.delay,
+            concurrency=request.concurrency,
+            invalid_contacts=validation['invalid'],
+            skipped_suppressed=validation['skipped_suppressed'],
+            skipped_duplicate=validation['skipped_duplicate'],
+            adaptive=request.adaptive
         )
         
-        return result
+        return {
+            "campaign_id": campaign_id,
+            "status": "queued",
+            "total": validation['total_valid'],
+            "invalid": validation['total_invalid'],
+            "invalid_contacts": validation['invalid'],
+            "skipped_suppressed": validation['skipped_suppressed'],
+            "skipped_duplicate": validation['skipped_duplicate']
+        }
         
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"Validation error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Bulk send error: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Failed to send bulk messages")
+        raise HTTPException(status_code=500, detail="Failed to start bulk campaign")
+
+
+@router.post("/upload", response_model=BulkSendResponse, status_code=202)
+async def upload_bulk_contacts(
+    file: UploadFile = File(..., description="CSV (with header row) or NDJSON contact file"),
+    message_template: str = Form(..., min_length=1, max_length=4096),
+    delay: float = Form(1.0, ge=0.5, le=5.0),
+    concurrency: Optional[int] = Form(None, ge=1, le=BULK_MAX_CONCURRENCY),
+    adaptive: bool = Form(False, description="Adaptive AIMD pacing instead of a fixed delay"),
+    phone_column: Optional[str] = Form(None, description="Phone column name (auto-detected if omitted)"),
+    name_column: Optional[str] = Form(None, description="Name column name (auto-detected if omitted)")
+):
+    """
+    Start a campaign from an uploaded contact file (no 1000-contact limit)
+    
+    The file is parsed and validated in batches and stored as it is read, so
+    memory use stays flat regardless of the number of rows.
+    
+    **CSV:** header row required. The phone column is auto-detected from
+    `phone`, `mobile`, `phone_number`, `whatsapp_number`, `number`, `contact` (case-insensitive).
+    Other columns are kept with the contact.
+    
+    **NDJSON (.ndjson / .jsonl):** one `{"phone": "...", "name": "..."}` object per line.
+    
+    **Example:**
+    ```bash
+    curl -X POST /api/bulk/upload \\
+      -F "file=@contacts.csv" \\
+      -F "message_template=Hello {name}!" \\
+      -F "concurrency=20"
+    ```
+    """
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=f"File too large (max {MAX_UPLOAD_SIZE} bytes)")
+    
+    try:
+        result = await campaign_service.create_campaign_from_stream(
+            message_template=message_template,
+            batches=iter_contact_batches(file, phone_column, name_column),
+            delay=delay,
+            concurrency=concurrency,
+            adaptive=adaptive
+        )
+        
+        if result['total'] == 0:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": "All contacts are invalid or suppressed",
+                    "campaign_id": result['campaign_id'],
+                    "skipped_suppressed": result['skipped_suppressed'],
+                    "invalid_contacts": result['invalid_contacts']
+                }
+            )
+        
+        logger.info(f"Upload campaign {result['campaign_id']}: {result['total']} valid, "
+                    f"{result['invalid']} invalid contacts")
+        return result
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.error(f"Contact upload error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Contact upload error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to import contacts")
+    finally:
+        await file.close()
+
+
+class PreviewRequest(BaseModel):
+    """Request model for previewing personalized messages"""
+    message_template: str = Field(..., min_length=1, max_length=4096)
+    contacts: List[Contact] = Field(..., min_items=1, max_items=50)
+
+
+@router.post("/preview")
+async def preview_messages(request: PreviewRequest):
+    """
+    Render the message template for a few contacts without sending
+    
+    Placeholders without a default are listed in `required_fields`; contacts
+    that have one of them blank get `missing_fields` and would be rejected
+    by a campaign.
+    
+    **Response:**
+    ```json
+    {
+      "fields": ["city", "name"],
+      "required_fields": ["city"],
+      "unresolved": 1,
+      "previews": [
+        {"phone": "919876543210", "message": "Hi Rahul, visit our Pune branch"},
+        {"phone": "919123456789", "message": "Hi Priya, visit our  branch",
+         "missing_fields": ["city"], "error": "Missing value for template field(s): city ..."}
+      ]
+    }
+    ```
+    """
+    template = compile_template(request.message_template)
+    contacts = [c.dict() for c in request.contacts]
+    values = [contact_values(c) for c in contacts]
+    messages = template.render_batch(values)
+    
+    previews = []
+    for contact, contact_fields, message in zip(contacts, values, messages):
+        preview = {"phone": contact["phone"], "message": message}
+        missing = template.missing_fields(contact_fields)
+        if missing:
+            preview["missing_fields"] = missing
+            preview["error"] = missing_fields_message(missing)
+        previews.append(preview)
+    
+    return {
+        "fields": template.fields,
+        "required_fields": template.required_fields,
+        "unresolved": sum(1 for preview in previews if "missing_fields" in preview),
+        "previews": previews
+    }
 
 
 @router.post("/validate")
-async def validate_contacts_endpoint(contacts: List[Contact]):
+async def validate_contacts_endpoint(contacts: List[ContactInput]):
     """
     Validate contacts before sending (optional, for frontend pre-validation)
     
@@ -166,6 +366,10 @@ async def validate_contacts_endpoint(contacts: List[Contact]):
     }
     ```
     
+    Phone numbers are normalized to E.164 digits (10-digit numbers get the
+    default country code). Error codes: `missing`, `too_short`, `too_long`,
+    `invalid_length`.
+    
     **Response:**
     ```json
     {
@@ -177,11 +381,14 @@ async def validate_contacts_endpoint(contacts: List[Contact]):
           "phone": "123",
           "name": "Invalid",
           "row": 2,
+          "code": "too_short",
           "error": "Invalid phone number (too short: 3 digits)"
         }
       ],
       "total_valid": 1,
-      "total_invalid": 1
+      "total_invalid": 1,
+      "skipped_suppressed": 0,
+      "skipped_duplicate": 0
     }
     ```
     """
@@ -195,14 +402,134 @@ async def validate_contacts_endpoint(contacts: List[Contact]):
 
 
 @router.get("/campaigns")
-async def get_campaigns():
+async def get_campaigns(
+    limit: int = Query(20, ge=1, le=100),
+    skip: int = Query(0, ge=0)
+):
+    """Get list of bulk message campaigns, newest first"""
+    try:
+        campaigns = await campaign_service.list_campaigns(limit, skip)
+        return {
+            "campaigns": campaigns,
+            "limit": limit,
+            "skip": skip
+        }
+    except Exception as e:
+        logger.error(f"Error fetching campaigns: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str):
     """
-    Get list of bulk message campaigns
+    Get campaign status and progress
     
-    Note: Campaign tracking has been simplified in the new approach.
-    This endpoint is available for future implementation if needed.
+    **Response:**
+    ```json
+    {
+      "campaign_id": "6760f0c2a1b2c3d4e5f60718",
+      "status": "running",
+      "total": 1000,
+      "processed": 350,
+      "successful": 348,
+      "failed": 2,
+      "success_rate": 34.8,
+      "current_rate": 42.0
+    }
+    ```
     """
-    return {
-        "message": "Campaign history endpoint - available for future implementation",
-        "note": "New simplified approach focuses on direct message sending without campaign tracking"
-    }
\ No newline at end of file
+    campaign = await campaign_service.get_campaign(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+
+@router.get("/campaigns/{campaign_id}/results")
+async def get_campaign_results(
+    campaign_id: str,
+    status: Optional[str] = Query(None, description="Filter by status: sent, delivered, read, failed"),
+    limit: int = Query(100, ge=1, le=500),
+    skip: int = Query(0, ge=0)
+):
+    """Get per-contact results for a campaign (paginated)"""
+    try:
+        return await campaign_service.get_campaign_results(campaign_id, status, limit, skip)
+    except Exception as e:
+        logger.error(f"Error fetching campaign results: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/campaigns/{campaign_id}/cancel")
+async def cancel_campaign(campaign_id: str):
+    """Cancel a queued or running campaign. Sends already in flight still complete."""
+    campaign = await campaign_service.cancel_campaign(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+
+class SuppressionRequest(BaseModel):
+    """Request model for suppressing a number"""
+    phone: str = Field(..., description="Phone number with country code")
+    reason: str = Field(
+        default=SuppressionReason.MANUAL,
+        description="opt_out, hard_failure or manual"
+    )
+    
+    @validator('phone')
+    def validate_phone(cls, v):
+        normalized, error = normalize_phone(v)
+        if error:
+            raise ValueError(phone_error_message(error, v))
+        return normalized
+    
+    @validator('reason')
+    def validate_reason(cls, v):
+        allowed = {SuppressionReason.OPT_OUT, SuppressionReason.HARD_FAILURE, SuppressionReason.MANUAL}
+        if v not in allowed:
+            raise ValueError(f"Reason must be one of: {', '.join(sorted(allowed))}")
+        return v
+
+
+@router.get("/suppressions")
+async def get_suppressions(
+    reason: Optional[str] = Query(None, description="Filter by reason: opt_out, hard_failure, manual"),
+    limit: int = Query(100, ge=1, le=500),
+    skip: int = Query(0, ge=0)
+):
+    """List numbers that bulk sends skip"""
+    try:
+        result = await suppression_list.list_suppressions(reason, limit, skip)
+        result["stats"] = suppression_list.get_stats()
+        return result
+    except Exception as e:
+        logger.error(f"Error fetching suppressions: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/suppressions", status_code=201)
+async def add_suppression(request: SuppressionRequest):
+    """Add a number to the suppression list"""
+    if not await suppression_list.add(request.phone, request.reason, source="api"):
+        raise HTTPException(status_code=500, detail="Failed to add suppression")
+    return {"phone": request.phone, "reason": request.reason, "suppressed": True}
+
+
+@router.delete("/suppressions/{phone}")
+async def remove_suppression(
+    phone: str,
+    reason: Optional[str] = Query(None, description="Lift only this reason; the number stays suppressed if others remain")
+):
+    """Remove a number from the suppression list"""
+    try:
+        removed = await suppression_list.remove(phone, reason=reason)
+    except Exception as e:
+        logger.error(f"Error removing suppression: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if not removed:
+        if reason and suppression_list.is_suppressed(phone):
+            # Other reasons still apply
+            return {"phone": phone, "suppressed": True}
+        raise HTTPException(status_code=404, detail="Number is not suppressed")
+    return {"phone": phone, "suppressed": False}
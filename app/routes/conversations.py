@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
+from app.services.conversation_stats import conversation_stats
 from app.services.inbox import InboxService
+from app.utils.contact_search import is_phone_query, search_filter, search_keys
 from app.utils.logger import logger
+from app.utils.pagination import decode_cursor
 from app.database.mongodb import db
 
 router = APIRouter(prefix="/api/conversations", tags=["conversations"])
@@ -83,6 +86,7 @@ async def sync_conversations():
                     "$set": {
                         "user_id": user_id,
                         "user_name": stat.get("user_name"),
+                        "search_keys": search_keys(user_id, stat.get("user_name")),
                         "last_message": stat.get("last_message", "")[:500],
                         "last_message_timestamp": stat.get("last_timestamp"),
                         "last_message_direction": stat.get("last_direction"),
@@ -99,6 +103,8 @@ async def sync_conversations():
                 upsert=True
             )
             synced_count += 1
+        # Counters are rebuilt from the messages on next read
+        await conversation_stats.invalidate()
         logger.info(f"Synced {synced_count} conversations")
         return {
             "success": True,
@@ -109,22 +115,37 @@ async def sync_conversations():
         logger.error(f"Sync error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _parse_cursor(cursor: Optional[str]):
+    """Decode the ?cursor= query parameter, 400 if it was tampered with"""
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("")
 async def get_conversations(
     limit: int = Query(50, ge=1, le=100),
-    skip: int = Query(0, ge=0),
-    archived: bool = Query(False)
+    skip: int = Query(0, ge=0, description="Offset paging (deprecated, use cursor)"),
+    archived: bool = Query(False),
+    cursor: Optional[str] = Query(None, description="next_cursor / prev_cursor from a previous page"),
+    include_total: bool = Query(True, description="Count all matching conversations (extra query)")
 ):
     try:
-        conversations = await inbox_service.get_conversations(limit, skip, archived)
-        total = await inbox_service.get_conversation_count(archived)
-        logger.info(f"Fetched {len(conversations)} conversations (total: {total})")
+        page = await inbox_service.get_conversations_page(limit, _parse_cursor(cursor), skip, archived)
+        total = await inbox_service.get_conversation_count(archived) if include_total else None
+        logger.info(f"Fetched {len(page['items'])} conversations (total: {total})")
         return {
-            "conversations": conversations,
+            "conversations": page["items"],
             "total": total,
             "limit": limit,
-            "skip": skip
+            "skip": skip,
+            "next_cursor": page["next_cursor"],
+            "prev_cursor": page["prev_cursor"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching conversations: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -139,7 +160,7 @@ async def search_users(
     
     **Examples:**
     - Search by partial phone: ?query=9191 → Returns all users with "9191" in phone
-    - Search by username: ?query=saur → Returns all users with "saur" in name
+    - Search by username: ?query=saur → Returns all users with a name word starting with "saur"
     - Search by full number: ?query=919876543210 → Returns exact match
     
     **Response:**
@@ -162,35 +183,16 @@ async def search_users(
     try:
         database = db.async_db
         
-        # Check if query is numeric (phone search) or alphabetic (name search)
-        is_numeric = query.isdigit()
-        
-        # Build search query
-        if is_numeric:
-            # Search by phone number (partial match)
-            search_filter = {
-                "user_id": {"$regex": query, "$options": "i"}
-            }
-        else:
-            # Search by username (partial match, case-insensitive)
-            search_filter = {
-                "user_name": {"$regex": query, "$options": "i"}
-            }
-        
-        # Also try combined search (both phone and name)
-        combined_filter = {
-            "$or": [
-                {"user_id": {"$regex": query, "$options": "i"}},
-                {"user_name": {"$regex": query, "$options": "i"}}
-            ]
-        }
+        # Digits match anywhere in the number, words match name word prefixes
+        is_numeric = is_phone_query(query)
+        lookup_filter = search_filter(query)
         
-        # Get results
-        cursor = database.conversations.find(combined_filter).sort(
-            "last_message_timestamp", -1
-        ).limit(limit)
-        
-        results = await cursor.to_list(length=limit)
+        results = []
+        if lookup_filter:
+            cursor = database.conversations.find(lookup_filter, {"search_keys": 0}).sort(
+                "last_message_timestamp", -1
+            ).limit(limit)
+            results = await cursor.to_list(length=limit)
         
         # Convert ObjectId to string
         for result in results:
@@ -242,25 +244,29 @@ async def update_user_name(
 async def get_conversation_messages(
     user_id: str,
     limit: int = Query(100, ge=1, le=500),
-    skip: int = Query(0, ge=0),
-    days: Optional[int] = Query(None, ge=1, le=365)
+    skip: int = Query(0, ge=0, description="Offset paging (deprecated, use cursor)"),
+    days: Optional[int] = Query(None, ge=1, le=365),
+    cursor: Optional[str] = Query(None, description="next_cursor / prev_cursor from a previous page"),
+    include_total: bool = Query(True, description="Count all matching messages (extra query)")
 ):
     try:
-        messages = await inbox_service.get_messages_with_date_filter(
-            user_id, limit, skip, days
-        )
-        total = await inbox_service.get_message_count(user_id, days)
+        page = await inbox_service.get_messages_page(user_id, limit, _parse_cursor(cursor), skip, days)
+        total = await inbox_service.get_message_count(user_id, days) if include_total else None
         conversation = await inbox_service.get_conversation_by_user_id(user_id)
         return {
             "user_id": user_id,
             "user_name": conversation.get("user_name") if conversation else None,
-            "messages": messages,
+            "messages": page["items"],
             "total": total,
             "limit": limit,
             "skip": skip,
             "days_filter": days,
+            "next_cursor": page["next_cursor"],
+            "prev_cursor": page["prev_cursor"],
             "conversation": conversation
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching messages for {user_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -321,21 +327,33 @@ async def mark_conversation_read(user_id: str):
 
 @router.get("/search")
 async def search_messages(
-    query: str = Query(..., min_length=1),
+    query: str = Query(..., min_length=1, max_length=200),
     user_id: Optional[str] = Query(None),
-    limit: int = Query(50, ge=1, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    skip: int = Query(0, ge=0, le=1000),
+    sort: Literal["relevance", "recent"] = Query("relevance"),
+    cursor: Optional[str] = Query(None, description="next_cursor / prev_cursor (sort=recent)")
 ):
     """
-    Search messages by content (original endpoint - searches message text)
+    Search messages by content (whole words, ranked by relevance or newest first)
     """
     try:
-        results = await inbox_service.search_messages(query, user_id, limit)
+        page = await inbox_service.search_messages(
+            query, user_id, limit, skip, sort, _parse_cursor(cursor)
+        )
         return {
             "query": query,
             "user_id": user_id,
-            "total": len(results),
-            "results": results
+            "total": len(page["items"]),
+            "results": page["items"],
+            "sort": sort,
+            "skip": skip,
+            "has_more": page["has_more"],
+            "next_cursor": page["next_cursor"],
+            "prev_cursor": page["prev_cursor"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error searching messages: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
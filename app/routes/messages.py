@@ -28,6 +28,11 @@ async def send_message(
         else:
             raise HTTPException(status_code=400, detail="Unsupported message type")
         
+        if result.get("paused"):
+            raise HTTPException(
+                status_code=503, detail=result["error"],
+                headers={"Retry-After": str(result["retry_after"])}
+            )
     
         if result["success"]:
             message_data = {
@@ -52,6 +57,8 @@ async def send_message(
             error=result["error"]
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error sending message: {e}")
         raise HTTPException(status_code=500, detail=str(e))
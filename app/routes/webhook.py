@@ -1,11 +1,20 @@
 from fastapi import APIRouter, Request, HTTPException, Depends 
 from app.websockets.connection_manager import manager
 from fastapi.responses import PlainTextResponse
-from datetime import datetime
+from typing import Dict
 from app.services.inbox import InboxService
+from app.services.message_dedup import recent_message_ids
+from app.services.read_receipts import read_receipt_dispatcher
+from app.services.status_batcher import status_batcher
+from app.services.suppression import SuppressionReason, suppression_list
+from app.services.webhook_ingest import webhook_ingest
 from app.services.whatsapp import WhatsAppService
 from app.utils.logger import logger
-from app.config import WEBHOOK_VERIFY_TOKEN
+from app.utils.webhook_parser import KNOWN_MESSAGE_TYPES, extract_events, inbound_message_document, loads
+from app.utils.webhook_recorder import webhook_recorder
+from app.config import (
+    WEBHOOK_VERIFY_TOKEN, WEBHOOK_ASYNC_INGEST, HARD_FAILURE_ERROR_CODES, OPT_OUT_KEYWORDS, OPT_IN_KEYWORDS
+)
 
 router = APIRouter()
 
@@ -46,7 +55,12 @@ async def receive_webhook(
     inbox_service: InboxService = Depends(),
     whatsapp_service: WhatsAppService = Depends()
 ):
-    """Receive incoming messages and status updates from WhatsApp"""
+    """
+    Receive incoming messages and status updates from WhatsApp
+    
+    With WEBHOOK_ASYNC_INGEST the verified payload is only stored in the
+    webhook queue and acknowledged; background consumers process it.
+    """
     try:
         
         body_bytes = await request.body()
@@ -59,91 +73,67 @@ async def receive_webhook(
                 # Uncomment in production:
                 raise HTTPException(status_code=401, detail="Invalid signature")
         
+        if webhook_recorder.enabled:
+            webhook_recorder.record(body_bytes, signature)
+        
+        if WEBHOOK_ASYNC_INGEST:
+            # Durably queued before we ack, so Meta never has to retry it
+            await webhook_ingest.enqueue(body_bytes)
+            return {"status": "ok"}
 
-        body = await request.json()
-        logger.info(f"📨 Received webhook: {body}")
+        # Parsed once from the verified bytes; the full body is only logged at DEBUG
+        events = extract_events(loads(body_bytes))
+        logger.info(f"📨 Received webhook with {len(events)} events")
+        logger.debug("Webhook body: %r", body_bytes)
         
-        
-        entry = body.get("entry", [])
-        for webhook_entry in entry:
-            changes = webhook_entry.get("changes", [])
-            for change in changes:
-                value = change.get("value", {})
-                
-                
-                messages = value.get("messages", [])
-                for message in messages:
-                    await _process_incoming_message(message, inbox_service, whatsapp_service)
-                
-                
-                statuses = value.get("statuses", [])
-                for status in statuses:
-                    await _process_status_update(status, inbox_service)
+        for kind, _, event in events:
+            await process_webhook_event(kind, event, inbox_service)
         
         return {"status": "ok"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Webhook processing error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-async def _process_incoming_message(message: dict, inbox_service: InboxService, 
-                                   whatsapp_service: WhatsAppService):
+async def process_webhook_event(kind: str, event: Dict, inbox_service: InboxService,
+                                raise_errors: bool = False):
+    """
+    Process one message or status event. raise_errors=True (queued ingest)
+    lets storage failures propagate so the payload is retried, not dropped.
+    """
+    if kind == "message":
+        await _process_incoming_message(event, inbox_service, raise_errors)
+    elif kind == "status":
+        await _process_status_update(event, raise_errors)
+
+
+async def _process_incoming_message(message: dict, inbox_service: InboxService, raise_errors: bool = False):
     """Process incoming WhatsApp message - WITH WEBSOCKET NOTIFICATION"""
     try:
-        message_type = message.get("type")
-        from_number = message["from"]
-        timestamp = datetime.fromtimestamp(int(message["timestamp"]))
-        
-        message_data = {
-            "user_id": from_number,
-            "direction": "inbound",
-            "message_type": message_type,
-            "body": "",
-            "timestamp": timestamp,
-            "status": "received",
-            "message_id": message["id"]
-        }
-        
+        if message["id"] in recent_message_ids:
+            logger.info(f"♻️ Redelivered message {message['id']} skipped")
+            return
+        
+        message_data = inbound_message_document(message)
+        message_type = message_data["message_type"]
+        from_number = message_data["user_id"]
+        timestamp = message_data["timestamp"]
+        
+        # Documents we built ourselves skip the Pydantic round trip
+        saved = await inbox_service.save_message(
+            message_data, trusted=message_type in KNOWN_MESSAGE_TYPES, raise_errors=raise_errors
+        )
+        if not saved:
+            # Already stored (or failed to store) - no opt-out, broadcast or receipt
+            return
+        recent_message_ids.add(message["id"])
+        logger.info(f"✅ Processed incoming message from {from_number}: {message_type}")
         
         if message_type == "text":
-            message_data["body"] = message.get("text", {}).get("body", "")
-        elif message_type == "image":
-            message_data["body"] = "[Image]"
-            message_data["media_id"] = message.get("image", {}).get("id")
-            message_data["media_type"] = "image"
-            if message.get("image", {}).get("caption"):
-                message_data["body"] = message["image"]["caption"]
-        elif message_type == "video":
-            message_data["body"] = "[Video]"
-            message_data["media_id"] = message.get("video", {}).get("id")
-            message_data["media_type"] = "video"
-            if message.get("video", {}).get("caption"):
-                message_data["body"] = message["video"]["caption"]
-        elif message_type == "audio":
-            message_data["body"] = "[Audio]"
-            message_data["media_id"] = message.get("audio", {}).get("id")
-            message_data["media_type"] = "audio"
-        elif message_type == "document":
-            message_data["body"] = "[Document]"
-            message_data["media_id"] = message.get("document", {}).get("id")
-            message_data["media_type"] = "document"
-            filename = message.get("document", {}).get("filename", "")
-            if filename:
-                message_data["body"] = f"[Document: {filename}]"
-        elif message_type == "location":
-            location = message.get("location", {})
-            lat = location.get("latitude", "")
-            lon = location.get("longitude", "")
-            message_data["body"] = f"[Location: {lat}, {lon}]"
-        elif message_type == "contacts":
-            message_data["body"] = "[Contact Card]"
-        else:
-            message_data["body"] = f"[{message_type.capitalize()}]"
-        
-        
-        await inbox_service.save_message(message_data)
-        logger.info(f"✅ Processed incoming message from {from_number}: {message_type}")
+            await _process_opt_out(from_number, message_data["body"])
         
         
         try:
@@ -164,17 +154,31 @@ async def _process_incoming_message(message: dict, inbox_service: InboxService,
             
         
         
-        try:
-            await whatsapp_service.mark_message_as_read(message["id"])
-        except Exception as e:
-            logger.warning(f"Could not mark message as read: {e}")
+        # Sent in the background so the webhook ack never waits on the Graph API
+        read_receipt_dispatcher.enqueue(from_number, message["id"])
         
     except Exception as e:
         logger.error(f"❌ Error processing incoming message: {e}", exc_info=True)
+        if raise_errors:
+            raise
+
+
+async def _process_opt_out(from_number: str, body: str):
+    """Suppress numbers that reply STOP, lift it again on START"""
+    keyword = " ".join(body.strip().lower().split())
+    try:
+        if keyword in OPT_OUT_KEYWORDS:
+            await suppression_list.add(from_number, SuppressionReason.OPT_OUT, source="inbound")
+        elif keyword in OPT_IN_KEYWORDS:
+            # Only lift opt-outs; hard failures and manual entries stay
+            if await suppression_list.remove(from_number, reason=SuppressionReason.OPT_OUT):
+                logger.info(f"✅ {from_number} opted back in")
+    except Exception as e:
+        logger.error(f"❌ Error processing opt-out from {from_number}: {e}", exc_info=True)
 
 
-async def _process_status_update(status: dict, inbox_service: InboxService):
-    """Process message status updates (sent, delivered, read, failed) - WITH WEBSOCKET NOTIFICATION"""
+async def _process_status_update(status: dict, raise_errors: bool = False):
+    """Process message status updates (sent, delivered, read, failed) - batched, WITH WEBSOCKET NOTIFICATION"""
     try:
         message_id = status.get("id")
         new_status = status.get("status")
@@ -186,34 +190,27 @@ async def _process_status_update(status: dict, inbox_service: InboxService):
             errors = status.get("errors", [])
             if errors:
                 error_info = errors[0].get("message", "Unknown error")
+                
+                # Permanent delivery failures are not retried by later campaigns
+                error_code = errors[0].get("code")
+                if recipient and error_code in HARD_FAILURE_ERROR_CODES:
+                    await suppression_list.add(
+                        recipient, SuppressionReason.HARD_FAILURE,
+                        source="webhook", error_code=error_code
+                    )
         
         if message_id and new_status:
-            success = await inbox_service.update_message_status(
-                message_id, 
+            # Applied in micro-batches; clients are notified after each flush
+            timestamp = status.get("timestamp")
+            await status_batcher.add(
+                message_id,
                 new_status,
-                error_reason=error_info
+                recipient=recipient,
+                error_reason=error_info,
+                timestamp=int(timestamp) if timestamp else None
             )
             
-            if success:
-                logger.info(f"✅ Updated message {message_id} status to {new_status}")
-                
-                # 🔔 SEND STATUS UPDATE NOTIFICATION
-                try:
-                    await manager.broadcast({
-                        "type": "message_status",
-                        "data": {
-                            "message_id": message_id,
-                            "status": new_status,
-                            "recipient": recipient,
-                            "error": error_info,
-                            "timestamp": datetime.utcnow().isoformat()
-                        }
-                    })
-                    logger.info(f"📢 WebSocket status notification sent for {message_id}")
-                except Exception as notif_error:
-                    logger.error(f"⚠️ Failed to send status notification: {notif_error}")
-            else:
-                logger.warning(f"⚠️ Could not update message {message_id} status")
-            
     except Exception as e:
-        logger.error(f"❌ Error processing status update: {e}", exc_info=True)
\ No newline at end of file
+        logger.error(f"❌ Error processing status update: {e}", exc_info=True)
+        if raise_errors:
+            raise
\ No newline at end of file
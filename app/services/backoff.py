@@ -0,0 +1,155 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from app.config import CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN
+from app.utils.logger import logger
+
+
+class BackoffPaused(Exception):
+    """Sends stay paused longer than the caller is willing to wait"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Outbound sends paused for another {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class BackoffController:
+    """Shared Retry-After pause and circuit breaker for outbound Graph API sends"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    PROBE_POLL_INTERVAL = 0.5
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._paused_until = 0.0
+        self._opened_until = 0.0
+        self._probe: Optional[object] = None
+
+    @property
+    def _probe_in_flight(self) -> bool:
+        return self._probe is not None
+
+    def is_ready(self) -> bool:
+        """Check without waiting whether a send may go out right now"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return False
+        if self.state == self.OPEN:
+            return now >= self._opened_until
+        if self.state == self.HALF_OPEN:
+            return not self._probe_in_flight
+        return True
+
+    async def wait_until_ready(self, max_wait: Optional[float] = None) -> Optional[object]:
+        """
+        Sleep (without blocking the loop) until sends are allowed again.
+        Returns a probe token when this caller is the half-open probe, else None;
+        the token must be handed back to release_probe() (see send_slot).
+        With max_wait, raises BackoffPaused instead of sleeping past it.
+        """
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+
+        async def sleep_until(ready_at: float):
+            if deadline is not None and ready_at > deadline:
+                raise BackoffPaused(ready_at - time.monotonic())
+            await asyncio.sleep(ready_at - time.monotonic())
+
+        while True:
+            now = time.monotonic()
+
+            if now < self._paused_until:
+                await sleep_until(self._paused_until)
+                continue
+
+            if self.state == self.OPEN:
+                if now < self._opened_until:
+                    await sleep_until(self._opened_until)
+                    continue
+                self.state = self.HALF_OPEN
+                logger.info("🟡 Circuit breaker half-open, sending probe request")
+
+            if self.state == self.HALF_OPEN:
+                # Only one probe at a time; everyone else waits for its outcome
+                if self._probe_in_flight:
+                    await sleep_until(now + self.PROBE_POLL_INTERVAL)
+                    continue
+                self._probe = object()
+                return self._probe
+
+            return None
+
+    def release_probe(self, token: Optional[object]):
+        """Free the probe slot if this token still holds it (the send had no outcome)"""
+        if token is not None and self._probe is token:
+            self._probe = None
+
+    @asynccontextmanager
+    async def send_slot(self, max_wait: Optional[float] = None):
+        """
+        Wait until ready, then hold the send slot for the duration of the block.
+        A half-open probe that ends without record_success/record_failure/throttle
+        (cancelled, or an unexpected error) is released so the next caller can probe.
+        """
+        token = await self.wait_until_ready(max_wait)
+        try:
+            yield
+        finally:
+            self.release_probe(token)
+
+    def throttle(self, retry_after: float):
+        """Pause all outbound sends for the Retry-After advertised by the API"""
+        self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self._probe = None
+        logger.warning(f"⏸️ Outbound sends paused for {retry_after:.0f}s (API throttling)")
+
+    def record_success(self):
+        """Reset failure tracking after a healthy response"""
+        if self.state != self.CLOSED:
+            logger.info("🟢 Circuit breaker closed, Graph API recovered")
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._probe = None
+
+    def record_failure(self):
+        """Count a 5xx/timeout and trip the breaker when the threshold is hit"""
+        self._consecutive_failures += 1
+        self._probe = None
+
+        if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_until = time.monotonic() + self.cooldown
+            logger.error(
+                f"🔴 Circuit breaker open after {self._consecutive_failures} failures, "
+                f"pausing sends for {self.cooldown:.0f}s"
+            )
+
+    def get_status(self) -> Dict:
+        """Current breaker state for monitoring"""
+        now = time.monotonic()
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "paused_for": round(max(0.0, self._paused_until - now), 2),
+            "open_for": round(max(0.0, self._opened_until - now), 2) if self.state == self.OPEN else 0.0
+        }
+
+
+_controllers: Dict[str, BackoffController] = {}
+
+
+def get_backoff_controller(key: str) -> BackoffController:
+    """Get the process-wide backoff controller for a phone number id"""
+    controller = _controllers.get(key)
+
+    if controller is None:
+        controller = BackoffController(CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN)
+        _controllers[key] = controller
+
+    return controller
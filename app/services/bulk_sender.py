@@ -1,10 +1,17 @@
 import asyncio
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union, AsyncIterable, Callable, Awaitable
 from bson import ObjectId
+from app.config import BULK_MAX_CONCURRENCY, HARD_FAILURE_ERROR_CODES
 from app.database.mongodb import db
+from app.services.bulk_writer import BulkResultWriter
+from app.services.outbound_scheduler import Priority
+from app.services.rate_controller import AimdRateController
+from app.services.suppression import SuppressionReason, suppression_list
 from app.services.whatsapp import WhatsAppService
 from app.utils.logger import logger
+from app.utils.message_template import CompiledTemplate, compile_template, contact_values, missing_fields_message
+from app.utils.phone import normalize_phones, phone_error_message
 
 
 class BulkMessageSender:
@@ -19,156 +26,297 @@ class BulkMessageSender:
             raise RuntimeError("Database not connected")
         return db.async_db
     
-    async def send_bulk_messages(self, message_template: str, contacts: List[Dict],
-                                delay: float = 1.0) -> Dict:
+    async def send_bulk_messages(self, message_template: str,
+                                contacts: Union[List[Dict], AsyncIterable[Dict]],
+                                delay: float = 1.0, concurrency: Optional[int] = None,
+                                total: Optional[int] = None, campaign_id: Optional[str] = None,
+                                cancel_event: Optional[asyncio.Event] = None,
+                                on_flush: Optional[Callable[[List[Dict]], Awaitable[None]]] = None,
+                                collect_results: bool = True,
+                                rate_controller: Optional[AimdRateController] = None) -> Dict:
         """
         Send bulk messages with simplified approach
         
         Args:
-            message_template: Template with {name} placeholder
-            contacts: List of {"phone": "919876543210", "name": "John"}
-            delay: Delay between messages in seconds
+            message_template: Template with {name} / {field|default} placeholders
+            contacts: List (or async iterable) of {"phone": "919876543210", "name": "John",
+                "fields": {"city": "Delhi"}}
+            delay: Delay between messages in seconds (sequential mode only)
+            concurrency: Max in-flight sends. When set, contacts are sent
+                concurrently and paced by the shared rate limiter instead of delay.
+            total: Contact count when contacts is an async iterable
+            campaign_id: Campaign to tag saved messages with
+            cancel_event: Stops sending new messages once set
+            on_flush: Called with each batch of saved messages (progress tracking)
+            collect_results: Keep per-contact success/failure lists in the result
+            rate_controller: Adaptive pacing - sends are paced by the controller's
+                AIMD rate instead of delay (concurrency defaults to BULK_MAX_CONCURRENCY)
         """
         
-        total = len(contacts)
+        if total is None:
+            total = len(contacts)
         successful = []
         failed = []
+        counts = {"successful": 0, "failed": 0}
         
-        logger.info(f"Starting bulk send: {total} contacts")
+        def record_result(ok: bool, record: Dict):
+            counts["successful" if ok else "failed"] += 1
+            if collect_results:
+                (successful if ok else failed).append(record)
         
-        for index, contact in enumerate(contacts, 1):
-            try:
-                phone = contact.get('phone', '').strip()
-                name = contact.get('name', '').strip()
-                
-                # Validate phone number
-                if not phone:
-                    logger.warning(f"Skipping contact {index}: No phone number")
-                    failed.append({
-                        "phone": phone or "N/A",
-                        "name": name or "N/A",
-                        "error": "Phone number is required"
-                    })
-                    continue
-                
-                # Personalize message by replacing {name} (if placeholder exists)
-                if '{name}' in message_template:
-                    personalized_message = message_template.replace('{name}', name if name else 'Customer')
-                else:
-                    # No placeholder, use template as-is
-                    personalized_message = message_template
+        def cancelled() -> bool:
+            return cancel_event is not None and cancel_event.is_set()
+        
+        # Parse the template once; each contact only renders
+        template = compile_template(message_template)
+        
+        if rate_controller and not concurrency:
+            # The controller sets the pace; workers just need to keep up with it
+            concurrency = BULK_MAX_CONCURRENCY
+        
+        logger.info(f"Starting bulk send: {total} contacts" +
+                    (f" (concurrency {concurrency})" if concurrency else "") +
+                    (f" (adaptive, starting at {rate_controller.current_rate} msg/s)" if rate_controller else ""))
+        
+        # Results are buffered and written in batches instead of one insert per contact
+        async with BulkResultWriter(self._get_db(), on_flush=on_flush) as writer:
+            if concurrency and concurrency > 1:
+                # Bounded queue keeps memory flat for streamed contact sources
+                queue = asyncio.Queue(maxsize=concurrency * 2)
                 
-                # Send message
-                logger.info(f"Sending to {phone} ({index}/{total})")
-                result = await self.whatsapp_service.send_text_message(phone, personalized_message)
+                async def producer():
+                    index = 0
+                    async for contact in self._iter_contacts(contacts):
+                        if cancelled():
+                            break
+                        index += 1
+                        await queue.put((index, contact))
+                    
+                    # One stop signal per worker
+                    for _ in range(concurrency):
+                        await queue.put(None)
                 
-                database = self._get_db()
+                async def worker():
+                    while True:
+                        item = await queue.get()
+                        if item is None:
+                            return
+                        if cancelled():
+                            continue
+                        index, contact = item
+                        record_result(*await self._send_to_contact(
+                            template, contact, index, total, writer, campaign_id, rate_controller
+                        ))
                 
-                # Save message to database
-                if result['success']:
-                    message_data = {
-                        "user_id": phone,
-                        "direction": "outbound",
-                        "message_type": "text",
-                        "body": personalized_message,
-                        "timestamp": datetime.utcnow(),
-                        "status": "sent",
-                        "message_id": result['message_id'],
-                        "created_at": datetime.utcnow(),
-                        "updated_at": datetime.utcnow()
-                    }
-                    
-                    await database.messages.insert_one(message_data)
-                    successful.append({
-                        "phone": phone,
-                        "name": name
-                    })
-                    logger.info(f"✅ Success: {phone}")
+                workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+                try:
+                    await producer()
+                    await asyncio.gather(*workers)
+                finally:
+                    # Don't leave workers blocked on the queue if we stop early
+                    for task in workers:
+                        task.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+            else:
+                index = 0
+                async for contact in self._iter_contacts(contacts):
+                    if cancelled():
+                        break
                     
-                else:
-                    # Save failed message
-                    message_data = {
-                        "user_id": phone,
-                        "direction": "outbound",
-                        "message_type": "text",
-                        "body": personalized_message,
-                        "timestamp": datetime.utcnow(),
-                        "status": "failed",
-                        "error_reason": result.get('error', 'Unknown error'),
-                        "created_at": datetime.utcnow(),
-                        "updated_at": datetime.utcnow()
-                    }
+                    # Delay between messages (not before the first one)
+                    if index > 0 and not rate_controller:
+                        await asyncio.sleep(delay)
                     
-                    await database.messages.insert_one(message_data)
-                    failed.append({
-                        "phone": phone,
-                        "name": name,
-                        "error": result.get('error', 'Unknown error')
-                    })
-                    logger.error(f"❌ Failed: {phone} - {result.get('error')}")
-                
-                # Delay between messages (except last one)
-                if index < total:
-                    await asyncio.sleep(delay)
-                    
-            except Exception as e:
-                logger.error(f"Error processing contact {index}: {e}", exc_info=True)
-                failed.append({
-                    "phone": contact.get('phone', 'N/A'),
-                    "name": contact.get('name', 'N/A'),
-                    "error": str(e)
-                })
+                    index += 1
+                    record_result(*await self._send_to_contact(
+                        template, contact, index, total, writer, campaign_id, rate_controller
+                    ))
         
         # Calculate results
-        success_rate = (len(successful) / total * 100) if total > 0 else 0
+        success_rate = (counts["successful"] / total * 100) if total > 0 else 0
         
-        logger.info(f"Bulk send completed: {len(successful)}/{total} successful ({success_rate:.1f}%)")
+        logger.info(f"Bulk send {'cancelled' if cancelled() else 'completed'}: "
+                    f"{counts['successful']}/{total} successful ({success_rate:.1f}%)")
         
         return {
             "total": total,
-            "successful": len(successful),
-            "failed": len(failed),
+            "successful": counts["successful"],
+            "failed": counts["failed"],
             "success_rate": round(success_rate, 2),
             "successful_contacts": successful,
             "failed_contacts": failed
         }
     
-    def validate_contacts(self, contacts: List[Dict]) -> Dict:
-        """Validate contact list before sending"""
+    async def _iter_contacts(self, contacts: Union[List[Dict], AsyncIterable[Dict]]):
+        """Iterate a contact list or async contact stream uniformly"""
+        if hasattr(contacts, "__aiter__"):
+            async for contact in contacts:
+                yield contact
+        else:
+            for contact in contacts:
+                yield contact
+    
+    async def _send_to_contact(self, template: CompiledTemplate, contact: Dict, index: int,
+                               total: int, writer: BulkResultWriter,
+                               campaign_id: Optional[str] = None,
+                               rate_controller: Optional[AimdRateController] = None) -> Tuple[bool, Dict]:
+        """Send to one contact and save the result. Returns (success, contact record)."""
+        phone = str(contact.get('phone') or '').strip()
+        name = str(contact.get('name') or '').strip()
+        
+        # Validate phone number
+        if not phone:
+            logger.warning(f"Skipping contact {index}: No phone number")
+            return False, {
+                "phone": "N/A",
+                "name": name or "N/A",
+                "error": "Phone number is required"
+            }
+        
+        # Personalize message from the pre-compiled template
+        personalized_message = template.render(contact_values(contact))
+        
+        if rate_controller:
+            await rate_controller.acquire()
+        
+        try:
+            # Send message
+            logger.info(f"Sending to {phone} ({index}/{total})")
+            result = await self.whatsapp_service.send_text_message(
+                phone, personalized_message, priority=Priority.BULK
+            )
+            
+        except Exception as e:
+            logger.error(f"Error processing contact {index}: {e}", exc_info=True)
+            result = {"success": False, "message_id": None, "error": str(e)}
+        
+        if rate_controller:
+            rate_controller.record(result)
+        
+        # Save message to database (buffered)
+        if result['success']:
+            await writer.add(self._build_message(
+                phone, name, personalized_message, "sent", campaign_id,
+                campaign_seq=contact.get('seq'), message_id=result['message_id']
+            ))
+            logger.info(f"✅ Success: {phone}")
+            return True, {
+                "phone": phone,
+                "name": name
+            }
+        
+        error = result.get('error') or 'Unknown error'
+        if result.get('error_code') in HARD_FAILURE_ERROR_CODES:
+            # Permanently undeliverable - don't spend rate budget on it again
+            await suppression_list.add(
+                phone, SuppressionReason.HARD_FAILURE,
+                source=campaign_id or "bulk_send", error_code=result['error_code']
+            )
+        
+        await writer.add(self._build_message(
+            phone, name, personalized_message, "failed", campaign_id,
+            campaign_seq=contact.get('seq'), error_reason=error
+        ))
+        logger.error(f"❌ Failed: {phone} - {error}")
+        return False, {
+            "phone": phone,
+            "name": name,
+            "error": error
+        }
+    
+    def _build_message(self, phone: str, name: str, body: str, status: str,
+                       campaign_id: Optional[str] = None, campaign_seq: Optional[int] = None,
+                       message_id: Optional[str] = None, error_reason: Optional[str] = None) -> Dict:
+        """Build an outbound message document for a bulk send result"""
+        now = datetime.utcnow()
+        message_data = {
+            "user_id": phone,
+            "user_name": name or None,
+            "direction": "outbound",
+            "message_type": "text",
+            "body": body,
+            "timestamp": now,
+            "status": status,
+            "created_at": now,
+            "updated_at": now
+        }
+        if message_id:
+            message_data["message_id"] = message_id
+        if error_reason:
+            message_data["error_reason"] = error_reason
+        if campaign_id:
+            message_data["campaign_id"] = campaign_id
+        if campaign_seq is not None:
+            message_data["campaign_seq"] = campaign_seq
+        return message_data
+    
+    def validate_contacts(self, contacts: List[Dict], start_row: int = 1,
+                          template: Optional[CompiledTemplate] = None) -> Dict:
+        """
+        Validate contact list before sending.
+        
+        Phone numbers are normalized column-wise to E.164 digits (10-digit
+        numbers get DEFAULT_COUNTRY_CODE). With a template, contacts missing
+        one of its required fields (placeholders without a default) are
+        invalid. Suppressed numbers (opt-outs, permanent failures) and
+        repeats of a number earlier in the list are skipped and counted,
+        not reported invalid. Rows are numbered from start_row unless a
+        contact carries its own "row" (its line in an uploaded file).
+        """
         valid_contacts = []
         invalid_contacts = []
+        seen = set()
+        suppressed = 0
+        duplicates = 0
+        
+        phones = [str(contact.get('phone') or '').strip() for contact in contacts]
+        numbers, errors = normalize_phones(phones)
         
-        for idx, contact in enumerate(contacts, 1):
-            phone = contact.get('phone', '').strip()
-            name = contact.get('name', '').strip()
+        for idx, (contact, phone, cleaned_phone, error) in enumerate(
+            zip(contacts, phones, numbers, errors), start_row
+        ):
+            name = str(contact.get('name') or '').strip()
+            idx = contact.get('row') or idx
             
-            # Check phone number exists
-            if not phone:
+            if error:
                 invalid_contacts.append({
-                    "phone": "N/A",
+                    "phone": phone or "N/A",
                     "name": name,
                     "row": idx,
-                    "error": "Phone number is required"
+                    "code": error,
+                    "error": phone_error_message(error, phone)
                 })
                 continue
             
-            # Basic phone validation - at least 10 digits
-            cleaned_phone = ''.join(filter(str.isdigit, phone))
-            if len(cleaned_phone) < 10:
-                invalid_contacts.append({
-                    "phone": phone,
-                    "name": name,
-                    "row": idx,
-                    "error": f"Invalid phone number (too short: {len(cleaned_phone)} digits)"
-                })
+            if template is not None and template.required_fields:
+                missing = template.missing_fields(contact_values(contact))
+                if missing:
+                    invalid_contacts.append({
+                        "phone": phone,
+                        "name": name,
+                        "row": idx,
+                        "code": "missing_field",
+                        "error": missing_fields_message(missing)
+                    })
+                    continue
+            
+            if cleaned_phone in seen:
+                duplicates += 1
                 continue
+            seen.add(cleaned_phone)
             
-            # Valid contact
-            valid_contacts.append(contact)
+            if suppression_list.contains(cleaned_phone):
+                suppressed += 1
+                continue
+            
+            # Valid contact (normalized, so imported rows match the JSON API)
+            valid_contacts.append({**contact, "phone": cleaned_phone, "name": name})
         
         return {
             "valid": valid_contacts,
             "invalid": invalid_contacts,
             "total_valid": len(valid_contacts),
-            "total_invalid": len(invalid_contacts)
-        }
\ No newline at end of file
+            "total_invalid": len(invalid_contacts),
+            "skipped_suppressed": suppressed,
+            "skipped_duplicate": duplicates
+        }
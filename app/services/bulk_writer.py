@@ -0,0 +1,174 @@
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.config import BATCH_SIZE, BULK_FLUSH_INTERVAL
+from app.services.conversation_stats import conversation_stats
+from app.utils.contact_search import search_keys
+from app.utils.logger import logger
+
+
+class BulkResultWriter:
+    """
+    Buffer bulk-send message documents and persist them in batches.
+
+    on_flush only ever sees documents that are stored, so a campaign
+    checkpoint built from it never covers a lost result. Documents that
+    failed to insert are retried with the next flush; if that fails too
+    they are dropped and never reported, which holds the checkpoint below
+    them (a resumed campaign sends to those contacts again).
+    """
+
+    def __init__(self, database, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = BULK_FLUSH_INTERVAL,
+                 on_flush: Optional[Callable[[List[Dict]], Awaitable[None]]] = None):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self._buffer: List[Dict] = []
+        # Documents whose insert failed once, retried with the next flush
+        self._retry: List[Dict] = []
+        self._lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self._flusher = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        if self._retry:
+            # One last attempt for documents that failed in the final flush
+            await self.flush()
+
+    async def add(self, message_data: Dict):
+        """Buffer a message document, flushing when the batch is full"""
+        self._buffer.append(message_data)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def _flush_periodically(self):
+        """Flush partial batches so slow campaigns still show up promptly"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _insert(self, batch: List[Dict]) -> List[Dict]:
+        """Insert a batch; returns the documents that were not stored"""
+        try:
+            await self.database.messages.insert_many(batch, ordered=False)
+            return []
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            logger.error(f"Bulk insert partially failed: {errors[:3]}")
+            # Duplicate _id: a retried document that was stored after all
+            failed = sorted({error["index"] for error in errors if error.get("code") != 11000})
+            return [batch[index] for index in failed]
+        except Exception as e:
+            logger.error(f"Error inserting message batch: {e}", exc_info=True)
+            return batch
+
+    async def flush(self):
+        """Write buffered messages and their conversation upserts"""
+        async with self._lock:
+            retry, self._retry = self._retry, []
+            batch = retry + self._buffer
+            self._buffer = []
+            if not batch:
+                return
+
+            failed = await self._insert(batch)
+            if failed:
+                retried = {id(message) for message in retry}
+                self._retry = [message for message in failed if id(message) not in retried]
+                dropped = len(failed) - len(self._retry)
+                if dropped:
+                    logger.error(f"Dropped {dropped} bulk messages that failed to insert twice")
+                failed_ids = {id(message) for message in failed}
+                batch = [message for message in batch if id(message) not in failed_ids]
+                if not batch:
+                    return
+
+            created_users = set()
+            try:
+                result = await self.database.conversations.bulk_write(
+                    self._conversation_upserts(batch), ordered=False
+                )
+                # Upserts are built in first-seen order of user_id
+                users = list(dict.fromkeys(message["user_id"] for message in batch))
+                created_users = {users[index] for index in result.upserted_ids}
+            except Exception as e:
+                logger.error(f"Error updating conversations for batch: {e}", exc_info=True)
+
+            await conversation_stats.record_batch(batch, created_users)
+
+            logger.info(f"💾 Flushed {len(batch)} bulk messages")
+
+            if self.on_flush:
+                try:
+                    await self.on_flush(batch)
+                except Exception as e:
+                    logger.error(f"Error in bulk flush callback: {e}", exc_info=True)
+
+    def _conversation_upserts(self, batch: List[Dict]) -> List[UpdateOne]:
+        """
+        One conversation upsert per recipient, same shape as
+        InboxService._update_conversation, except that a name only fills a
+        conversation without one: a name an agent set is never overwritten.
+        The naming updates follow all the upserts, so upserted_ids indexes
+        still map to recipients in first-seen order.
+        """
+        latest: Dict[str, Dict] = {}
+        counts: Dict[str, int] = {}
+
+        for message in batch:
+            user_id = message["user_id"]
+            counts[user_id] = counts.get(user_id, 0) + 1
+            if user_id not in latest or message["timestamp"] >= latest[user_id]["timestamp"]:
+                latest[user_id] = message
+
+        now = datetime.utcnow()
+        operations = []
+        naming = []
+
+        for user_id, message in latest.items():
+            set_on_insert = {
+                "created_at": now,
+                "is_archived": False,
+                "labels": [],
+                "unread_count": 0,
+                "search_keys": search_keys(user_id, message.get("user_name"))
+            }
+            if message.get("user_name"):
+                set_on_insert["user_name"] = message["user_name"]
+                naming.append(UpdateOne(
+                    {"user_id": user_id, "user_name": None},
+                    {"$set": {
+                        "user_name": message["user_name"],
+                        "search_keys": search_keys(user_id, message["user_name"])
+                    }}
+                ))
+
+            operations.append(UpdateOne(
+                {"user_id": user_id},
+                {
+                    "$set": {
+                        "user_id": user_id,
+                        "last_message": message["body"][:500],
+                        "last_message_timestamp": message["timestamp"],
+                        "last_message_direction": message["direction"],
+                        "updated_at": now
+                    },
+                    "$setOnInsert": set_on_insert,
+                    "$inc": {"total_messages": counts[user_id]}
+                },
+                upsert=True
+            ))
+
+        return operations + naming
@@ -0,0 +1,617 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import AsyncIterable, Callable, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.config import (
+    BATCH_SIZE, CONTACT_IMPORT_BATCH_SIZE, CAMPAIGN_HEARTBEAT_INTERVAL, CAMPAIGN_LEASE_TIMEOUT
+)
+from app.database.mongodb import db
+from app.models.campaign import Campaign, CampaignStatus
+from app.services.bulk_sender import BulkMessageSender
+from app.services.rate_controller import AimdRateController
+from app.services.suppression import suppression_list
+from app.services.whatsapp import WhatsAppService
+from app.utils.logger import logger
+from app.utils.message_template import compile_template
+
+
+class CampaignService:
+    """Run bulk send campaigns as background jobs with progress tracking"""
+
+    def __init__(self):
+        self.bulk_sender = BulkMessageSender(WhatsAppService())
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancel_events: Dict[str, asyncio.Event] = {}
+        self._watcher: Optional[asyncio.Task] = None
+
+    def _get_db(self):
+        """Get database instance"""
+        if db.async_db is None:
+            raise RuntimeError("Database not connected")
+        return db.async_db
+
+    def _serialize(self, campaign: Dict) -> Dict:
+        """Convert a campaign document for API responses"""
+        campaign["campaign_id"] = str(campaign.pop("_id"))
+        total = campaign.get("total", 0)
+        campaign["success_rate"] = round(campaign.get("successful", 0) / total * 100, 2) if total else 0
+        return campaign
+
+    async def create_campaign(self, message_template: str, contacts: List[Dict],
+                              delay: float = 1.0, concurrency: Optional[int] = None,
+                              invalid_contacts: Optional[List[Dict]] = None,
+                              skipped_suppressed: int = 0, skipped_duplicate: int = 0,
+                              adaptive: bool = False) -> str:
+        """Store a campaign and its (already validated and deduplicated) contacts, then start it"""
+        campaign_id = await self._insert_campaign(message_template, delay, concurrency, adaptive)
+
+        total = 0
+        for start in range(0, len(contacts), CONTACT_IMPORT_BATCH_SIZE):
+            stored, _ = await self._store_contacts(
+                campaign_id, contacts[start:start + CONTACT_IMPORT_BATCH_SIZE], total
+            )
+            total += stored
+
+        await self._finish_import(
+            campaign_id, total, invalid_contacts or [],
+            skipped_suppressed=skipped_suppressed, skipped_duplicate=skipped_duplicate
+        )
+        return campaign_id
+
+    async def create_campaign_from_stream(self, message_template: str,
+                                          batches: AsyncIterable[List[Dict]],
+                                          delay: float = 1.0,
+                                          concurrency: Optional[int] = None,
+                                          adaptive: bool = False) -> Dict:
+        """
+        Validate and store contacts batch by batch, then start the campaign.
+        Only one batch is held in memory regardless of list size; numbers
+        repeated across batches are caught against the stored contacts.
+        The first batch is read before the campaign is created, so a file
+        with a bad header leaves nothing behind; a later error marks the
+        campaign failed.
+        """
+        template = compile_template(message_template)
+        batches = batches.__aiter__()
+        first_batch = await anext(batches, None)
+
+        campaign_id = await self._insert_campaign(message_template, delay, concurrency, adaptive)
+
+        total = 0
+        invalid = 0
+        skipped_suppressed = 0
+        skipped_duplicate = 0
+        invalid_sample = []
+        row = 1
+
+        try:
+            await suppression_list.refresh_if_stale()
+
+            batch = first_batch
+            while batch is not None:
+                validation = self.bulk_sender.validate_contacts(batch, start_row=row, template=template)
+                row += len(batch)
+
+                stored, duplicates = await self._store_contacts(campaign_id, validation['valid'], total)
+                total += stored
+                invalid += validation['total_invalid']
+                skipped_suppressed += validation['skipped_suppressed']
+                skipped_duplicate += validation['skipped_duplicate'] + duplicates
+                invalid_sample.extend(validation['invalid'][:100 - len(invalid_sample)])
+
+                batch = await anext(batches, None)
+        except Exception as e:
+            await self._get_db().campaigns.update_one(
+                {"_id": ObjectId(campaign_id)},
+                {"$set": {
+                    "status": CampaignStatus.FAILED.value,
+                    "error": f"Contact import failed: {e}",
+                    "completed_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+            raise
+
+        if total == 0:
+            await self._get_db().campaigns.update_one(
+                {"_id": ObjectId(campaign_id)},
+                {"$set": {
+                    "status": CampaignStatus.FAILED.value,
+                    "invalid": invalid,
+                    "invalid_contacts": invalid_sample,
+                    "skipped_suppressed": skipped_suppressed,
+                    "skipped_duplicate": skipped_duplicate,
+                    "error": "No valid contacts",
+                    "completed_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+            status = CampaignStatus.FAILED.value
+        else:
+            await self._finish_import(
+                campaign_id, total, invalid_sample, invalid,
+                skipped_suppressed=skipped_suppressed, skipped_duplicate=skipped_duplicate
+            )
+            status = CampaignStatus.QUEUED.value
+
+        return {
+            "campaign_id": campaign_id,
+            "status": status,
+            "total": total,
+            "invalid": invalid,
+            "invalid_contacts": invalid_sample,
+            "skipped_suppressed": skipped_suppressed,
+            "skipped_duplicate": skipped_duplicate
+        }
+
+    async def _insert_campaign(self, message_template: str, delay: float,
+                               concurrency: Optional[int], adaptive: bool = False) -> str:
+        """Create the campaign document in importing state"""
+        campaign = Campaign(
+            message_template=message_template,
+            delay=delay,
+            concurrency=concurrency,
+            adaptive=adaptive
+        )
+        campaign_dict = campaign.model_dump(by_alias=True, exclude_none=True)
+        campaign_dict["_id"] = ObjectId()
+
+        await self._get_db().campaigns.insert_one(campaign_dict)
+        return str(campaign_dict["_id"])
+
+    async def _store_contacts(self, campaign_id: str, contacts: List[Dict],
+                              start_seq: int) -> Tuple[int, int]:
+        """
+        Append validated contacts to the campaign's contact collection.
+        Numbers already stored for the campaign are dropped before seqs are
+        assigned, so seqs stay contiguous for the checkpoint.
+        Returns (stored, duplicates).
+        """
+        if not contacts:
+            return 0, 0
+
+        database = self._get_db()
+        if start_seq > 0:
+            stored_phones = set(await database.campaign_contacts.distinct("phone", {
+                "campaign_id": campaign_id,
+                "phone": {"$in": [contact["phone"] for contact in contacts]}
+            }))
+            if stored_phones:
+                contacts = [contact for contact in contacts if contact["phone"] not in stored_phones]
+                if not contacts:
+                    return 0, len(stored_phones)
+        else:
+            stored_phones = ()
+
+        # Contacts live in their own collection so the worker can stream them
+        await database.campaign_contacts.insert_many([
+            {
+                "campaign_id": campaign_id,
+                "seq": start_seq + offset,
+                "phone": contact["phone"],
+                "name": contact.get("name", ""),
+                "fields": contact.get("fields") or {}
+            }
+            for offset, contact in enumerate(contacts)
+        ], ordered=False)
+        return len(contacts), len(stored_phones)
+
+    async def _finish_import(self, campaign_id: str, total: int,
+                             invalid_contacts: List[Dict], invalid: Optional[int] = None,
+                             skipped_suppressed: int = 0, skipped_duplicate: int = 0):
+        """Record the contact counts, queue the campaign and start its job"""
+        await self._get_db().campaigns.update_one(
+            {"_id": ObjectId(campaign_id)},
+            {"$set": {
+                "status": CampaignStatus.QUEUED.value,
+                "heartbeat_at": datetime.utcnow(),
+                "total": total,
+                "invalid": len(invalid_contacts) if invalid is None else invalid,
+                "invalid_contacts": invalid_contacts[:100],
+                "skipped_suppressed": skipped_suppressed,
+                "skipped_duplicate": skipped_duplicate,
+                "updated_at": datetime.utcnow()
+            }}
+        )
+        logger.info(f"📋 Campaign {campaign_id} created with {total} contacts "
+                    f"({skipped_suppressed} suppressed, {skipped_duplicate} duplicates skipped)")
+
+        self.start_campaign(campaign_id)
+
+    def start_campaign(self, campaign_id: str, campaign: Optional[Dict] = None):
+        """Start the background job for a campaign (optionally one already claimed)"""
+        if campaign_id in self._tasks:
+            return
+
+        self._cancel_events[campaign_id] = asyncio.Event()
+        task = asyncio.create_task(self._run_campaign(campaign_id, campaign))
+        self._tasks[campaign_id] = task
+        task.add_done_callback(lambda _: self._forget(campaign_id))
+
+    def _forget(self, campaign_id: str):
+        """Drop bookkeeping for a finished job"""
+        self._tasks.pop(campaign_id, None)
+        self._cancel_events.pop(campaign_id, None)
+
+    async def _iter_campaign_contacts(self, campaign_id: str, from_seq: int = 0,
+                                      skip_sent: bool = False,
+                                      on_skip: Optional[Callable[[List[int]], None]] = None):
+        """
+        Stream a campaign's contacts in send order, starting at a checkpoint.
+        Numbers suppressed since the import (e.g. a STOP reply mid-campaign)
+        are skipped. With skip_sent, contacts that already have an outbound
+        message for this campaign (sent just before a restart) are skipped too.
+        Skipped seqs are reported through on_skip.
+        """
+        database = self._get_db()
+        cursor = database.campaign_contacts.find(
+            {"campaign_id": campaign_id, "seq": {"$gte": from_seq}},
+            {"_id": 0, "seq": 1, "phone": 1, "name": 1, "fields": 1}
+        ).sort("seq", 1).batch_size(BATCH_SIZE * 10)
+
+        page = []
+        async for contact in cursor:
+            page.append(contact)
+            if len(page) >= BATCH_SIZE:
+                page = await self._drop_suppressed(campaign_id, page, on_skip)
+                for unsent in await self._filter_unsent(campaign_id, page, skip_sent, on_skip):
+                    yield unsent
+                page = []
+
+        page = await self._drop_suppressed(campaign_id, page, on_skip)
+        for unsent in await self._filter_unsent(campaign_id, page, skip_sent, on_skip):
+            yield unsent
+
+    async def _drop_suppressed(self, campaign_id: str, contacts: List[Dict],
+                               on_skip: Optional[Callable[[List[int]], None]] = None) -> List[Dict]:
+        """Drop contacts suppressed after the campaign was imported"""
+        suppressed = [contact for contact in contacts if suppression_list.contains(contact["phone"])]
+        if not suppressed:
+            return contacts
+
+        skipped = {contact["seq"] for contact in suppressed}
+        if on_skip:
+            on_skip(list(skipped))
+
+        # Marked on the contact so a resumed run doesn't count them twice
+        database = self._get_db()
+        marked = await database.campaign_contacts.update_many(
+            {"campaign_id": campaign_id, "seq": {"$in": list(skipped)}, "suppressed": {"$ne": True}},
+            {"$set": {"suppressed": True}}
+        )
+        if marked.modified_count:
+            # Counted as processed so progress still reaches the total
+            await database.campaigns.update_one(
+                {"_id": ObjectId(campaign_id)},
+                {"$inc": {"skipped_suppressed": marked.modified_count, "processed": marked.modified_count}}
+            )
+        logger.info(f"Campaign {campaign_id}: skipping {len(suppressed)} suppressed contacts")
+
+        return [contact for contact in contacts if contact["seq"] not in skipped]
+
+    async def _filter_unsent(self, campaign_id: str, contacts: List[Dict], skip_sent: bool,
+                             on_skip: Optional[Callable[[List[int]], None]] = None) -> List[Dict]:
+        """Drop contacts that already have an outbound message for the campaign"""
+        if not skip_sent or not contacts:
+            return contacts
+
+        already_sent = set(await self._get_db().messages.distinct("user_id", {
+            "campaign_id": campaign_id,
+            "direction": "outbound",
+            "user_id": {"$in": [contact["phone"] for contact in contacts]}
+        }))
+        if not already_sent:
+            return contacts
+
+        logger.info(f"Campaign {campaign_id}: skipping {len(already_sent)} contacts sent before restart")
+        if on_skip:
+            on_skip([contact["seq"] for contact in contacts if contact["phone"] in already_sent])
+
+        return [contact for contact in contacts if contact["phone"] not in already_sent]
+
+    async def _claim_campaign(self, campaign_id: str) -> Optional[Dict]:
+        """Take ownership of a queued campaign"""
+        now = datetime.utcnow()
+        return await self._get_db().campaigns.find_one_and_update(
+            {"_id": ObjectId(campaign_id), "status": CampaignStatus.QUEUED.value},
+            {"$set": {
+                "status": CampaignStatus.RUNNING.value,
+                "worker_id": self.worker_id,
+                "heartbeat_at": now,
+                "started_at": now,
+                "updated_at": now
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _run_campaign(self, campaign_id: str, campaign: Optional[Dict] = None):
+        """Background job: send the campaign, recording progress and a checkpoint"""
+        database = self._get_db()
+        cancel_event = self._cancel_events[campaign_id]
+
+        resumed = campaign is not None
+        if campaign is None:
+            campaign = await self._claim_campaign(campaign_id)
+
+        if not campaign:
+            # Cancelled before the job picked it up
+            await database.campaigns.update_one(
+                {"_id": ObjectId(campaign_id), "status": CampaignStatus.CANCELLING.value},
+                {"$set": {"status": CampaignStatus.CANCELLED.value, "completed_at": datetime.utcnow()}}
+            )
+            logger.warning(f"Campaign {campaign_id} is not queued, not starting")
+            return
+
+        # Every contact below the checkpoint has its result persisted: the
+        # writer only reports stored results. Results flush out of order under
+        # concurrency, so track acknowledged seqs above it.
+        checkpoint = campaign.get("checkpoint_seq", 0)
+        acknowledged = set()
+        lease_lost = False
+
+        # Adaptive pacing resumes from the last rate it settled on
+        rate_controller = AimdRateController(start_rate=campaign.get("current_rate")) \
+            if campaign.get("adaptive") else None
+
+        async def record_progress(batch: List[Dict]):
+            nonlocal checkpoint, lease_lost
+
+            acknowledged.update(message["campaign_seq"] for message in batch if "campaign_seq" in message)
+            while checkpoint in acknowledged:
+                acknowledged.discard(checkpoint)
+                checkpoint += 1
+
+            successful = sum(1 for message in batch if message["status"] == "sent")
+            now = datetime.utcnow()
+            progress = {"updated_at": now, "heartbeat_at": now}
+            if rate_controller:
+                progress["current_rate"] = rate_controller.current_rate
+            updated = await database.campaigns.find_one_and_update(
+                {"_id": ObjectId(campaign_id)},
+                {
+                    "$inc": {
+                        "processed": len(batch),
+                        "successful": successful,
+                        "failed": len(batch) - successful
+                    },
+                    "$max": {"checkpoint_seq": checkpoint},
+                    "$set": progress
+                },
+                projection={"status": 1, "worker_id": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            # Cancellation may have been requested through another worker process
+            if updated and updated.get("status") == CampaignStatus.CANCELLING.value:
+                cancel_event.set()
+            if updated and updated.get("worker_id") != self.worker_id:
+                lease_lost = True
+                cancel_event.set()
+
+        async def heartbeat():
+            nonlocal lease_lost
+            while True:
+                await asyncio.sleep(CAMPAIGN_HEARTBEAT_INTERVAL)
+                result = await database.campaigns.update_one(
+                    {"_id": ObjectId(campaign_id), "worker_id": self.worker_id},
+                    {"$set": {"heartbeat_at": datetime.utcnow()}}
+                )
+                if result.matched_count == 0:
+                    # Another worker took over (we stalled past the lease); stop sending
+                    lease_lost = True
+                    cancel_event.set()
+                    return
+
+        heartbeat_task = asyncio.create_task(heartbeat())
+        try:
+            await suppression_list.refresh_if_stale()
+            logger.info(f"🚀 Campaign {campaign_id} {'resumed from contact ' + str(checkpoint) if resumed else 'started'}")
+            await self.bulk_sender.send_bulk_messages(
+                message_template=campaign["message_template"],
+                contacts=self._iter_campaign_contacts(
+                    campaign_id, checkpoint, skip_sent=resumed, on_skip=acknowledged.update
+                ),
+                delay=campaign.get("delay", 1.0),
+                concurrency=campaign.get("concurrency"),
+                total=campaign["total"],
+                campaign_id=campaign_id,
+                cancel_event=cancel_event,
+                on_flush=record_progress,
+                collect_results=False,
+                rate_controller=rate_controller
+            )
+
+            if lease_lost:
+                logger.warning(f"Campaign {campaign_id} lease lost, another worker continues it")
+                return
+
+            final_status = CampaignStatus.CANCELLED if cancel_event.is_set() else CampaignStatus.COMPLETED
+            await database.campaigns.update_one(
+                {"_id": ObjectId(campaign_id), "worker_id": self.worker_id},
+                {"$set": {
+                    "status": final_status.value,
+                    "completed_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+            logger.info(f"🏁 Campaign {campaign_id} {final_status.value}")
+
+        except asyncio.CancelledError:
+            logger.warning(f"Campaign {campaign_id} interrupted by shutdown at contact {checkpoint}")
+            raise
+        except Exception as e:
+            logger.error(f"Campaign {campaign_id} failed: {e}", exc_info=True)
+            await database.campaigns.update_one(
+                {"_id": ObjectId(campaign_id)},
+                {"$set": {
+                    "status": CampaignStatus.FAILED.value,
+                    "error": str(e),
+                    "completed_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+        finally:
+            heartbeat_task.cancel()
+
+    async def resume_stale_campaigns(self) -> int:
+        """Claim and restart campaigns whose worker stopped heartbeating"""
+        database = self._get_db()
+        cutoff = datetime.utcnow() - timedelta(seconds=CAMPAIGN_LEASE_TIMEOUT)
+        resumed = 0
+
+        # Interrupted imports can't be resumed - the upload is gone
+        await database.campaigns.update_many(
+            {"status": CampaignStatus.IMPORTING.value, "updated_at": {"$lt": cutoff}},
+            {"$set": {
+                "status": CampaignStatus.FAILED.value,
+                "error": "Contact import interrupted",
+                "completed_at": datetime.utcnow()
+            }}
+        )
+        await database.campaigns.update_many(
+            {"status": CampaignStatus.CANCELLING.value, "heartbeat_at": {"$lt": cutoff}},
+            {"$set": {"status": CampaignStatus.CANCELLED.value, "completed_at": datetime.utcnow()}}
+        )
+
+        while True:
+            now = datetime.utcnow()
+            campaign = await database.campaigns.find_one_and_update(
+                {
+                    "status": {"$in": [CampaignStatus.QUEUED.value, CampaignStatus.RUNNING.value]},
+                    "heartbeat_at": {"$lt": cutoff}
+                },
+                {
+                    "$set": {
+                        "status": CampaignStatus.RUNNING.value,
+                        "worker_id": self.worker_id,
+                        "heartbeat_at": now,
+                        "updated_at": now
+                    },
+                    "$inc": {"resume_count": 1}
+                },
+                sort=[("created_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if not campaign:
+                break
+
+            campaign.setdefault("started_at", now)
+            self.start_campaign(str(campaign["_id"]), campaign)
+            resumed += 1
+
+        if resumed:
+            logger.info(f"♻️ Resumed {resumed} interrupted campaigns")
+        return resumed
+
+    async def _watch_stale_campaigns(self):
+        """Periodically pick up campaigns orphaned by restarted workers"""
+        while True:
+            try:
+                await self.resume_stale_campaigns()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error resuming campaigns: {e}", exc_info=True)
+            await asyncio.sleep(CAMPAIGN_HEARTBEAT_INTERVAL)
+
+    async def start(self):
+        """Start resuming interrupted campaigns (indexes come from app.database.indexes)"""
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch_stale_campaigns())
+
+    async def get_campaign(self, campaign_id: str) -> Optional[Dict]:
+        """Get campaign status and progress counters"""
+        if not ObjectId.is_valid(campaign_id):
+            return None
+
+        campaign = await self._get_db().campaigns.find_one({"_id": ObjectId(campaign_id)})
+        return self._serialize(campaign) if campaign else None
+
+    async def list_campaigns(self, limit: int = 20, skip: int = 0) -> List[Dict]:
+        """List campaigns, newest first"""
+        cursor = self._get_db().campaigns.find(
+            {}, {"invalid_contacts": 0}
+        ).sort("created_at", -1).skip(skip).limit(limit)
+
+        campaigns = await cursor.to_list(length=limit)
+        return [self._serialize(campaign) for campaign in campaigns]
+
+    async def get_campaign_results(self, campaign_id: str, status: Optional[str] = None,
+                                   limit: int = 100, skip: int = 0) -> Dict:
+        """Per-contact send results for a campaign (paginated)"""
+        database = self._get_db()
+        query = {"campaign_id": campaign_id}
+        if status:
+            query["status"] = status
+
+        cursor = database.messages.find(
+            query,
+            {
+                "_id": 0, "user_id": 1, "user_name": 1, "status": 1,
+                "message_id": 1, "error_reason": 1, "timestamp": 1
+            }
+        ).sort("timestamp", 1).skip(skip).limit(limit)
+
+        results = await cursor.to_list(length=limit)
+        total = await database.messages.count_documents(query)
+
+        return {
+            "campaign_id": campaign_id,
+            "results": results,
+            "total": total,
+            "limit": limit,
+            "skip": skip
+        }
+
+    async def cancel_campaign(self, campaign_id: str) -> Optional[Dict]:
+        """Request cancellation; in-flight sends finish, no new sends start"""
+        if not ObjectId.is_valid(campaign_id):
+            return None
+
+        database = self._get_db()
+        active = [CampaignStatus.QUEUED.value, CampaignStatus.RUNNING.value]
+
+        campaign = await database.campaigns.find_one_and_update(
+            {"_id": ObjectId(campaign_id), "status": {"$in": active}},
+            {"$set": {"status": CampaignStatus.CANCELLING.value, "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+
+        if campaign_id in self._cancel_events:
+            self._cancel_events[campaign_id].set()
+
+        if not campaign:
+            return await self.get_campaign(campaign_id)
+
+        logger.info(f"🛑 Cancellation requested for campaign {campaign_id}")
+        return self._serialize(campaign)
+
+    async def shutdown(self):
+        """Stop running campaign jobs and release them for other workers"""
+        if self._watcher:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+        # Expire our leases so a restarted worker resumes right away
+        try:
+            await self._get_db().campaigns.update_many(
+                {
+                    "worker_id": self.worker_id,
+                    "status": {"$in": [CampaignStatus.RUNNING.value, CampaignStatus.CANCELLING.value]}
+                },
+                {"$set": {"heartbeat_at": datetime(1970, 1, 1)}}
+            )
+        except Exception as e:
+            logger.error(f"Error releasing campaign leases: {e}")
+
+
+# Create global instance
+campaign_service = CampaignService()
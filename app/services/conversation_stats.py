@@ -0,0 +1,201 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.database.mongodb import db
+from app.utils.logger import logger
+
+
+class ConversationStatsService:
+    """
+    Per-conversation message counters in `conversation_stats` (_id = user_id).
+
+    Counters are bumped on every stored message, so reading stats is one
+    find_one. A conversation whose counters don't exist yet (stored before
+    this collection) is backfilled on first read with a single $facet
+    aggregation. Increments only create a stats document for conversations
+    that were just created, so a partial count is never mistaken for a full one.
+
+    A backfill first inserts a placeholder holding `counted_from`, an
+    ObjectId taken before its aggregation. Messages with a smaller _id are
+    counted by the aggregation and messages from `counted_from` on by the
+    increments, so messages stored while a backfill runs are counted once.
+    """
+
+    def _get_db(self):
+        """Get database instance"""
+        if db.async_db is None:
+            raise RuntimeError("Database not connected")
+        return db.async_db
+
+    def _increment(self, messages: Iterable[Dict[str, Any]]) -> Dict:
+        """Update document adding a user's messages to their counters"""
+        inc: Dict[str, int] = {}
+        first: Optional[datetime] = None
+        last: Optional[datetime] = None
+
+        for message in messages:
+            inc["total_messages"] = inc.get("total_messages", 0) + 1
+            direction_key = f"{message['direction']}_messages"
+            inc[direction_key] = inc.get(direction_key, 0) + 1
+            type_key = f"message_types.{message.get('message_type') or 'text'}"
+            inc[type_key] = inc.get(type_key, 0) + 1
+
+            timestamp = message["timestamp"]
+            first = timestamp if first is None or timestamp < first else first
+            last = timestamp if last is None or timestamp > last else last
+
+        return {
+            "$inc": inc,
+            "$min": {"first_message_date": first},
+            "$max": {"last_message_date": last},
+            "$set": {"updated_at": datetime.utcnow()}
+        }
+
+    @staticmethod
+    def _counts(user_id: str, messages: List[Dict[str, Any]]) -> Dict:
+        """Filter matching counters that don't already cover these messages via a backfill"""
+        message_ids = [message["_id"] for message in messages if isinstance(message.get("_id"), ObjectId)]
+        if not message_ids:
+            return {"_id": user_id}
+        return {"_id": user_id, "$or": [
+            {"counted_from": {"$exists": False}},
+            {"counted_from": {"$lte": min(message_ids)}}
+        ]}
+
+    async def record(self, message: Dict[str, Any], conversation_created: bool = False):
+        """Count one stored message"""
+        try:
+            await self._get_db().conversation_stats.update_one(
+                self._counts(message["user_id"], [message]),
+                self._increment([message]),
+                upsert=conversation_created
+            )
+        except DuplicateKeyError:
+            # A backfill that started after this insert already counted it
+            pass
+        except Exception as e:
+            logger.error(f"Error updating conversation stats: {e}", exc_info=True)
+
+    async def record_batch(self, messages: List[Dict[str, Any]], created_users: Set[str]):
+        """Count a batch of stored messages with one bulk_write"""
+        by_user: Dict[str, List[Dict]] = {}
+        for message in messages:
+            by_user.setdefault(message["user_id"], []).append(message)
+
+        if not by_user:
+            return
+
+        try:
+            await self._get_db().conversation_stats.bulk_write([
+                UpdateOne(self._counts(user_id, user_messages), self._increment(user_messages),
+                          upsert=user_id in created_users)
+                for user_id, user_messages in by_user.items()
+            ], ordered=False)
+        except BulkWriteError as e:
+            errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != 11000]
+            if errors:
+                logger.error(f"Error updating conversation stats for batch: {errors[:3]}")
+        except Exception as e:
+            logger.error(f"Error updating conversation stats for batch: {e}", exc_info=True)
+
+    async def _aggregate(self, user_id: str, before: ObjectId) -> Dict:
+        """Counters for a conversation's messages stored before `before`, in one aggregation"""
+        pipeline = [
+            {"$match": {"user_id": user_id, "_id": {"$lt": before}}},
+            {"$facet": {
+                "totals": [{"$group": {
+                    "_id": None,
+                    "total_messages": {"$sum": 1},
+                    "inbound_messages": {"$sum": {"$cond": [{"$eq": ["$direction", "inbound"]}, 1, 0]}},
+                    "outbound_messages": {"$sum": {"$cond": [{"$eq": ["$direction", "outbound"]}, 1, 0]}},
+                    "first_message_date": {"$min": "$timestamp"},
+                    "last_message_date": {"$max": "$timestamp"}
+                }}],
+                "types": [{"$group": {"_id": "$message_type", "count": {"$sum": 1}}}]
+            }}
+        ]
+        result = (await self._get_db().messages.aggregate(pipeline).to_list(1))[0]
+        totals = result["totals"][0] if result["totals"] else {}
+
+        return {
+            "total_messages": totals.get("total_messages", 0),
+            "inbound_messages": totals.get("inbound_messages", 0),
+            "outbound_messages": totals.get("outbound_messages", 0),
+            "first_message_date": totals.get("first_message_date"),
+            "last_message_date": totals.get("last_message_date"),
+            "message_types": {item["_id"]: item["count"] for item in result["types"] if item["_id"]}
+        }
+
+    async def backfill(self, user_id: str) -> Dict:
+        """Build a conversation's counters from its messages, counting concurrent messages once"""
+        database = self._get_db()
+        counted_from = ObjectId()
+        placeholder = await database.conversation_stats.update_one(
+            {"_id": user_id},
+            {"$setOnInsert": {"counted_from": counted_from, "backfilling": True}},
+            upsert=True
+        )
+        if placeholder.upserted_id is None:
+            # Counters exist or another backfill is building them: report without writing
+            existing = await database.conversation_stats.find_one({"_id": user_id})
+            if existing is not None and not existing.get("backfilling"):
+                return existing
+            return await self._aggregate(user_id, ObjectId())
+
+        stats = await self._aggregate(user_id, counted_from)
+        if not stats["total_messages"]:
+            # Nothing to count; keep the placeholder only if a new message was counted meanwhile
+            await database.conversation_stats.delete_one(
+                {"_id": user_id, "backfilling": True, "total_messages": {"$exists": False}}
+            )
+            await database.conversation_stats.update_one({"_id": user_id}, {"$unset": {"backfilling": ""}})
+            return await database.conversation_stats.find_one({"_id": user_id}) or stats
+
+        # Add the snapshot to whatever increments arrived since the placeholder
+        inc = {
+            "total_messages": stats["total_messages"],
+            "inbound_messages": stats["inbound_messages"],
+            "outbound_messages": stats["outbound_messages"],
+            **{f"message_types.{name}": count for name, count in stats["message_types"].items()}
+        }
+        await database.conversation_stats.update_one({"_id": user_id}, {
+            "$inc": inc,
+            "$min": {"first_message_date": stats["first_message_date"]},
+            "$max": {"last_message_date": stats["last_message_date"]},
+            "$set": {"updated_at": datetime.utcnow()},
+            "$unset": {"backfilling": ""}
+        })
+        logger.info(f"📊 Backfilled stats for {user_id}: {stats['total_messages']} messages")
+        return await database.conversation_stats.find_one({"_id": user_id})
+
+    async def get(self, user_id: str) -> Dict:
+        """Stats for one conversation - one read, or one aggregation the first time"""
+        try:
+            stats = await self._get_db().conversation_stats.find_one({"_id": user_id})
+            if stats is None or stats.get("backfilling"):
+                stats = await self.backfill(user_id)
+
+            return {
+                "user_id": user_id,
+                "total_messages": stats.get("total_messages", 0),
+                "inbound_messages": stats.get("inbound_messages", 0),
+                "outbound_messages": stats.get("outbound_messages", 0),
+                "first_message_date": stats.get("first_message_date"),
+                "last_message_date": stats.get("last_message_date"),
+                "message_types": stats.get("message_types", {})
+            }
+        except Exception as e:
+            logger.error(f"Error getting conversation stats: {e}", exc_info=True)
+            return {}
+
+    async def invalidate(self, user_ids: Optional[List[str]] = None) -> int:
+        """Drop counters (all, or for some users) so they are rebuilt on next read"""
+        query = {"_id": {"$in": user_ids}} if user_ids is not None else {}
+        result = await self._get_db().conversation_stats.delete_many(query)
+        return result.deleted_count
+
+
+# Create global instance
+conversation_stats = ConversationStatsService()
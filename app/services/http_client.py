@@ -0,0 +1,47 @@
+import httpx
+from typing import Optional
+from app.config import (
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_TIMEOUT
+)
+from app.utils.logger import logger
+
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared pooled async HTTP client (created on first use)"""
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                connect=HTTP_CONNECT_TIMEOUT,
+                read=HTTP_READ_TIMEOUT,
+                write=HTTP_READ_TIMEOUT,
+                pool=HTTP_POOL_TIMEOUT
+            )
+        )
+        logger.info(
+            f"🌐 HTTP client pool created (max {HTTP_MAX_CONNECTIONS} connections, "
+            f"{HTTP_MAX_KEEPALIVE_CONNECTIONS} keep-alive)"
+        )
+
+    return _client
+
+
+async def close_http_client():
+    """Close the shared HTTP client and release pooled connections"""
+    global _client
+
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("🔌 HTTP client pool closed")
+
+    _client = None
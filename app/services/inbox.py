@@ -1,9 +1,17 @@
+import re
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from app.database.mongodb import db
-from app.models.message import Message, MessageStatus, MessageDirection
+from app.services.conversation_stats import conversation_stats
+from app.models.message import (
+    Message, MessageStatus, MessageDirection, STATUS_PROGRESSION, previous_statuses, is_status_advance
+)
+from app.utils.contact_search import search_keys
 from app.utils.logger import logger
+from app.utils.pagination import Cursor, fetch_page
 
 
 class InboxService:
@@ -19,47 +27,79 @@ class InboxService:
             raise RuntimeError("Database not connected. Ensure app startup completed.")
         return db.async_db
     
-    async def save_message(self, message_data: Dict[str, Any]) -> Optional[str]:
-        """Save message to database"""
+    async def save_message(self, message_data: Dict[str, Any], trusted: bool = False,
+                           raise_errors: bool = False) -> Optional[str]:
+        """
+        Save message to database. Returns None for errors and already-stored message ids.
+        trusted=True stores message_data as is: only for documents built internally
+        in the final stored shape (e.g. webhook_parser.inbound_message_document).
+        raise_errors=True re-raises storage errors (duplicates still return None)
+        so a queued webhook can be retried.
+        """
         try:
             database = self._get_db()
-            message = Message(**message_data)
             
-            # Convert to dict and handle ObjectId
-            message_dict = message.model_dump(by_alias=True, exclude_none=True)
-            if '_id' in message_dict and message_dict['_id'] is None:
-                del message_dict['_id']
+            if trusted:
+                message_dict = message_data
+            else:
+                message = Message(**message_data)
+                
+                # Convert to dict and handle ObjectId
+                message_dict = message.model_dump(by_alias=True, exclude_none=True)
+                if '_id' in message_dict and message_dict['_id'] is None:
+                    del message_dict['_id']
             
             result = await database.messages.insert_one(message_dict)
             message_id = str(result.inserted_id)
             
-            # Update conversation
-            await self._update_conversation(message)
+            # Update conversation and its counters
+            created = await self._update_conversation(message_dict)
+            await conversation_stats.record(message_dict, conversation_created=created)
             
-            logger.info(f"Message saved for user {message.user_id}")
+            logger.info(f"Message saved for user {message_dict['user_id']}")
             return message_id
             
+        except DuplicateKeyError:
+            # Redelivered webhook: the conversation counters were already bumped
+            logger.info(f"♻️ Duplicate message {message_data.get('message_id')} ignored")
+            return None
         except Exception as e:
             logger.error(f"Error saving message: {e}", exc_info=True)
+            if raise_errors:
+                raise
             return None
     
-    async def update_message_status(self, message_id: str, status: str, 
-                                  error_reason: Optional[str] = None) -> bool:
-        """Update message status (sent/delivered/read/failed)"""
+    def _status_update(self, message_id: str, status: str, error_reason: Optional[str] = None,
+                       timestamp: Optional[int] = None) -> Tuple[Dict, Dict]:
+        """
+        Filter and update document for a forward-only status transition.
+        The filter only matches messages in an earlier status, so stale and
+        duplicate updates match nothing and write nothing.
+        """
+        now = datetime.utcnow()
+        event_time = datetime.utcfromtimestamp(timestamp) if timestamp else now
+        update: Dict[str, Any] = {
+            "$set": {"status": status, f"{status}_at": event_time, "updated_at": now}
+        }
+        if error_reason:
+            update["$set"]["error_reason"] = error_reason
+
+        # A skipped step (e.g. read without delivered) still implies it happened
+        if status in STATUS_PROGRESSION:
+            implied = STATUS_PROGRESSION[1:STATUS_PROGRESSION.index(status)]
+            if implied:
+                update["$min"] = {f"{earlier}_at": event_time for earlier in implied}
+
+        return {"message_id": message_id, "status": {"$in": previous_statuses(status)}}, update
+
+    async def update_message_status(self, message_id: str, status: str,
+                                  error_reason: Optional[str] = None,
+                                  timestamp: Optional[int] = None) -> bool:
+        """Update message status (sent/delivered/read/failed); never moves backwards"""
         try:
             database = self._get_db()
-            update_data = {
-                "status": status,
-                "updated_at": datetime.utcnow()
-            }
-            
-            if error_reason:
-                update_data["error_reason"] = error_reason
-            
-            result = await database.messages.update_one(
-                {"message_id": message_id},
-                {"$set": update_data}
-            )
+            query, update = self._status_update(message_id, status, error_reason, timestamp)
+            result = await database.messages.update_one(query, update)
             
             if result.modified_count > 0:
                 logger.info(f"Message {message_id} status updated to {status}")
@@ -71,6 +111,64 @@ class InboxService:
             logger.error(f"Error updating message status: {e}", exc_info=True)
             return False
     
+    async def update_message_statuses(self, updates: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Apply many status updates in one unordered bulk_write.
+        Each update is {"message_id", "status", "error_reason"?, "timestamp"?}.
+        Current statuses are read first so only forward transitions are sent
+        to the database. Returns {"applied": [...], "unmatched": [...]}:
+        applied updates are the ones the conditional write actually changed,
+        unmatched updates name a message that isn't stored (yet), or could
+        not be written at all, and are worth retrying.
+        """
+        if not updates:
+            return {"applied": [], "unmatched": []}
+        
+        try:
+            database = self._get_db()
+            cursor = database.messages.find(
+                {"message_id": {"$in": [update["message_id"] for update in updates]}},
+                {"message_id": 1, "status": 1, "_id": 0}
+            )
+            current = {doc["message_id"]: doc.get("status") async for doc in cursor}
+
+            unmatched = [update for update in updates if update["message_id"] not in current]
+            applied = [
+                update for update in updates
+                if update["message_id"] in current
+                and is_status_advance(current[update["message_id"]], update["status"])
+            ]
+            if not applied:
+                return {"applied": [], "unmatched": unmatched}
+
+            # Tag this batch's writes so a concurrent writer that won the race
+            # for some messages can be told apart from our own changes
+            write_id = ObjectId()
+            operations = []
+            for update in applied:
+                query, change = self._status_update(update["message_id"], update["status"],
+                                                    update.get("error_reason"), update.get("timestamp"))
+                change["$set"]["status_write_id"] = write_id
+                operations.append(UpdateOne(query, change))
+            result = await database.messages.bulk_write(operations, ordered=False)
+
+            if result.modified_count < len(applied):
+                written = set(await database.messages.distinct(
+                    "message_id",
+                    {"message_id": {"$in": [update["message_id"] for update in applied]},
+                     "status_write_id": write_id}
+                ))
+                applied = [update for update in applied if update["message_id"] in written]
+
+            logger.info(f"Applied {len(applied)}/{len(updates)} status updates "
+                        f"({len(updates) - len(applied) - len(unmatched)} stale or duplicate, "
+                        f"{len(unmatched)} for unknown messages)")
+            return {"applied": applied, "unmatched": unmatched}
+            
+        except Exception as e:
+            logger.error(f"Error applying status updates: {e}", exc_info=True)
+            return {"applied": [], "unmatched": updates}
+    
     async def update_user_name(self, user_id: str, user_name: str) -> bool:
         """
         Update username for a conversation and all associated messages
@@ -83,6 +181,7 @@ class InboxService:
                 {"user_id": user_id},
                 {"$set": {
                     "user_name": user_name,
+                    "search_keys": search_keys(user_id, user_name),
                     "updated_at": datetime.utcnow()
                 }}
             )
@@ -104,6 +203,109 @@ class InboxService:
             logger.error(f"Error updating username: {e}", exc_info=True)
             return False
     
+    async def backfill_search_keys(self, batch_size: int = 1000) -> int:
+        """Add search_keys to conversations stored before they existed"""
+        try:
+            database = self._get_db()
+            updated = 0
+            
+            while True:
+                batch = await database.conversations.find(
+                    {"search_keys": {"$exists": False}},
+                    {"user_id": 1, "user_name": 1}
+                ).limit(batch_size).to_list(length=batch_size)
+                if not batch:
+                    break
+                
+                await database.conversations.bulk_write([
+                    UpdateOne(
+                        {"_id": conv["_id"]},
+                        {"$set": {"search_keys": search_keys(conv.get("user_id", ""), conv.get("user_name"))}}
+                    )
+                    for conv in batch
+                ], ordered=False)
+                updated += len(batch)
+            
+            if updated:
+                logger.info(f"🔎 Backfilled search keys for {updated} conversations")
+            return updated
+            
+        except Exception as e:
+            logger.error(f"Error backfilling search keys: {e}", exc_info=True)
+            return 0
+    
+    async def dedup_message_ids(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Remove duplicate message_id documents stored before the unique index,
+        keeping the first one stored. Affected conversations get total_messages
+        recounted from their messages, and stats counters rebuilt on next read.
+        unread_count counts the newest inbound messages stored since the
+        conversation was last read, so it drops by the deleted copies among
+        its newest unread_count inbound documents.
+        """
+        database = self._get_db()
+        pipeline = [
+            {"$match": {"message_id": {"$type": "string"}}},
+            {"$sort": {"_id": 1}},
+            {"$group": {
+                "_id": "$message_id",
+                "ids": {"$push": "$_id"},
+                "user_id": {"$first": "$user_id"},
+                "count": {"$sum": 1}
+            }},
+            {"$match": {"count": {"$gt": 1}}}
+        ]
+        groups = await database.messages.aggregate(pipeline, allowDiskUse=True).to_list(None)
+        
+        extra_ids = [doc_id for group in groups for doc_id in group["ids"][1:]]
+        removed_by_user: Dict[str, int] = {}
+        for group in groups:
+            removed_by_user[group["user_id"]] = removed_by_user.get(group["user_id"], 0) + group["count"] - 1
+        
+        result = {"duplicate_message_ids": len(groups), "documents": len(extra_ids), "deleted": 0}
+        if dry_run or not extra_ids:
+            return result
+        
+        users = list(removed_by_user)
+        extra = set(extra_ids)
+        unread: Dict[str, int] = {}
+        async for conversation in database.conversations.find(
+            {"user_id": {"$in": users}, "unread_count": {"$gt": 0}}, {"user_id": 1, "unread_count": 1}
+        ):
+            newest_inbound = database.messages.find(
+                {"user_id": conversation["user_id"], "direction": MessageDirection.INBOUND.value}, {"_id": 1}
+            ).sort("_id", -1).limit(conversation["unread_count"])
+            removed = sum([1 async for doc in newest_inbound if doc["_id"] in extra])
+            if removed:
+                unread[conversation["user_id"]] = max(conversation["unread_count"] - removed, 0)
+
+        for start in range(0, len(extra_ids), 1000):
+            deleted = await database.messages.delete_many({"_id": {"$in": extra_ids[start:start + 1000]}})
+            result["deleted"] += deleted.deleted_count
+
+        totals = await database.messages.aggregate([
+            {"$match": {"user_id": {"$in": users}}},
+            {"$group": {"_id": "$user_id", "total": {"$sum": 1}}}
+        ]).to_list(None)
+        counters: Dict[str, Dict[str, int]] = {
+            doc["_id"]: {"total_messages": doc["total"]} for doc in totals
+        }
+        for user_id, unread_count in unread.items():
+            counters.setdefault(user_id, {})["unread_count"] = unread_count
+
+        if counters:
+            await database.conversations.bulk_write([
+                UpdateOne({"user_id": user_id}, {"$set": fields})
+                for user_id, fields in counters.items()
+            ], ordered=False)
+        await conversation_stats.invalidate(list(removed_by_user))
+        
+        logger.info(
+            f"🧹 Removed {result['deleted']} duplicate messages "
+            f"({len(groups)} message ids, {len(removed_by_user)} conversations)"
+        )
+        return result
+    
     async def get_user_messages(self, user_id: str, limit: int = 100, 
                               skip: int = 0) -> List[Dict]:
         """Get messages for a specific user (BOTH inbound and outbound)"""
@@ -161,6 +363,33 @@ class InboxService:
             logger.error(f"Error fetching messages: {e}", exc_info=True)
             return []
     
+    async def get_messages_page(self, user_id: str, limit: int = 100, cursor: Optional[Cursor] = None,
+                                skip: int = 0, days: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Page of a user's messages, newest first, keyed on (timestamp, _id).
+        Returns {"items", "next_cursor", "prev_cursor"}; see utils.pagination.fetch_page.
+        """
+        try:
+            database = self._get_db()
+            
+            query = {"user_id": user_id}
+            if days:
+                cutoff_date = datetime.utcnow() - timedelta(days=days)
+                query["timestamp"] = {"$gte": cutoff_date}
+            
+            page = await fetch_page(database.messages, query, "timestamp", limit, cursor=cursor, skip=skip)
+            
+            for msg in page["items"]:
+                msg['_id'] = str(msg['_id'])
+            
+            logger.info(f"Fetched {len(page['items'])} messages for {user_id}" +
+                       (f" (last {days} days)" if days else ""))
+            return page
+            
+        except Exception as e:
+            logger.error(f"Error fetching messages page: {e}", exc_info=True)
+            return {"items": [], "next_cursor": None, "prev_cursor": None}
+    
     async def get_messages_by_date_range(self, user_id: str, 
                                         start_date: Optional[datetime] = None,
                                         end_date: Optional[datetime] = None,
@@ -217,6 +446,28 @@ class InboxService:
             logger.error(f"Error counting messages: {e}")
             return 0
     
+    async def get_conversations_page(self, limit: int = 50, cursor: Optional[Cursor] = None,
+                                     skip: int = 0, archived: bool = False) -> Dict[str, Any]:
+        """
+        Page of conversations, most recent first, keyed on (last_message_timestamp, _id).
+        Returns {"items", "next_cursor", "prev_cursor"}; see utils.pagination.fetch_page.
+        """
+        try:
+            database = self._get_db()
+            page = await fetch_page(
+                database.conversations, {"is_archived": archived}, "last_message_timestamp",
+                limit, cursor=cursor, skip=skip, projection={"search_keys": 0}
+            )
+            
+            for conv in page["items"]:
+                conv['_id'] = str(conv['_id'])
+            
+            return page
+            
+        except Exception as e:
+            logger.error(f"Error fetching conversations page: {e}", exc_info=True)
+            return {"items": [], "next_cursor": None, "prev_cursor": None}
+    
     async def get_conversations(self, limit: int = 50, skip: int = 0, 
                               archived: bool = False) -> List[Dict]:
         """Get all conversations"""
@@ -244,7 +495,7 @@ class InboxService:
         """Get conversation metadata by user_id"""
         try:
             database = self._get_db()
-            conversation = await database.conversations.find_one({"user_id": user_id})
+            conversation = await database.conversations.find_one({"user_id": user_id}, {"search_keys": 0})
             
             if conversation:
                 conversation['_id'] = str(conversation['_id'])
@@ -279,126 +530,108 @@ class InboxService:
             return False
     
     async def search_messages(self, query: str, user_id: Optional[str] = None,
-                            limit: int = 50) -> List[Dict]:
-        """Search messages by content"""
+                            limit: int = 50, skip: int = 0, sort: str = "relevance",
+                            cursor: Optional[Cursor] = None) -> Dict[str, Any]:
+        """
+        Full-text search over message bodies using the `messages` text index.
+        
+        Words are matched as whole tokens, case- and diacritic-insensitive;
+        "quoted phrases" and -excluded words follow $text syntax.
+        sort="relevance" ranks by text score and pages with skip;
+        sort="recent" orders newest first and pages with keyset cursors.
+        Returns {"items", "has_more", "next_cursor", "prev_cursor"}.
+        """
+        empty = {"items": [], "has_more": False, "next_cursor": None, "prev_cursor": None}
         try:
             database = self._get_db()
-            search_filter = {"body": {"$regex": query, "$options": "i"}}
+            search_filter: Dict[str, Any] = {"$text": {"$search": query}}
             if user_id:
                 search_filter["user_id"] = user_id
             
-            cursor = database.messages.find(search_filter).sort(
-                "timestamp", -1
-            ).limit(limit)
-            
-            messages = await cursor.to_list(length=limit)
+            try:
+                if sort == "recent":
+                    page = await fetch_page(database.messages, search_filter, "timestamp", limit,
+                                            cursor=cursor, skip=skip)
+                    page["has_more"] = page["next_cursor"] is not None
+                else:
+                    score = {"score": {"$meta": "textScore"}}
+                    messages = await database.messages.find(search_filter, score).sort(
+                        [("score", {"$meta": "textScore"}), ("timestamp", -1)]
+                    ).skip(skip).limit(limit + 1).to_list(length=limit + 1)
+                    page = {**empty, "items": messages[:limit], "has_more": len(messages) > limit}
+            except OperationFailure as e:
+                if e.code != 27:  # IndexNotFound: text index not built (yet)
+                    raise
+                logger.warning("⚠️ No text index on messages - falling back to a regex scan")
+                search_filter = {"body": {"$regex": re.escape(query), "$options": "i"}}
+                if user_id:
+                    search_filter["user_id"] = user_id
+                page = await fetch_page(database.messages, search_filter, "timestamp", limit,
+                                        cursor=cursor, skip=skip)
+                page["has_more"] = page["next_cursor"] is not None
             
             # Convert ObjectId to string
-            for msg in messages:
+            for msg in page["items"]:
                 if '_id' in msg:
                     msg['_id'] = str(msg['_id'])
             
-            return messages
+            return page
             
         except Exception as e:
             logger.error(f"Error searching messages: {e}", exc_info=True)
-            return []
+            return empty
     
     async def get_conversation_stats(self, user_id: str) -> Dict:
-        """Get conversation statistics"""
-        try:
-            database = self._get_db()
-            
-            # Total messages
-            total_messages = await database.messages.count_documents({"user_id": user_id})
-            
-            # Inbound messages
-            inbound_count = await database.messages.count_documents({
-                "user_id": user_id,
-                "direction": "inbound"
-            })
-            
-            # Outbound messages
-            outbound_count = await database.messages.count_documents({
-                "user_id": user_id,
-                "direction": "outbound"
-            })
-            
-            # First and last message dates
-            first_message = await database.messages.find_one(
-                {"user_id": user_id},
-                sort=[("timestamp", 1)]
-            )
-            
-            last_message = await database.messages.find_one(
-                {"user_id": user_id},
-                sort=[("timestamp", -1)]
-            )
-            
-            # Message types breakdown
-            pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$group": {
-                    "_id": "$message_type",
-                    "count": {"$sum": 1}
-                }}
-            ]
-            type_breakdown = await database.messages.aggregate(pipeline).to_list(None)
-            
-            return {
-                "user_id": user_id,
-                "total_messages": total_messages,
-                "inbound_messages": inbound_count,
-                "outbound_messages": outbound_count,
-                "first_message_date": first_message.get("timestamp") if first_message else None,
-                "last_message_date": last_message.get("timestamp") if last_message else None,
-                "message_types": {item["_id"]: item["count"] for item in type_breakdown}
-            }
-            
-        except Exception as e:
-            logger.error(f"Error getting conversation stats: {e}")
-            return {}
+        """Get conversation statistics (served from incremental counters)"""
+        return await conversation_stats.get(user_id)
     
-    async def _update_conversation(self, message: Message):
-        """Update conversation when new message arrives"""
+    async def _update_conversation(self, message: Dict[str, Any]) -> bool:
+        """
+        Update conversation when new message arrives (message is the stored document).
+        Returns True if this message created the conversation.
+        """
         try:
             database = self._get_db()
             
             update_ops = {
                 "$set": {
-                    "user_id": message.user_id,
-                    "last_message": message.body[:500],
-                    "last_message_timestamp": message.timestamp,
-                    "last_message_direction": message.direction,
+                    "user_id": message["user_id"],
+                    "last_message": message["body"][:500],
+                    "last_message_timestamp": message["timestamp"],
+                    "last_message_direction": message["direction"],
                     "updated_at": datetime.utcnow()
                 },
                 "$setOnInsert": {
                     "created_at": datetime.utcnow(),
                     "is_archived": False,
-                    "labels": [],
-                    "unread_count": 0,
-                    "total_messages": 0
+                    "labels": []
                 }
             }
             
-            # Add username if provided
-            if hasattr(message, 'user_name') and message.user_name:
-                update_ops["$set"]["user_name"] = message.user_name
+            # Add username if provided; lookup keys follow the stored name
+            if message.get("user_name"):
+                update_ops["$set"]["user_name"] = message["user_name"]
+                update_ops["$set"]["search_keys"] = search_keys(message["user_id"], message["user_name"])
+            else:
+                update_ops["$setOnInsert"]["search_keys"] = search_keys(message["user_id"])
             
             # Increment counters
-            if message.direction == MessageDirection.INBOUND:
+            if message["direction"] == MessageDirection.INBOUND:
                 update_ops["$inc"] = {
                     "unread_count": 1,
                     "total_messages": 1
                 }
             else:
                 update_ops["$inc"] = {"total_messages": 1}
+                update_ops["$setOnInsert"]["unread_count"] = 0
             
-            await database.conversations.update_one(
-                {"user_id": message.user_id},
+            result = await database.conversations.update_one(
+                {"user_id": message["user_id"]},
                 update_ops,
                 upsert=True
             )
+            return result.upserted_id is not None
             
         except Exception as e:
-            logger.error(f"Error updating conversation: {e}", exc_info=True)
\ No newline at end of file
+            logger.error(f"Error updating conversation: {e}", exc_info=True)
+            return False
\ No newline at end of file
@@ -0,0 +1,48 @@
+from collections import OrderedDict
+from typing import Dict
+from app.config import WEBHOOK_DEDUP_CACHE_SIZE
+
+
+class RecentMessageIds:
+    """
+    Bounded LRU of WhatsApp message ids this process has already saved.
+
+    Meta redelivers webhooks it thinks timed out; a hit here drops the
+    redelivery before any database write or broadcast. Misses (other
+    workers, restarts, evictions) fall through to the unique index on
+    messages.message_id.
+    """
+
+    def __init__(self, capacity: int = WEBHOOK_DEDUP_CACHE_SIZE):
+        self.capacity = capacity
+        self._ids: OrderedDict = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __contains__(self, message_id: str) -> bool:
+        if message_id in self._ids:
+            self._ids.move_to_end(message_id)
+            self._hits += 1
+            return True
+        self._misses += 1
+        return False
+
+    def add(self, message_id: str):
+        """Remember a saved message id, evicting the least recently seen"""
+        self._ids[message_id] = None
+        self._ids.move_to_end(message_id)
+        if len(self._ids) > self.capacity:
+            self._ids.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        """Cache size and hit counters"""
+        return {
+            "size": len(self._ids),
+            "capacity": self.capacity,
+            "hits": self._hits,
+            "misses": self._misses
+        }
+
+
+# Create global instance
+recent_message_ids = RecentMessageIds()
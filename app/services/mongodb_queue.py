@@ -1,25 +1,33 @@
-from datetime import datetime
-from app.database.mongodb import db
-import json
 from datetime import datetime, timedelta
+from typing import Iterable
+from pymongo import ReturnDocument
+from app.database.mongodb import db
+
 
 class MongoDBQueue:
     """Simple queue using MongoDB"""
-    
+
     def __init__(self, queue_name: str):
-        self.collection = db.db.queues
         self.queue_name = queue_name
-    
+
+    @property
+    def collection(self):
+        """Queue collection on the async connection (resolved at use, after startup)"""
+        if db.async_db is None:
+            raise RuntimeError("Database not connected")
+        return db.async_db.queues
+
     async def push(self, item):
         """Add item to queue"""
-        await self.collection.insert_one({
+        result = await self.collection.insert_one({
             "queue": self.queue_name,
             "data": item,
             "status": "pending",
             "created_at": datetime.utcnow(),
             "attempts": 0
         })
-    
+        return result.inserted_id
+
     async def pop(self):
         """Get and lock next item"""
         result = await self.collection.find_one_and_update(
@@ -34,11 +42,11 @@ class MongoDBQueue:
                 },
                 "$inc": {"attempts": 1}
             },
-            sort=[("created_at", 1)],  
-            return_document=True 
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
         )
         return result
-    
+
     async def complete(self, item_id, success: bool = True):
         """Mark item as completed"""
         await self.collection.update_one(
@@ -50,10 +58,37 @@ class MongoDBQueue:
                 }
             }
         )
-    
-    async def retry_failed(self, max_attempts: int = 3):
-        """Reset failed items for retry"""
+
+    async def release(self, item_ids: Iterable):
+        """Put locked items back to pending (e.g. on shutdown)"""
+        await self.collection.update_many(
+            {"_id": {"$in": list(item_ids)}, "status": "processing"},
+            {"$set": {"status": "pending"}, "$unset": {"locked_at": ""}}
+        )
+
+    async def touch(self, item_ids: Iterable):
+        """Refresh the lock on items still being worked on"""
         await self.collection.update_many(
+            {"_id": {"$in": list(item_ids)}, "status": "processing"},
+            {"$set": {"locked_at": datetime.utcnow()}}
+        )
+
+    async def requeue_stale(self, timeout_seconds: float) -> int:
+        """Return items locked by a consumer that died to pending"""
+        cutoff_time = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+        result = await self.collection.update_many(
+            {
+                "queue": self.queue_name,
+                "status": "processing",
+                "locked_at": {"$lt": cutoff_time}
+            },
+            {"$set": {"status": "pending"}, "$unset": {"locked_at": ""}}
+        )
+        return result.modified_count
+
+    async def retry_failed(self, max_attempts: int = 3) -> int:
+        """Reset failed items for retry"""
+        result = await self.collection.update_many(
             {
                 "queue": self.queue_name,
                 "status": "failed",
@@ -63,11 +98,13 @@ class MongoDBQueue:
                 "$set": {"status": "pending"}
             }
         )
-    
+        return result.modified_count
+
     async def cleanup_old_items(self, hours_old: int = 24):
         """Clean up old completed/failed items"""
         cutoff_time = datetime.utcnow() - timedelta(hours=hours_old)
         await self.collection.delete_many({
+            "queue": self.queue_name,
             "status": {"$in": ["completed", "failed"]},
             "created_at": {"$lt": cutoff_time}
-        })
\ No newline at end of file
+        })
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from app.config import BULK_MIN_SHARE
+from app.services.rate_limiter import TokenBucket, get_rate_limiter
+from app.utils.logger import logger
+
+
+class Priority:
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
+
+
+class OutboundScheduler:
+    """
+    Hands out the shared per-number send budget by priority.
+
+    Waiters queue in one lane per priority class. A single granter task takes
+    tokens from the bucket one at a time and gives each to the interactive
+    lane first, except that while both lanes wait bulk is guaranteed
+    `bulk_min_share` of the grants, so campaigns never fully starve.
+    """
+
+    LANES = (Priority.INTERACTIVE, Priority.BULK)
+
+    def __init__(self, bucket: TokenBucket, bulk_min_share: float = BULK_MIN_SHARE):
+        self.bucket = bucket
+        self.bulk_min_share = bulk_min_share
+        self._credit_per_grant = bulk_min_share / (1.0 - bulk_min_share) if bulk_min_share < 1 else float("inf")
+        self._lanes: Dict[str, Deque[Tuple[asyncio.Future, float]]] = {lane: deque() for lane in self.LANES}
+        self._bulk_credit = 0.0
+        self._granter: Optional[asyncio.Task] = None
+        self._stats = {lane: {"granted": 0, "wait_total": 0.0, "wait_max": 0.0} for lane in self.LANES}
+
+    async def acquire(self, priority: str = Priority.INTERACTIVE) -> float:
+        """Wait for a send slot in the given lane. Returns seconds waited."""
+        if priority not in self._lanes:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[priority].append((future, time.monotonic()))
+
+        if self._granter is None or self._granter.done():
+            self._granter = asyncio.create_task(self._grant_loop())
+
+        return await future
+
+    def _pending(self, lane: str) -> bool:
+        """Drop waiters that gave up (cancelled) from the head of a lane"""
+        queue = self._lanes[lane]
+        while queue and queue[0][0].done():
+            queue.popleft()
+        return bool(queue)
+
+    def _next_lane(self) -> Optional[str]:
+        """Interactive first, unless bulk has earned its guaranteed share"""
+        interactive = self._pending(Priority.INTERACTIVE)
+        bulk = self._pending(Priority.BULK)
+
+        if interactive and bulk:
+            if self._bulk_credit >= 1.0:
+                self._bulk_credit -= 1.0
+                return Priority.BULK
+            # share / (1 - share) per interactive grant -> bulk gets `share` of all grants
+            self._bulk_credit += self._credit_per_grant
+            return Priority.INTERACTIVE
+
+        if not bulk:
+            # Credit only accrues while bulk is actually waiting
+            self._bulk_credit = 0.0
+        return Priority.INTERACTIVE if interactive else Priority.BULK if bulk else None
+
+    async def _grant_loop(self):
+        """Run while anyone is waiting; one token per grant"""
+        try:
+            while self._pending(Priority.INTERACTIVE) or self._pending(Priority.BULK):
+                await self.bucket.acquire()
+
+                # Choose after the token is in hand so a reply that arrived
+                # meanwhile goes ahead of bulk work queued earlier
+                lane = self._next_lane()
+                if lane is None:
+                    # Everyone left while we waited; put the token back
+                    self.bucket.release()
+                    break
+
+                future, enqueued_at = self._lanes[lane].popleft()
+                waited = time.monotonic() - enqueued_at
+                future.set_result(waited)
+
+                stats = self._stats[lane]
+                stats["granted"] += 1
+                stats["wait_total"] += waited
+                stats["wait_max"] = max(stats["wait_max"], waited)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Outbound scheduler error: {e}", exc_info=True)
+            for queue in self._lanes.values():
+                while queue:
+                    future, _ = queue.popleft()
+                    if not future.done():
+                        future.set_exception(e)
+
+    def get_stats(self) -> Dict:
+        """Queue depth and wait times per lane"""
+        return {
+            "bulk_min_share": self.bulk_min_share,
+            **{
+                lane: {
+                    "waiting": sum(1 for future, _ in self._lanes[lane] if not future.done()),
+                    "granted": stats["granted"],
+                    "avg_wait_ms": round(stats["wait_total"] / stats["granted"] * 1000, 1) if stats["granted"] else 0,
+                    "max_wait_ms": round(stats["wait_max"] * 1000, 1)
+                }
+                for lane, stats in self._stats.items()
+            }
+        }
+
+
+_schedulers: Dict[str, OutboundScheduler] = {}
+
+
+def get_outbound_scheduler(key: str) -> OutboundScheduler:
+    """Get the process-wide scheduler for a phone number id"""
+    scheduler = _schedulers.get(key)
+
+    if scheduler is None:
+        scheduler = OutboundScheduler(get_rate_limiter(key))
+        _schedulers[key] = scheduler
+        logger.info(f"🚦 Outbound scheduler created for {key}: bulk min share {BULK_MIN_SHARE:.0%}")
+
+    return scheduler
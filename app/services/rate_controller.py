@@ -0,0 +1,130 @@
+import time
+from typing import Dict, Optional
+from app.config import (
+    AIMD_MIN_RATE, AIMD_MAX_RATE, AIMD_START_RATE, AIMD_INCREASE, AIMD_DECREASE_FACTOR,
+    AIMD_WINDOW, AIMD_LATENCY_SPIKE_FACTOR, AIMD_MAX_ERROR_RATE
+)
+from app.services.rate_limiter import TokenBucket
+from app.utils.logger import logger
+
+
+class AimdRateController:
+    """
+    Additive-increase / multiplicative-decrease pacing for bulk sends.
+
+    Send outcomes are evaluated once per window: a healthy window that
+    actually used its rate raises it by `increase` msg/s; a 429, a 5xx or
+    timeout rate above `max_error_rate`, or mean latency above
+    `latency_spike_factor` x the baseline cuts it by `decrease_factor`.
+    The rate is applied to a pacing bucket that senders acquire before
+    each send, on top of the shared per-number bucket.
+    """
+
+    def __init__(self, start_rate: Optional[float] = None, min_rate: float = AIMD_MIN_RATE,
+                 max_rate: float = AIMD_MAX_RATE, increase: float = AIMD_INCREASE,
+                 decrease_factor: float = AIMD_DECREASE_FACTOR, window: float = AIMD_WINDOW,
+                 latency_spike_factor: float = AIMD_LATENCY_SPIKE_FACTOR,
+                 max_error_rate: float = AIMD_MAX_ERROR_RATE):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.window = window
+        self.latency_spike_factor = latency_spike_factor
+        self.max_error_rate = max_error_rate
+
+        rate = start_rate if start_rate else AIMD_START_RATE
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.bucket = TokenBucket(self.rate, self._capacity(self.rate))
+
+        self.baseline_latency: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._reset_window(time.monotonic())
+
+    def _capacity(self, rate: float) -> float:
+        """Small burst so the pace stays smooth"""
+        return max(1.0, rate * 0.1)
+
+    def _reset_window(self, now: float):
+        self._window_started = now
+        self._samples = 0
+        self._errors = 0
+        self._throttled = False
+        self._latency_total = 0.0
+
+    async def acquire(self) -> float:
+        """Wait for the next paced send slot. Returns seconds waited."""
+        return await self.bucket.acquire()
+
+    def record(self, result: Dict):
+        """Feed back one send result from WhatsAppService._make_request"""
+        self._samples += 1
+        if result.get("throttled"):
+            self._throttled = True
+        if result.get("server_error"):
+            self._errors += 1
+        latency = result.get("latency")
+        if latency is not None:
+            self._latency_total += latency
+
+        now = time.monotonic()
+        if self._throttled and now - self._last_decrease >= self.window:
+            # React to 429s right away instead of at the end of the window.
+            # 429s from sends already in flight don't cut again (once per window).
+            self._decrease("throttled (429)")
+            self._reset_window(now)
+        elif now - self._window_started >= self.window:
+            self._evaluate(now)
+
+    def _evaluate(self, now: float):
+        """Decide increase / decrease for the finished window"""
+        elapsed = now - self._window_started
+        samples = self._samples
+        mean_latency = self._latency_total / samples if samples else None
+
+        if samples and self._errors / samples > self.max_error_rate:
+            self._decrease(f"{self._errors}/{samples} server errors")
+        elif mean_latency is not None and self.baseline_latency is not None and \
+                mean_latency > self.baseline_latency * self.latency_spike_factor:
+            self._decrease(f"latency {mean_latency * 1000:.0f}ms vs baseline "
+                           f"{self.baseline_latency * 1000:.0f}ms")
+        elif samples >= self.rate * elapsed * 0.5:
+            # Only grow when we actually used the rate; an idle window says nothing
+            self._set_rate(self.rate + self.increase)
+            self.increases += 1
+
+        if mean_latency is not None:
+            # Baseline follows the best observed latency, drifting up slowly
+            if self.baseline_latency is None or mean_latency < self.baseline_latency:
+                self.baseline_latency = mean_latency
+            else:
+                self.baseline_latency += (mean_latency - self.baseline_latency) * 0.05
+
+        self._reset_window(now)
+
+    def _decrease(self, reason: str):
+        previous = self.rate
+        self._set_rate(self.rate * self.decrease_factor)
+        self.decreases += 1
+        self._last_decrease = time.monotonic()
+        logger.warning(f"📉 Send rate cut {previous:.1f} → {self.rate:.1f} msg/s: {reason}")
+
+    def _set_rate(self, rate: float):
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.bucket.set_rate(self.rate, self._capacity(self.rate))
+
+    @property
+    def current_rate(self) -> float:
+        return round(self.rate, 2)
+
+    def get_status(self) -> Dict:
+        """Controller state for progress reporting"""
+        return {
+            "current_rate": self.current_rate,
+            "max_rate": self.max_rate,
+            "baseline_latency_ms": round(self.baseline_latency * 1000, 1) if self.baseline_latency else None,
+            "increases": self.increases,
+            "decreases": self.decreases
+        }
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from typing import Dict, Optional
+from app.config import MAX_MESSAGES_PER_SECOND, RATE_LIMIT_BURST
+from app.utils.logger import logger
+
+
+class TokenBucket:
+    """Async token bucket - waiters sleep without blocking the event loop"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        """Add tokens accrued since the last refill"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Wait until tokens are available and take them. Returns seconds waited."""
+        started_at = time.monotonic()
+
+        # Waiters queue on the lock so tokens are handed out in FIFO order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return time.monotonic() - started_at
+
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def release(self, tokens: float = 1.0):
+        """Return unused tokens"""
+        self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def set_rate(self, rate: float, capacity: Optional[float] = None):
+        """Change the refill rate (and burst); waiters pick it up on their next check"""
+        self._refill()
+        self.rate = float(rate)
+        if capacity is not None:
+            self.capacity = float(capacity)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def available(self) -> float:
+        """Tokens currently available (after refill)"""
+        self._refill()
+        return self._tokens
+
+
+_buckets: Dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(key: str) -> TokenBucket:
+    """Get the process-wide token bucket for a phone number id"""
+    bucket = _buckets.get(key)
+
+    if bucket is None:
+        bucket = TokenBucket(MAX_MESSAGES_PER_SECOND, RATE_LIMIT_BURST)
+        _buckets[key] = bucket
+        logger.info(
+            f"🪣 Rate limiter created for {key}: "
+            f"{MAX_MESSAGES_PER_SECOND} msg/s, burst {RATE_LIMIT_BURST}"
+        )
+
+    return bucket
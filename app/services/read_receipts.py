@@ -0,0 +1,106 @@
+import asyncio
+from typing import Dict, List, Optional
+from app.config import READ_RECEIPT_CONCURRENCY
+from app.services.whatsapp import WhatsAppService
+from app.utils.logger import logger
+
+
+class ReadReceiptDispatcher:
+    """Send read receipts in the background, coalesced per conversation"""
+
+    PAUSE_POLL_INTERVAL = 1.0
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.whatsapp_service: Optional[WhatsAppService] = None
+
+        # user_id -> newest unread message id. Marking the newest message as
+        # read also marks everything before it, so older ids are dropped.
+        self._pending: Dict[str, str] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+
+        self._in_flight = 0
+        self._sent = 0
+        self._failed = 0
+        self._coalesced = 0
+
+    def enqueue(self, user_id: str, message_id: str):
+        """Queue a read receipt - never waits on outbound HTTP"""
+        if user_id in self._pending:
+            if self._pending[user_id] != message_id:
+                self._coalesced += 1
+            self._pending[user_id] = message_id
+            return
+
+        self._pending[user_id] = message_id
+        self._queue.put_nowait(user_id)
+
+    async def start(self):
+        """Start the background workers"""
+        if self._workers:
+            return
+
+        if self.whatsapp_service is None:
+            self.whatsapp_service = WhatsAppService()
+
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.concurrency)
+        ]
+        logger.info(f"📬 Read receipt dispatcher started with {self.concurrency} workers")
+
+    async def stop(self):
+        """Stop the background workers"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self._pending:
+            logger.warning(f"Read receipt dispatcher stopped with {len(self._pending)} pending")
+
+    async def _worker(self, worker_id: int):
+        """Drain queued receipts under the shared rate budget"""
+        while True:
+            user_id = await self._queue.get()
+            try:
+                # Hold receipts while the API is throttling us instead of dropping them
+                while not self.whatsapp_service.backoff.is_ready():
+                    await asyncio.sleep(self.PAUSE_POLL_INTERVAL)
+
+                message_id = self._pending.pop(user_id, None)
+                if message_id is None:
+                    continue
+
+                self._in_flight += 1
+                try:
+                    success = await self.whatsapp_service.mark_message_as_read(message_id)
+                finally:
+                    self._in_flight -= 1
+
+                if success:
+                    self._sent += 1
+                else:
+                    self._failed += 1
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed += 1
+                logger.error(f"Read receipt worker {worker_id} error: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def get_stats(self) -> Dict:
+        """Receipt counters for monitoring"""
+        return {
+            "pending": len(self._pending),
+            "in_flight": self._in_flight,
+            "sent": self._sent,
+            "failed": self._failed,
+            "coalesced": self._coalesced
+        }
+
+
+# Create global instance
+read_receipt_dispatcher = ReadReceiptDispatcher(READ_RECEIPT_CONCURRENCY)
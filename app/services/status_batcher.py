@@ -0,0 +1,160 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from app.config import STATUS_BATCH_SIZE, STATUS_FLUSH_INTERVAL, STATUS_UNMATCHED_RETRY_SECONDS
+from app.models.message import is_status_advance
+from app.services.inbox import InboxService
+from app.websockets.connection_manager import manager
+from app.utils.logger import logger
+
+
+class StatusUpdateBatcher:
+    """
+    Collect message status webhooks for a short window and apply them together.
+
+    Updates are collapsed to the furthest status per message_id, written with
+    one unordered bulk_write per flush, and broadcast over WebSocket after
+    the write so clients never see a status that isn't stored yet. Stale and
+    duplicate transitions are dropped by the inbox service and not broadcast.
+    Updates for a message that isn't stored yet are carried into the next
+    flushes for up to retry_window seconds before they are discarded.
+    """
+
+    def __init__(self, batch_size: int = STATUS_BATCH_SIZE,
+                 flush_interval: float = STATUS_FLUSH_INTERVAL,
+                 retry_window: float = STATUS_UNMATCHED_RETRY_SECONDS):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_window = retry_window
+        self.inbox_service = InboxService()
+
+        # message_id -> furthest update seen in this window
+        self._pending: Dict[str, Dict] = {}
+        # message_id -> update whose message wasn't stored yet at the last flush
+        self._unmatched: Dict[str, Dict] = {}
+        self._lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+        self._received = 0
+        self._collapsed = 0
+        self._flushes = 0
+        self._written = 0
+        self._stale = 0
+        self._retried = 0
+        self._discarded = 0
+
+    async def add(self, message_id: str, status: str, recipient: Optional[str] = None,
+                  error_reason: Optional[str] = None, timestamp: Optional[int] = None):
+        """Queue a status update; flushes immediately once the batch is full"""
+        self._received += 1
+        update = {
+            "message_id": message_id,
+            "status": status,
+            "recipient": recipient,
+            "error_reason": error_reason,
+            "timestamp": timestamp or 0,
+            "received_at": time.monotonic()
+        }
+
+        current = self._pending.get(message_id)
+        if current is not None:
+            self._collapsed += 1
+            # Webhooks can arrive out of order; keep the furthest status
+            if not is_status_advance(current["status"], status):
+                return
+        self._pending[message_id] = update
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def _flush_periodically(self):
+        """Flush the window every flush_interval while updates keep arriving"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self._pending and not self._unmatched:
+                return
+            await self.flush()
+
+    async def flush(self):
+        """Write pending updates in one bulk_write, then notify clients"""
+        async with self._lock:
+            batch, self._pending = self._pending, {}
+            retries, self._unmatched = self._unmatched, {}
+            for message_id, update in retries.items():
+                current = batch.get(message_id)
+                if current is None or is_status_advance(current["status"], update["status"]):
+                    batch[message_id] = update
+            if not batch:
+                return
+
+            result = await self.inbox_service.update_message_statuses(list(batch.values()))
+            applied = result["applied"]
+            self._flushes += 1
+            self._written += len(applied)
+            self._stale += len(batch) - len(applied) - len(result["unmatched"])
+            self._hold_unmatched(result["unmatched"])
+
+            if not manager.active_connections:
+                return
+
+            for update in applied:
+                try:
+                    await manager.broadcast({
+                        "type": "message_status",
+                        "data": {
+                            "message_id": update["message_id"],
+                            "status": update["status"],
+                            "recipient": update["recipient"],
+                            "error": update["error_reason"],
+                            "timestamp": datetime.utcnow().isoformat()
+                        }
+                    })
+                except Exception as notif_error:
+                    logger.error(f"⚠️ Failed to send status notification: {notif_error}")
+
+    def _hold_unmatched(self, updates):
+        """Keep updates for messages not stored yet for the next flush, until they expire"""
+        now = time.monotonic()
+        for update in updates:
+            if now - update["received_at"] < self.retry_window:
+                self._unmatched[update["message_id"]] = update
+                self._retried += 1
+            else:
+                self._discarded += 1
+                logger.warning(
+                    f"Dropping {update['status']} status for unknown message {update['message_id']} "
+                    f"after {self.retry_window:.0f}s"
+                )
+
+    async def stop(self):
+        """Flush whatever is pending"""
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        if self._unmatched:
+            logger.warning(f"Dropping {len(self._unmatched)} status updates for messages never stored")
+            self._unmatched.clear()
+
+    def get_stats(self) -> Dict:
+        """Batching counters"""
+        return {
+            "pending": len(self._pending),
+            "unmatched": len(self._unmatched),
+            "received": self._received,
+            "collapsed": self._collapsed,
+            "flushes": self._flushes,
+            "written": self._written,
+            "stale": self._stale,
+            "retried": self._retried,
+            "discarded": self._discarded
+        }
+
+
+# Create global instance
+status_batcher = StatusUpdateBatcher()
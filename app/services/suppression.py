@@ -0,0 +1,243 @@
+import asyncio
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Optional
+from pymongo import ReturnDocument, UpdateOne
+from app.config import SUPPRESSION_REFRESH_INTERVAL
+from app.database.mongodb import db
+from app.utils.logger import logger
+from app.utils.phone import normalize_phone
+
+
+class SuppressionReason:
+    OPT_OUT = "opt_out"
+    HARD_FAILURE = "hard_failure"
+    MANUAL = "manual"
+
+
+_MASK = (1 << 64) - 1
+
+
+class _BloomFilter:
+    """Bit-array Bloom filter over int64 phone numbers (double hashing)"""
+
+    __slots__ = ("size", "hashes", "bits")
+
+    def __init__(self, capacity: int, hashes: int = 7):
+        # ~10 bits per entry keeps false positives around 1% at capacity
+        self.size = max(capacity * 10, 1024)
+        self.hashes = hashes
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: int):
+        h1 = (key * 0x9E3779B97F4A7C15) & _MASK
+        h2 = ((key ^ (key >> 29)) * 0xBF58476D1CE4E5B9) & _MASK | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: int):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: int) -> bool:
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+def phone_key(phone: str) -> Optional[int]:
+    """Normalized E.164 phone number as an int64 key"""
+    number, _ = normalize_phone(phone)
+    return int(number) if number else None
+
+
+class SuppressionList:
+    """
+    Opt-outs and permanently failing numbers that bulk sends must skip.
+
+    The `suppressions` collection is the source of truth, one document per
+    number holding every reason it is suppressed for; the number stays
+    suppressed until the last reason is lifted. It is loaded into a sorted
+    int64 array (8 bytes per number) fronted by a Bloom filter, so the
+    common "not suppressed" answer costs a few bit probes and a hit is
+    confirmed with a binary search.
+    """
+
+    def __init__(self):
+        self._numbers = array("q")
+        self._bloom = _BloomFilter(0)
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _get_db(self):
+        """Get database instance"""
+        if db.async_db is None:
+            raise RuntimeError("Database not connected")
+        return db.async_db
+
+    async def load(self):
+        """(Re)load the in-memory set from MongoDB"""
+        async with self._lock:
+            database = self._get_db()
+
+            keys = []
+            legacy = []
+            async for doc in database.suppressions.find({}, {"phone": 1, "reason": 1, "reasons": 1}):
+                key = phone_key(doc.get("phone"))
+                if key is not None:
+                    keys.append(key)
+                if "reasons" not in doc:
+                    legacy.append(doc)
+
+            if legacy:
+                # Entries from before reasons were tracked as a set
+                await database.suppressions.bulk_write([
+                    UpdateOne(
+                        {"_id": doc["_id"]},
+                        {"$set": {"reasons": [doc.get("reason") or SuppressionReason.MANUAL]}, "$unset": {"reason": ""}}
+                    )
+                    for doc in legacy
+                ], ordered=False)
+                logger.info(f"🚫 Migrated {len(legacy)} suppressions to reason sets")
+
+            numbers = array("q", sorted(set(keys)))
+            bloom = _BloomFilter(len(numbers) * 2)
+            for key in numbers:
+                bloom.add(key)
+
+            self._numbers, self._bloom = numbers, bloom
+            self._loaded_at = time.monotonic()
+            logger.info(f"🚫 Loaded {len(numbers)} suppressed numbers")
+
+    async def refresh_if_stale(self):
+        """Reload when another worker may have added entries since our last load"""
+        if time.monotonic() - self._loaded_at >= SUPPRESSION_REFRESH_INTERVAL:
+            await self.load()
+
+    def _contains(self, key: int) -> bool:
+        if not self._numbers or key not in self._bloom:
+            return False
+        index = bisect_left(self._numbers, key)
+        return index < len(self._numbers) and self._numbers[index] == key
+
+    def is_suppressed(self, phone: str) -> bool:
+        """Check a phone number (any formatting)"""
+        key = phone_key(phone)
+        return key is not None and self._contains(key)
+
+    def contains(self, number: str) -> bool:
+        """Check an already normalized number (E.164 digits) - the hot path"""
+        return self._contains(int(number))
+
+    def _insert(self, key: int):
+        index = bisect_left(self._numbers, key)
+        if index < len(self._numbers) and self._numbers[index] == key:
+            return
+        self._numbers.insert(index, key)
+        self._bloom.add(key)
+        # Keep the false positive rate bounded as entries are added
+        if len(self._numbers) * 10 > self._bloom.size:
+            bloom = _BloomFilter(len(self._numbers) * 2)
+            for number in self._numbers:
+                bloom.add(number)
+            self._bloom = bloom
+
+    async def add(self, phone: str, reason: str, source: Optional[str] = None,
+                  error_code: Optional[int] = None) -> bool:
+        """
+        Suppress a number for a reason, keeping any reasons it already has.
+        Returns False if the number is empty.
+        """
+        key = phone_key(phone)
+        if key is None:
+            return False
+
+        now = datetime.utcnow()
+        details = {"updated_at": now}
+        if source:
+            details["source"] = source
+        if error_code is not None:
+            details["error_code"] = error_code
+
+        try:
+            await self._get_db().suppressions.update_one(
+                {"phone": str(key)},
+                {
+                    "$set": details,
+                    "$addToSet": {"reasons": reason},
+                    "$setOnInsert": {"phone": str(key), "created_at": now}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error saving suppression for {phone}: {e}", exc_info=True)
+            return False
+
+        self._insert(key)
+        logger.info(f"🚫 Suppressed {key} ({reason})")
+        return True
+
+    async def remove(self, phone: str, reason: Optional[str] = None) -> bool:
+        """
+        Lift a suppression entirely, or only one reason for it. Returns True
+        if the number is no longer suppressed; lifting one reason while
+        others remain (e.g. START after a manual block) returns False.
+        """
+        key = phone_key(phone)
+        if key is None:
+            return False
+
+        database = self._get_db()
+        query = {"phone": str(key)}
+        if reason:
+            lifted = await database.suppressions.find_one_and_update(
+                {"phone": str(key), "reasons": reason},
+                {"$pull": {"reasons": reason}, "$set": {"updated_at": datetime.utcnow()}},
+                return_document=ReturnDocument.AFTER
+            )
+            if lifted is None:
+                return False
+            if lifted["reasons"]:
+                logger.info(f"🚫 {key} is still suppressed ({', '.join(lifted['reasons'])})")
+                return False
+            # Only delete while no reason was added back meanwhile
+            query["reasons"] = {"$size": 0}
+
+        result = await database.suppressions.delete_one(query)
+        if result.deleted_count == 0:
+            return False
+
+        # Bloom filters can't delete; the array lookup rejects the stale bits
+        index = bisect_left(self._numbers, key)
+        if index < len(self._numbers) and self._numbers[index] == key:
+            del self._numbers[index]
+
+        logger.info(f"✅ Removed suppression for {key}")
+        return True
+
+    async def list_suppressions(self, reason: Optional[str] = None,
+                                limit: int = 100, skip: int = 0) -> Dict:
+        """List stored suppressions, newest first"""
+        database = self._get_db()
+        query = {"reasons": reason} if reason else {}
+
+        cursor = database.suppressions.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit)
+        suppressions = await cursor.to_list(length=limit)
+        total = await database.suppressions.count_documents(query)
+
+        return {"suppressions": suppressions, "total": total, "limit": limit, "skip": skip}
+
+    def get_stats(self) -> Dict:
+        """Size of the in-memory set"""
+        return {
+            "numbers": len(self._numbers),
+            "memory_bytes": self._numbers.itemsize * len(self._numbers) + len(self._bloom.bits)
+        }
+
+
+# Create global instance
+suppression_list = SuppressionList()
@@ -0,0 +1,224 @@
+import asyncio
+import time
+import zlib
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from app.config import (
+    WEBHOOK_WORKER_CONCURRENCY, WEBHOOK_SHARD_QUEUE_SIZE, WEBHOOK_QUEUE_POLL_INTERVAL,
+    WEBHOOK_QUEUE_VISIBILITY_TIMEOUT, WEBHOOK_MAX_ATTEMPTS
+)
+from app.services.mongodb_queue import MongoDBQueue
+from app.utils.logger import logger
+from app.utils.webhook_parser import loads
+
+
+EventHandler = Callable[[str, Dict], Awaitable[None]]
+EventSplitter = Callable[[Dict], Iterable[Tuple[str, str, Dict]]]
+
+
+class WebhookIngestService:
+    """
+    Durable fast-ack webhook ingestion.
+
+    The route only stores the raw payload in the `webhook` MongoDBQueue. A
+    single dispatcher pops payloads in arrival order, splits them into events
+    and routes each to a consumer shard chosen by user_id, so events for one
+    user are processed in order while different users run concurrently.
+    A payload is completed once all of its events are processed. If any of
+    its events raised, it is marked failed instead and the sweep puts it back
+    to pending until WEBHOOK_MAX_ATTEMPTS deliveries (events that did go
+    through are no-ops the second time: message ids are unique and status
+    updates forward-only). Payloads locked by a consumer that died are
+    requeued after the visibility timeout.
+    """
+
+    def __init__(self, concurrency: int = WEBHOOK_WORKER_CONCURRENCY):
+        self.concurrency = concurrency
+        self.queue = MongoDBQueue("webhook")
+        self._handler: Optional[EventHandler] = None
+        self._splitter: Optional[EventSplitter] = None
+        self._shards: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+        # queue item id -> events still being processed
+        self._remaining: Dict = {}
+        # queue item ids with at least one failed event
+        self._failed: Set = set()
+
+        self._enqueued = 0
+        self._processed_events = 0
+        self._failed_events = 0
+        self._completed_payloads = 0
+        self._failed_payloads = 0
+        self._last_lag: Optional[float] = None
+
+    async def enqueue(self, body: bytes):
+        """Store a raw webhook payload - the only work done before the ack"""
+        await self.queue.push(body.decode("utf-8", errors="replace"))
+        self._enqueued += 1
+        self._wakeup.set()
+
+    async def start(self, handler: EventHandler, splitter: EventSplitter):
+        """Start the dispatcher and the consumer shards"""
+        if self._tasks:
+            return
+
+        self._handler = handler
+        self._splitter = splitter
+
+        self._shards = [asyncio.Queue(maxsize=WEBHOOK_SHARD_QUEUE_SIZE) for _ in range(self.concurrency)]
+        self._tasks = [asyncio.create_task(self._consume(shard)) for shard in self._shards]
+        self._tasks.append(asyncio.create_task(self._dispatch()))
+        self._tasks.append(asyncio.create_task(self._sweep()))
+        logger.info(f"📥 Webhook ingest started with {self.concurrency} consumers")
+
+    async def stop(self):
+        """Stop consuming; payloads in flight go back to pending for the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._remaining:
+            try:
+                await self.queue.release(self._remaining.keys())
+                logger.warning(f"Released {len(self._remaining)} unfinished webhook payloads")
+            except Exception as e:
+                logger.error(f"Error releasing webhook payloads: {e}")
+            self._remaining.clear()
+            self._failed.clear()
+
+    def _shard_for(self, user_id: str) -> asyncio.Queue:
+        """Same user -> same shard, which keeps that user's events in order"""
+        return self._shards[zlib.crc32(user_id.encode()) % len(self._shards)]
+
+    async def _dispatch(self):
+        """Pop payloads in arrival order and fan their events out to shards"""
+        while True:
+            try:
+                item = await self.queue.pop()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reading webhook queue: {e}", exc_info=True)
+                item = None
+
+            if item is None:
+                # Woken right away by local enqueues; polls for other workers' payloads
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), WEBHOOK_QUEUE_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._last_lag = (item["locked_at"] - item["created_at"]).total_seconds()
+
+            if item["_id"] in self._remaining:
+                # Requeued while we were still working on it (e.g. a missed
+                # touch); the events already in the shards will finish it
+                logger.warning(f"Webhook payload {item['_id']} is already in flight, not dispatching again")
+                continue
+
+            try:
+                events = list(self._splitter(loads(item["data"])))
+            except Exception as e:
+                logger.error(f"Dropping malformed webhook payload {item['_id']}: {e}")
+                await self._finish(item["_id"], success=False)
+                continue
+
+            if not events:
+                await self._finish(item["_id"], success=True)
+                continue
+
+            self._remaining[item["_id"]] = len(events)
+            for kind, user_id, event in events:
+                # Blocks when a shard is full - backpressure instead of unbounded memory
+                await self._shard_for(user_id).put((item["_id"], kind, event))
+
+    async def _consume(self, shard: asyncio.Queue):
+        """Process one shard's events strictly in order"""
+        while True:
+            item_id, kind, event = await shard.get()
+            try:
+                await self._handler(kind, event)
+                self._processed_events += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed_events += 1
+                self._failed.add(item_id)
+                logger.error(f"Error processing webhook {kind} event: {e}", exc_info=True)
+
+            remaining = self._remaining.get(item_id)
+            if remaining is None:
+                # Released on stop() while this event was queued
+                continue
+            if remaining > 1:
+                self._remaining[item_id] = remaining - 1
+                continue
+
+            del self._remaining[item_id]
+            success = item_id not in self._failed
+            self._failed.discard(item_id)
+            await self._finish(item_id, success)
+
+    async def _finish(self, item_id, success: bool):
+        """Mark a payload completed, or failed so the sweep retries it"""
+        try:
+            await self.queue.complete(item_id, success=success)
+            if success:
+                self._completed_payloads += 1
+            else:
+                self._failed_payloads += 1
+                logger.warning(f"Webhook payload {item_id} failed, will be retried")
+        except Exception as e:
+            logger.error(f"Error completing webhook payload {item_id}: {e}")
+
+    async def _sweep(self):
+        """Requeue payloads stuck with dead consumers; prune old completed ones"""
+        last_cleanup = 0.0
+        while True:
+            await asyncio.sleep(WEBHOOK_QUEUE_VISIBILITY_TIMEOUT / 2)
+            try:
+                # Keep our own slow payloads from being picked up as stale
+                if self._remaining:
+                    await self.queue.touch(list(self._remaining.keys()))
+
+                requeued = await self.queue.requeue_stale(WEBHOOK_QUEUE_VISIBILITY_TIMEOUT)
+                if requeued:
+                    logger.warning(f"♻️ Requeued {requeued} stale webhook payloads")
+
+                # Payloads with failed events get another delivery, up to the cap
+                retried = await self.queue.retry_failed(WEBHOOK_MAX_ATTEMPTS)
+                if retried:
+                    logger.warning(f"♻️ Retrying {retried} failed webhook payloads")
+
+                if requeued or retried:
+                    self._wakeup.set()
+
+                if time.monotonic() - last_cleanup > 3600:
+                    await self.queue.cleanup_old_items()
+                    last_cleanup = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error sweeping webhook queue: {e}", exc_info=True)
+
+    def get_stats(self) -> Dict:
+        """Ingest counters and queue depths"""
+        return {
+            "running": bool(self._tasks),
+            "enqueued": self._enqueued,
+            "payloads_in_flight": len(self._remaining),
+            "payloads_completed": self._completed_payloads,
+            "payloads_failed": self._failed_payloads,
+            "events_processed": self._processed_events,
+            "events_failed": self._failed_events,
+            "shard_depths": [shard.qsize() for shard in self._shards],
+            "last_lag_ms": round(self._last_lag * 1000, 1) if self._last_lag is not None else None
+        }
+
+
+# Create global instance
+webhook_ingest = WebhookIngestService()
@@ -1,10 +1,22 @@
-import requests
+import httpx
 import json
 import time
 from typing import Dict, Optional, List
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from app.config import *
+from app.services.backoff import BackoffPaused, get_backoff_controller
+from app.services.http_client import get_http_client
+from app.services.outbound_scheduler import Priority, get_outbound_scheduler
 from app.utils.logger import logger
+from app.utils.phone import normalize_phone
+
+
+class GraphAPIRetryableError(Exception):
+    """Throttled (429) or server error (5xx) response worth retrying"""
+    
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"Graph API returned {response.status_code}")
+        self.response = response
 
 
 class WhatsAppService:
@@ -18,48 +30,21 @@ class WhatsAppService:
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json"
         }
-        
-    
-        self._last_request_time = 0
-        self._request_count = 0
-        self._rate_limit_window = 1.0 
-        self._max_requests_per_window = 80
-    
-    async def _check_rate_limit(self) -> bool:
-        """Simple rate limiter"""
-        current_time = time.time()
-        
+        self.scheduler = get_outbound_scheduler(self.phone_number_id)
+        self.backoff = get_backoff_controller(self.phone_number_id)
     
-        if current_time - self._last_request_time > self._rate_limit_window:
-            self._request_count = 0
-            self._last_request_time = current_time
+    async def _check_rate_limit(self, priority: str = Priority.INTERACTIVE) -> bool:
+        """Wait for a send slot in the shared per-number budget, by priority lane"""
+        waited = await self.scheduler.acquire(priority)
         
+        if waited > 0.5 and priority == Priority.INTERACTIVE:
+            logger.warning(f"Rate limit reached, waited {waited:.2f}s for a send slot")
         
-        if self._request_count >= self._max_requests_per_window:
-            wait_time = self._rate_limit_window - (current_time - self._last_request_time)
-            if wait_time > 0:
-                logger.warning(f"Rate limit reached, waiting {wait_time:.2f}s")
-                time.sleep(wait_time)
-                self._request_count = 0
-                self._last_request_time = time.time()
-        
-        self._request_count += 1
         return True
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((
-            requests.exceptions.Timeout,
-            requests.exceptions.ConnectionError,
-            requests.exceptions.HTTPError
-        ))
-    )
-    async def send_text_message(self, to: str, message: str) -> Dict:
-        """Send text message with retry logic"""
-        
-        
-        await self._check_rate_limit()
+    async def send_text_message(self, to: str, message: str,
+                                priority: str = Priority.INTERACTIVE) -> Dict:
+        """Send text message with retry logic (bulk callers pass Priority.BULK)"""
         
         payload = {
             "messaging_product": "whatsapp",
@@ -69,15 +54,14 @@ class WhatsAppService:
             "text": {"body": message}
         }
         
-        return await self._make_request(payload)
+        return await self._make_request(payload, priority)
     
     async def send_template_message(self, to: str, template_name: str, 
                                   parameters: List[Dict] = None,
-                                  language_code: str = "en_US") -> Dict:
+                                  language_code: str = "en_US",
+                                  priority: str = Priority.INTERACTIVE) -> Dict:
         """Send template message"""
         
-        await self._check_rate_limit()
-        
         template_data = {
             "name": template_name,
             "language": {"code": language_code}
@@ -96,15 +80,14 @@ class WhatsAppService:
             "template": template_data
         }
         
-        return await self._make_request(payload)
+        return await self._make_request(payload, priority)
     
     async def send_media_message(self, to: str, media_type: str, 
                                media_url: str = None, media_id: str = None,
-                               caption: str = None) -> Dict:
+                               caption: str = None,
+                               priority: str = Priority.INTERACTIVE) -> Dict:
         """Send media message (image, video, audio, document)"""
         
-        await self._check_rate_limit()
-        
         if not media_url and not media_id:
             return {
                 "success": False,
@@ -123,7 +106,7 @@ class WhatsAppService:
         
         payload[media_type] = media_obj
         
-        return await self._make_request(payload)
+        return await self._make_request(payload, priority)
     
     async def mark_message_as_read(self, message_id: str) -> bool:
         """Mark message as read"""
@@ -133,36 +116,114 @@ class WhatsAppService:
             "message_id": message_id
         }
         
+        # Read receipts are best-effort; never wait out a throttle or open circuit
+        if not self.backoff.is_ready():
+            logger.warning(f"Skipping read receipt for {message_id}: outbound sends paused")
+            return False
+        
+        # Receipts share the per-number send budget, behind agent replies
+        await self._check_rate_limit(Priority.BULK)
+        
         try:
-            response = requests.post(
+            response = await get_http_client().post(
                 f"{self.base_url}/messages",
                 headers=self.headers,
                 json=payload,
                 timeout=10
             )
+            
+            if response.status_code == 429:
+                self.backoff.throttle(self._parse_retry_after(response))
+            
             return response.status_code == 200
         except Exception as e:
             logger.error(f"Failed to mark message as read: {e}")
             return False
     
-    async def _make_request(self, payload: Dict) -> Dict:
-        """Make API request to WhatsApp Business API"""
-        try:
-            response = requests.post(
-                f"{self.base_url}/messages",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            
-            
+    @retry(
+        stop=stop_after_attempt(GRAPH_API_MAX_ATTEMPTS),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception_type((
+            httpx.TimeoutException,
+            httpx.TransportError,
+            GraphAPIRetryableError
+        )),
+        reraise=True
+    )
+    async def _post_message(self, payload: Dict, outcome: Optional[Dict] = None,
+                            priority: str = Priority.INTERACTIVE,
+                            deadline: Optional[float] = None) -> httpx.Response:
+        """
+        POST to the messages endpoint, honoring the shared backoff controller.
+        Throttling, server errors and latency across attempts are noted in outcome.
+        Raises BackoffPaused when sends stay paused past deadline (time.monotonic()).
+        """
+        outcome = {} if outcome is None else outcome
+        max_wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+        
+        # Waits out Retry-After pauses and open circuits without blocking the loop;
+        # a half-open probe slot is released however this attempt ends
+        async with self.backoff.send_slot(max_wait):
+            await self._check_rate_limit(priority)
+        
+            started_at = time.monotonic()
+            try:
+                response = await get_http_client().post(
+                    f"{self.base_url}/messages",
+                    headers=self.headers,
+                    json=payload
+                )
+            except (httpx.TimeoutException, httpx.TransportError):
+                outcome["server_error"] = True
+                outcome["latency"] = time.monotonic() - started_at
+                self.backoff.record_failure()
+                raise
+        
+            outcome["latency"] = time.monotonic() - started_at
+        
             if response.status_code == 429:
-                retry_after = int(response.headers.get('Retry-After', 60))
-                logger.warning(f"Rate limited by API. Retrying after {retry_after} seconds")
-                time.sleep(retry_after)
-                raise requests.exceptions.RetryError("Rate limited")
+                outcome["throttled"] = True
+                retry_after = self._parse_retry_after(response)
+                logger.warning(f"Rate limited by API. Retrying after {retry_after:.0f} seconds")
+                self.backoff.throttle(retry_after)
+                raise GraphAPIRetryableError(response)
+        
+            if response.status_code >= 500:
+                outcome["server_error"] = True
+                logger.warning(f"Graph API server error {response.status_code}")
+                self.backoff.record_failure()
+                raise GraphAPIRetryableError(response)
+        
+            self.backoff.record_success()
+            return response
+    
+    def _parse_retry_after(self, response: httpx.Response) -> float:
+        """Read the Retry-After header (seconds), falling back to the default"""
+        try:
+            return max(0.0, float(response.headers.get("Retry-After")))
+        except (TypeError, ValueError):
+            return GRAPH_API_DEFAULT_RETRY_AFTER
+    
+    async def _make_request(self, payload: Dict, priority: str = Priority.INTERACTIVE) -> Dict:
+        """
+        Make API request to WhatsApp Business API.
+        Results also carry throttled / server_error / latency for send pacing.
+        Interactive sends wait at most INTERACTIVE_MAX_WAIT for a throttle or
+        open circuit to clear; past that they fail with paused and retry_after.
+        """
+        outcome = {"throttled": False, "server_error": False, "latency": None}
+        deadline = time.monotonic() + INTERACTIVE_MAX_WAIT if priority == Priority.INTERACTIVE else None
+        try:
+            try:
+                response = await self._post_message(payload, outcome, priority, deadline)
+            except GraphAPIRetryableError as e:
+                # Retries exhausted - report the last error response
+                response = e.response
             
-            response_data = response.json()
+            try:
+                response_data = response.json()
+            except ValueError:
+                response_data = {"error": {"message": f"HTTP {response.status_code}"}}
             
             if response.status_code == 200:
                 message_id = response_data.get("messages", [{}])[0].get("id")
@@ -170,7 +231,8 @@ class WhatsAppService:
                 return {
                     "success": True,
                     "message_id": message_id,
-                    "error": None
+                    "error": None,
+                    **outcome
                 }
             else:
                 error = response_data.get("error", {})
@@ -182,41 +244,52 @@ class WhatsAppService:
                     "success": False,
                     "message_id": None,
                     "error": error_msg,
-                    "error_code": error_code
+                    "error_code": error_code,
+                    **outcome
                 }
                 
-        except requests.exceptions.Timeout:
+        except BackoffPaused as e:
+            logger.warning(f"Interactive send not attempted: {e}")
+            return {
+                "success": False,
+                "message_id": None,
+                "error": "Outbound sends are paused by API throttling, retry later",
+                "paused": True,
+                "retry_after": round(e.retry_after),
+                **outcome
+            }
+        except httpx.TimeoutException:
             logger.error("Request timeout")
             return {
                 "success": False,
                 "message_id": None,
-                "error": "Request timeout"
+                "error": "Request timeout",
+                **outcome
             }
-        except requests.exceptions.ConnectionError:
+        except httpx.TransportError:
             logger.error("Connection error")
             return {
                 "success": False,
                 "message_id": None,
-                "error": "Connection error"
+                "error": "Connection error",
+                **outcome
             }
         except Exception as e:
             logger.error(f"Unexpected error: {e}", exc_info=True)
             return {
                 "success": False,
                 "message_id": None,
-                "error": str(e)
+                "error": str(e),
+                **outcome
             }
     
     def normalize_phone_number(self, phone: str) -> str:
         """Normalize phone number for WhatsApp API"""
         
-        cleaned = ''.join(filter(str.isdigit, phone))
-        
-
-        if len(cleaned) == 10:  
-            cleaned = '91' + cleaned
+        normalized, _ = normalize_phone(phone)
         
-        return cleaned
+        # Let the API reject numbers we can't normalize
+        return normalized or ''.join(filter(str.isdigit, phone))
     
     def validate_webhook_signature(self, payload: bytes, signature: str) -> bool:
         """Validate webhook signature from Meta"""
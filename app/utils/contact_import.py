@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from fastapi import UploadFile
+from starlette.concurrency import iterate_in_threadpool
+from app.config import CONTACT_IMPORT_BATCH_SIZE
+from app.utils.logger import logger
+from app.utils.message_template import normalize_field_name
+
+
+PHONE_COLUMN_CANDIDATES = ["phone", "mobile", "phone_number", "whatsapp_number", "number", "contact"]
+NAME_COLUMN_CANDIDATES = ["name", "full_name", "contact_name"]
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    """Pick csv or ndjson from the upload's filename / content type"""
+    filename = (filename or "").lower()
+    content_type = (content_type or "").lower()
+
+    if filename.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    return "csv"
+
+
+def _find_column(fieldnames: List[str], preferred: Optional[str], candidates: List[str]) -> Optional[str]:
+    """Match a header case-insensitively, falling back to common names"""
+    normalized = {name.strip().lower().replace(" ", "_"): name for name in fieldnames if name}
+
+    for wanted in ([preferred] if preferred else []) + candidates:
+        key = wanted.strip().lower().replace(" ", "_")
+        if key in normalized:
+            return normalized[key]
+    return None
+
+
+def _iter_csv_rows(text: io.TextIOBase, phone_column: Optional[str],
+                   name_column: Optional[str]) -> Iterator[Dict]:
+    """Yield contacts from CSV rows; other columns are kept as template fields"""
+    reader = csv.DictReader(text)
+    fieldnames = reader.fieldnames or []
+
+    phone_key = _find_column(fieldnames, phone_column, PHONE_COLUMN_CANDIDATES)
+    name_key = _find_column(fieldnames, name_column, NAME_COLUMN_CANDIDATES)
+
+    if phone_key is None:
+        raise ValueError(f"No phone column found in CSV header: {fieldnames}")
+
+    # Remaining columns become template fields, e.g. "Top 3 Services" -> {top_3_services}
+    field_keys = [
+        (key, normalize_field_name(key)) for key in fieldnames
+        if key and key not in (phone_key, name_key)
+    ]
+
+    for row in reader:
+        yield {
+            # Line in the file (the header is line 1; quoted fields may span lines)
+            "row": reader.line_num,
+            "phone": (row.get(phone_key) or "").strip(),
+            "name": (row.get(name_key) or "").strip() if name_key else "",
+            "fields": {field: (row.get(key) or "").strip() for key, field in field_keys}
+        }
+
+
+def _iter_ndjson_rows(text: io.TextIOBase, phone_column: Optional[str],
+                      name_column: Optional[str]) -> Iterator[Dict]:
+    """Yield contacts from newline-delimited JSON objects"""
+    phone_column = phone_column or "phone"
+    name_column = name_column or "name"
+
+    for line_number, line in enumerate(text, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping malformed NDJSON line {line_number}")
+            row = {}
+
+        if not isinstance(row, dict):
+            row = {}
+
+        yield {
+            "row": line_number,
+            "phone": str(row.get(phone_column) or "").strip(),
+            "name": str(row.get(name_column) or "").strip(),
+            "fields": {
+                normalize_field_name(key): "" if value is None else str(value)
+                for key, value in row.items()
+                if key not in (phone_column, name_column)
+            }
+        }
+
+
+def _iter_batches(upload: UploadFile, file_format: str, phone_column: Optional[str],
+                  name_column: Optional[str], batch_size: int) -> Iterator[List[Dict]]:
+    """Parse the spooled upload lazily and group rows into batches"""
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", errors="replace", newline="")
+    rows = _iter_ndjson_rows if file_format == "ndjson" else _iter_csv_rows
+
+    try:
+        batch = []
+        for contact in rows(text, phone_column, name_column):
+            batch.append(contact)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        # Don't let the wrapper close the underlying upload file
+        text.detach()
+
+
+async def iter_contact_batches(upload: UploadFile, phone_column: Optional[str] = None,
+                               name_column: Optional[str] = None,
+                               batch_size: int = CONTACT_IMPORT_BATCH_SIZE) -> AsyncIterator[List[Dict]]:
+    """
+    Stream-parse an uploaded CSV or NDJSON contact file in batches.
+    Parsing runs in the threadpool so the event loop never reads the file.
+    """
+    file_format = detect_format(upload.filename, upload.content_type)
+    logger.info(f"📥 Importing contacts from {upload.filename} ({file_format})")
+
+    async for batch in iterate_in_threadpool(
+        _iter_batches(upload, file_format, phone_column, name_column, batch_size)
+    ):
+        yield batch
@@ -0,0 +1,60 @@
+"""
+Lookup keys for type-ahead conversation search.
+
+Each conversation stores `search_keys`: every suffix of its phone digits
+("p:919876543210", "p:19876543210", ...) and its normalized name tokens
+("n:saurabh", "n:kumar"). Any digit substring is a prefix of one of the
+suffixes and names match by word prefix, so every search is an anchored
+regex - a range scan on the multikey index instead of a collection scan.
+"""
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+PHONE_KEY = "p:"
+NAME_KEY = "n:"
+
+_PHONE_QUERY = re.compile(r"^[\d\s+\-().]+$")
+_TOKEN = re.compile(r"\w+")
+
+
+def name_tokens(name: Optional[str]) -> List[str]:
+    """Lowercase, accent-free word tokens of a name"""
+    if not name:
+        return []
+    decomposed = unicodedata.normalize("NFKD", name)
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return _TOKEN.findall(folded)
+
+
+def search_keys(user_id: str, user_name: Optional[str] = None) -> List[str]:
+    """All lookup keys for a conversation"""
+    digits = "".join(char for char in user_id or "" if char.isdigit())
+    keys = [PHONE_KEY + digits[start:] for start in range(len(digits))]
+    for token in name_tokens(user_name):
+        key = NAME_KEY + token
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+def is_phone_query(query: str) -> bool:
+    return bool(_PHONE_QUERY.match(query)) and any(char.isdigit() for char in query)
+
+
+def search_filter(query: str) -> Optional[Dict]:
+    """
+    Conversations filter for a type-ahead query: digits match anywhere in the
+    number, words match name word prefixes (all words must match).
+    Returns None when the query has nothing searchable.
+    """
+    query = query.strip()
+    if is_phone_query(query):
+        prefixes = [PHONE_KEY + "".join(char for char in query if char.isdigit())]
+    else:
+        prefixes = [NAME_KEY + token for token in name_tokens(query)]
+
+    clauses = [{"search_keys": {"$regex": "^" + re.escape(prefix)}} for prefix in prefixes]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
@@ -0,0 +1,128 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+
+# {{ / }} are literal braces, {field} or {field|default} are placeholders;
+# any other brace is kept as text
+_TOKEN_PATTERN = re.compile(r"\{\{|\}\}|\{([^{}|]*)(?:\|([^{}]*))?\}|[{}]")
+
+# Defaults that keep the original {name} behaviour
+BUILTIN_DEFAULTS = {"name": "Customer"}
+
+# (field, default or None, placeholder text as written)
+Slot = Tuple[str, Optional[str], str]
+
+
+def normalize_field_name(name: str) -> str:
+    """Normalize a placeholder / CSV column name: 'First Name' -> 'first_name'"""
+    return "_".join(name.strip().lower().split())
+
+
+def _slot_value(values: Mapping[str, str], field: str, default: Optional[str], text: str) -> str:
+    value = values.get(field)
+    if value:
+        return value
+    if default is not None:
+        return default
+    # Not a contact key at all (e.g. "Use code {SAVE10}"): keep it as written
+    return "" if field in values else text
+
+
+class CompiledTemplate:
+    """
+    A message template parsed once into a format string and field slots.
+
+    required_fields are placeholders without a default ({city}, not
+    {city|our city}). A contact that has the field but no value for it
+    can't be rendered; placeholders that aren't contact fields at all are
+    left as written.
+    """
+
+    __slots__ = ("source", "fields", "required_fields", "_format", "_slots", "_static")
+
+    def __init__(self, source: str, format_string: str, slots: List[Slot]):
+        self.source = source
+        self.fields = sorted({field for field, _, _ in slots})
+        self.required_fields = sorted({field for field, default, _ in slots if default is None})
+        self._format = format_string
+        self._slots = tuple(slots)
+        # Templates without placeholders render to the same text for everyone
+        self._static = format_string.format() if not slots else None
+
+    def missing_fields(self, values: Mapping[str, str]) -> List[str]:
+        """Required fields the contact has but left blank"""
+        return [field for field in self.required_fields if field in values and not values[field]]
+
+    def render(self, values: Mapping[str, str]) -> str:
+        """Render for one contact; missing or blank fields use their default"""
+        if self._static is not None:
+            return self._static
+
+        return self._format.format(*[_slot_value(values, *slot) for slot in self._slots])
+
+    def render_batch(self, contacts: Iterable[Mapping[str, str]]) -> List[str]:
+        """Render for a batch of contacts"""
+        if self._static is not None:
+            return [self._static for _ in contacts]
+
+        format_string = self._format
+        slots = self._slots
+        return [
+            format_string.format(*[_slot_value(contact, *slot) for slot in slots])
+            for contact in contacts
+        ]
+
+
+@lru_cache(maxsize=256)
+def compile_template(source: str) -> CompiledTemplate:
+    """
+    Parse a message template.
+
+    Example: "Hi {name}, your {plan|basic} plan renews on {renewal_date}"
+    ({renewal_date} has no default, so contacts with that field must fill it).
+    Use {{ and }} for literal braces; unmatched braces are kept as text.
+    """
+    format_parts = []
+    slots = []
+    position = 0
+
+    for match in _TOKEN_PATTERN.finditer(source):
+        format_parts.append(source[position:match.start()])
+        position = match.end()
+        token = match.group(0)
+
+        if token in ("{{", "}}"):
+            # Escaped literal brace (stays doubled in the format string)
+            format_parts.append(token)
+        elif token in ("{", "}"):
+            format_parts.append(token * 2)
+        else:
+            field = normalize_field_name(match.group(1))
+            if not field:
+                format_parts.append(token.replace("{", "{{").replace("}", "}}"))
+                continue
+            default = match.group(2)
+            if default is None:
+                default = BUILTIN_DEFAULTS.get(field)
+            slots.append((field, default, token))
+            format_parts.append("{}")
+
+    format_parts.append(source[position:])
+    return CompiledTemplate(source, "".join(format_parts), slots)
+
+
+def missing_fields_message(fields: List[str]) -> str:
+    """Validation error for a contact missing required template fields"""
+    return (
+        f"Missing value for template field(s): {', '.join(fields)} "
+        f"(give them a default in the template, e.g. {{{fields[0]}|...}})"
+    )
+
+
+def contact_values(contact: Mapping) -> Dict[str, str]:
+    """Flatten a contact (name, phone and extra fields) into the render lookup"""
+    values = dict(contact.get("fields") or {})
+    values["name"] = contact.get("name") or ""
+    values["phone"] = contact.get("phone") or ""
+    return values
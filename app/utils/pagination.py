@@ -0,0 +1,110 @@
+"""
+Keyset (cursor) pagination on (sort field, _id).
+
+Pages are read with a range condition on the last row seen instead of
+skip(), so every page costs one index seek however deep it is. Cursors are
+opaque url-safe strings; a cursor encodes the boundary row and whether the
+page after it ("next", further down the sort order) or before it ("prev")
+is wanted.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+from bson import ObjectId
+
+
+NEXT = "next"
+PREV = "prev"
+
+
+class Cursor(NamedTuple):
+    value: Any
+    id: ObjectId
+    direction: str
+
+
+def _encode_value(value: Any) -> Dict:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return {"v": value}
+
+
+def _decode_value(data: Dict) -> Any:
+    if "dt" in data:
+        return datetime.fromisoformat(data["dt"])
+    return data.get("v")
+
+
+def encode_cursor(value: Any, doc_id: Any, direction: str = NEXT) -> str:
+    """Opaque cursor for the page after (or before) the row (value, doc_id)"""
+    payload = {**_encode_value(value), "id": str(doc_id), "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Parse a cursor from encode_cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        direction = payload.get("d", NEXT)
+        if direction not in (NEXT, PREV) or not ObjectId.is_valid(payload["id"]):
+            raise ValueError
+        return Cursor(_decode_value(payload), ObjectId(payload["id"]), direction)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def keyset_filter(query: Dict, field: str, cursor: Optional[Cursor]) -> Dict:
+    """Add the 'rows beyond the cursor' condition for a (field desc, _id desc) order"""
+    if cursor is None:
+        return query
+
+    op = "$lt" if cursor.direction == NEXT else "$gt"
+    beyond = {"$or": [
+        {field: {op: cursor.value}},
+        {field: cursor.value, "_id": {op: cursor.id}}
+    ]}
+    if not query:
+        return beyond
+    return {"$and": [query, beyond]}
+
+
+async def fetch_page(collection, query: Dict, field: str, limit: int,
+                     cursor: Optional[Cursor] = None, skip: int = 0,
+                     projection: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    One page of documents ordered newest first by (field, _id).
+
+    With a cursor the page is read by keyset; without one, `skip` is still
+    honoured for older clients. Returns {"items", "next_cursor", "prev_cursor"}:
+    next_cursor continues towards older rows, prev_cursor back towards newer
+    ones, and either is None at that end of the list. Items keep raw _ids.
+    """
+    backwards = cursor is not None and cursor.direction == PREV
+    order = 1 if backwards else -1
+
+    find = collection.find(keyset_filter(query, field, cursor), projection)
+    find = find.sort([(field, order), ("_id", order)])
+    if cursor is None and skip:
+        find = find.skip(skip)
+
+    # One extra row tells us whether there is another page in this direction
+    items: List[Dict] = await find.limit(limit + 1).to_list(length=limit + 1)
+    has_more = len(items) > limit
+    items = items[:limit]
+    if backwards:
+        items.reverse()
+
+    next_cursor = prev_cursor = None
+    if items:
+        first, last = items[0], items[-1]
+        more_older = has_more if not backwards else True
+        more_newer = has_more if backwards else (cursor is not None or skip > 0)
+        if more_older:
+            next_cursor = encode_cursor(last.get(field), last["_id"], NEXT)
+        if more_newer:
+            prev_cursor = encode_cursor(first.get(field), first["_id"], PREV)
+
+    return {"items": items, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
@@ -0,0 +1,105 @@
+import re
+import unicodedata
+from typing import List, Optional, Sequence, Tuple
+from app.config import DEFAULT_COUNTRY_CODE
+
+
+# Spaces, dashes, brackets etc.; only digits and '+' matter
+_NON_DIGITS = re.compile(r"[^0-9+]")
+
+E164_MIN_DIGITS = 8
+E164_MAX_DIGITS = 15
+
+# Expected national number length for country codes we know (country codes are prefix-free)
+NATIONAL_NUMBER_LENGTHS = {
+    "91": 10,
+}
+
+
+class PhoneError:
+    """Per-row validation error codes"""
+    MISSING = "missing"
+    TOO_SHORT = "too_short"
+    TOO_LONG = "too_long"
+    INVALID_LENGTH = "invalid_length"
+
+
+def _classify(stripped: str) -> Tuple[Optional[str], Optional[str]]:
+    """Apply E.164 rules to a digits-only number that may start with '+'"""
+    if stripped.startswith("+"):
+        digits = stripped.replace("+", "")
+        international = True
+    else:
+        digits = stripped.replace("+", "") if "+" in stripped else stripped
+        international = False
+
+        if digits.startswith("00"):
+            # International dialling prefix: 00 44 ... == +44 ...
+            digits = digits[2:]
+            international = True
+        elif len(digits) == 11 and digits[0] == "0":
+            # Domestic trunk prefix: 0 98765 43210
+            digits = DEFAULT_COUNTRY_CODE + digits[1:]
+            international = True
+        elif len(digits) == 10:
+            digits = DEFAULT_COUNTRY_CODE + digits
+            international = True
+
+    if not digits:
+        return None, PhoneError.MISSING
+    if len(digits) < (E164_MIN_DIGITS if international else 10):
+        return None, PhoneError.TOO_SHORT
+    if len(digits) > E164_MAX_DIGITS:
+        return None, PhoneError.TOO_LONG
+
+    for country_code, national_length in NATIONAL_NUMBER_LENGTHS.items():
+        if digits.startswith(country_code) and len(digits) - len(country_code) != national_length:
+            return None, PhoneError.INVALID_LENGTH
+
+    return digits, None
+
+
+def _ascii_digits(value: str) -> str:
+    """Map non-ASCII decimal digits (e.g. Devanagari) to ASCII"""
+    return "".join(str(unicodedata.decimal(char)) if char.isdecimal() else char for char in value)
+
+
+def normalize_phone(phone: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Normalize a phone number to E.164 digits (no '+').
+    Returns (number, None), or (None, error code from PhoneError).
+    """
+    if phone is None:
+        return None, PhoneError.MISSING
+
+    value = phone if isinstance(phone, str) else str(phone)
+    if not value.isascii():
+        value = _ascii_digits(value)
+
+    stripped = _NON_DIGITS.sub("", value)
+    if not stripped:
+        return None, PhoneError.MISSING
+    return _classify(stripped)
+
+
+def normalize_phones(phones: Sequence[Optional[str]]) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+    """Normalize a list of phone numbers; (numbers, errors) are aligned with the input"""
+    numbers = []
+    errors = []
+    for phone in phones:
+        number, error = normalize_phone(phone)
+        numbers.append(number)
+        errors.append(error)
+    return numbers, errors
+
+
+def phone_error_message(error: str, phone: str) -> str:
+    """Human readable message for a PhoneError code"""
+    digits = sum(character.isdigit() for character in phone or "")
+    if error == PhoneError.MISSING:
+        return "Phone number is required"
+    if error == PhoneError.TOO_SHORT:
+        return f"Invalid phone number (too short: {digits} digits)"
+    if error == PhoneError.TOO_LONG:
+        return f"Invalid phone number (too long: {digits} digits, max {E164_MAX_DIGITS})"
+    return f"Invalid phone number ({digits} digits is not a valid length for its country code)"
@@ -0,0 +1,104 @@
+"""
+Single-pass parsing of WhatsApp webhook payloads.
+
+The verified request bytes are decoded once (orjson when installed) and
+walked once into (kind, user_id, event) tuples. Inbound messages are turned
+straight into the stored document shape, so known message types can be
+saved without a Pydantic round trip.
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Union
+from app.models.message import MessageType
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+# Types the Message model accepts; documents of these types are stored as built
+KNOWN_MESSAGE_TYPES = frozenset(message_type.value for message_type in MessageType)
+
+# type -> placeholder body; captions replace it for image/video
+_MEDIA_BODIES = {
+    "image": "[Image]",
+    "video": "[Video]",
+    "audio": "[Audio]",
+    "document": "[Document]",
+}
+_CAPTIONED = frozenset({"image", "video"})
+
+
+class WebhookEvent(NamedTuple):
+    kind: str  # "message" or "status"
+    user_id: str
+    data: Dict[str, Any]
+
+
+def loads(payload: Union[bytes, str]) -> Any:
+    """Decode JSON with orjson if available, else the standard library"""
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def extract_events(body: Dict) -> List[WebhookEvent]:
+    """Split a webhook payload into events in delivery order"""
+    events = []
+    for webhook_entry in body.get("entry") or ():
+        for change in webhook_entry.get("changes") or ():
+            value = change.get("value")
+            if not value:
+                continue
+
+            for message in value.get("messages") or ():
+                events.append(WebhookEvent("message", message.get("from", ""), message))
+
+            for status in value.get("statuses") or ():
+                events.append(WebhookEvent("status", status.get("recipient_id", ""), status))
+    return events
+
+
+def inbound_message_document(message: Dict) -> Dict[str, Any]:
+    """Build the messages-collection document for an inbound webhook message"""
+    message_type = message.get("type")
+    now = datetime.utcnow()
+    document = {
+        "user_id": message["from"],
+        "direction": "inbound",
+        "message_type": message_type,
+        "body": "",
+        "timestamp": datetime.fromtimestamp(int(message["timestamp"])),
+        "status": "received",
+        "message_id": message["id"],
+        "retry_count": 0,
+        "created_at": now,
+        "updated_at": now
+    }
+
+    if message_type == "text":
+        document["body"] = (message.get("text") or {}).get("body", "")
+
+    elif message_type in _MEDIA_BODIES:
+        media = message.get(message_type) or {}
+        document["body"] = _MEDIA_BODIES[message_type]
+        document["media_type"] = message_type
+        if media.get("id") is not None:
+            document["media_id"] = media["id"]
+        if message_type in _CAPTIONED and media.get("caption"):
+            document["body"] = media["caption"]
+        elif message_type == "document" and media.get("filename"):
+            document["body"] = f"[Document: {media['filename']}]"
+
+    elif message_type == "location":
+        location = message.get("location") or {}
+        document["body"] = f"[Location: {location.get('latitude', '')}, {location.get('longitude', '')}]"
+
+    elif message_type == "contacts":
+        document["body"] = "[Contact Card]"
+
+    else:
+        document["body"] = f"[{message_type.capitalize()}]"
+
+    return document
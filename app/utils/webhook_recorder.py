@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import List, Optional
+from app.config import WEBHOOK_RECORD_PATH
+from app.utils.logger import logger
+
+
+class WebhookRecorder:
+    """
+    Append verified webhook payloads to an NDJSON file for later replay.
+
+    Each line is {"received_at", "signature", "body"} with the raw body text,
+    the format scripts/webhook_replay.py reads. Disabled unless
+    WEBHOOK_RECORD_PATH is set; meant for capture sessions, not always-on.
+    record() only queues the line; a background task writes queued lines
+    in a worker thread, so disk I/O never blocks the event loop.
+    """
+
+    MAX_QUEUED = 10000
+
+    def __init__(self, path: Optional[str] = WEBHOOK_RECORD_PATH):
+        self.path = path
+        self._file = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def record(self, body: bytes, signature: str = ""):
+        """Queue one payload; a slow or full disk never fails or delays the webhook"""
+        if self._writer is None:
+            self._queue = asyncio.Queue(maxsize=self.MAX_QUEUED)
+            self._writer = asyncio.create_task(self._write_loop())
+
+        line = json.dumps({
+            "received_at": datetime.utcnow().isoformat(),
+            "signature": signature,
+            "body": body.decode("utf-8", errors="replace")
+        }) + "\n"
+        try:
+            self._queue.put_nowait(line)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _write_loop(self):
+        """Write queued lines in batches until close() queues None"""
+        while True:
+            lines: List[str] = [await self._queue.get()]
+            while not self._queue.empty():
+                lines.append(self._queue.get_nowait())
+
+            stop = None in lines
+            lines = [line for line in lines if line is not None]
+            if lines:
+                try:
+                    await asyncio.to_thread(self._write, lines)
+                    self.recorded += len(lines)
+                except Exception as e:
+                    logger.error(f"Error recording webhook payloads: {e}")
+            if stop:
+                return
+
+    def _write(self, lines: List[str]):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+            logger.info(f"🎙️ Recording webhooks to {self.path}")
+
+        self._file.writelines(lines)
+        self._file.flush()
+
+    async def close(self):
+        """Write everything queued, then close the file"""
+        if self._writer is not None:
+            await self._queue.put(None)
+            await self._writer
+            self._writer = None
+            self._queue = None
+
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+        if self.dropped:
+            logger.warning(f"Webhook recorder dropped {self.dropped} payloads while the disk lagged")
+
+
+# Create global instance
+webhook_recorder = WebhookRecorder()
@@ -0,0 +1,136 @@
+"""
+Benchmark: unanchored $regex search vs. the messages text index
+
+Usage:
+    python scripts/bench_message_search.py [--uri mongodb://localhost:27017] \\
+        [--database bench_message_search] [--messages 2000000] [--users 50000] \\
+        [--runs 20] [--keep]
+
+Needs a real MongoDB (mongomock has no $text). Fills a scratch database with
+a synthetic chat corpus, builds the app's registered indexes, then times the
+old regex query and the $text query for a few search terms, globally and
+within one conversation, and prints latency plus explain() keys/docs examined.
+The scratch database is dropped afterwards unless --keep is given, and reused
+if it already holds enough messages.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config refuses to import without these; the benchmark never calls the API
+os.environ.setdefault("WHATSAPP_ACCESS_TOKEN", "bench")
+os.environ.setdefault("WHATSAPP_PHONE_NUMBER_ID", "bench")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from app.database.indexes import INDEXES  # noqa: E402
+
+
+WORDS = (
+    "hello hi namaste thanks thank you please order delivery payment refund invoice gst audit "
+    "price quote meeting call tomorrow today kal aaj kitna paisa bhejo done ok sure address "
+    "location document photo sir madam help support issue problem resolved pending status "
+    "registration account login otp password plan gold silver renewal offer discount"
+).split()
+SEARCHES = ["refund", "invoice gst", "\"payment pending\"", "otp", "xylophone"]
+
+
+def fill(collection, messages: int, users: int):
+    """Insert a synthetic corpus in batches"""
+    rng = random.Random(7)
+    started = datetime(2025, 1, 1)
+    batch = []
+    for i in range(messages):
+        batch.append({
+            "user_id": f"91{9000000000 + rng.randrange(users)}",
+            "direction": "inbound" if i % 2 else "outbound",
+            "message_type": "text",
+            "body": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25))),
+            "timestamp": started + timedelta(seconds=i * 10),
+            "status": "received",
+        })
+        if len(batch) == 10_000:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+            print(f"\r  inserted {i + 1:,}/{messages:,}", end="", flush=True)
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    print()
+
+
+def timed(label: str, run, runs: int):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        results = run()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"  {label:<34} p50 {statistics.median(samples):8.1f} ms  p95 {p95:8.1f} ms  {len(results):>3} hits")
+
+
+def examined(cursor) -> str:
+    stats = cursor.explain().get("executionStats", {})
+    return f"keys {stats.get('totalKeysExamined', '?'):>9}  docs {stats.get('totalDocsExamined', '?'):>9}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="bench_message_search")
+    parser.add_argument("--messages", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri)
+    database = client[args.database]
+    messages = database.messages
+
+    try:
+        if messages.estimated_document_count() < args.messages:
+            messages.drop()
+            print(f"Generating {args.messages:,} messages for {args.users:,} users...")
+            fill(messages, args.messages, args.users)
+
+        print("Building indexes...")
+        started = time.perf_counter()
+        messages.create_indexes(INDEXES["messages"])
+        print(f"  done in {time.perf_counter() - started:.1f}s\n")
+
+        user_id = messages.find_one({}, {"user_id": 1})["user_id"]
+        for term in SEARCHES:
+            print(f"search {term!r}")
+            regex = {"body": {"$regex": term.strip('"'), "$options": "i"}}
+            text = {"$text": {"$search": term}}
+            by_score = [("score", {"$meta": "textScore"}), ("timestamp", -1)]
+            score = {"score": {"$meta": "textScore"}}
+
+            timed("regex, all messages", lambda: list(
+                messages.find(regex).sort("timestamp", -1).limit(args.limit)), args.runs)
+            timed("$text, all messages", lambda: list(
+                messages.find(text, score).sort(by_score).limit(args.limit)), args.runs)
+            timed("regex, one conversation", lambda: list(
+                messages.find({**regex, "user_id": user_id}).sort("timestamp", -1).limit(args.limit)), args.runs)
+            timed("$text, one conversation", lambda: list(
+                messages.find({**text, "user_id": user_id}, score).sort(by_score).limit(args.limit)), args.runs)
+
+            print(f"  explain regex: {examined(messages.find(regex).sort('timestamp', -1).limit(args.limit))}")
+            print(f"  explain $text: {examined(messages.find(text, score).sort(by_score).limit(args.limit))}\n")
+    finally:
+        if not args.keep:
+            client.drop_database(args.database)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
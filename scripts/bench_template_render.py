@@ -0,0 +1,117 @@
+"""
+Micro-benchmark: compiled message templates vs. per-contact str.replace
+
+Usage:
+    python scripts/bench_template_render.py [--contacts 100000] [--rate 80]
+
+Reports the render cost per contact and its share of the per-message budget
+of the send loop at the given rate (80 msg/s = 12.5 ms per message), plus
+the one-off cost of compiling a template.
+
+Rendering is a tiny fraction of the send budget either way, and the compiled
+engine is not faster than a plain str.replace chain (which can't do
+{field|default}, literal braces or required-field checks); the numbers are
+here to show that, not a speedup. Re-parsing the template for every contact
+is the case to avoid.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.message_template import compile_template, contact_values  # noqa: E402
+
+
+TEMPLATE = (
+    "Hello {name}, thanks for registering from {city|your city}, {state}! "
+    "Your {plan|free} plan includes {services|our core services}. "
+    "Reply to this message or call {branch_phone|our helpline} to talk to "
+    "{agent|our team}. Offer code: {code}."
+)
+
+CITIES = ["Delhi", "Mumbai", "Pune", "Bhiwani", "Jaipur", ""]
+PLANS = ["gold", "silver", ""]
+
+
+def make_contacts(count: int):
+    """Synthetic contacts with a mix of present and missing fields"""
+    rng = random.Random(42)
+    return [
+        {
+            "phone": f"91{rng.randrange(10**9, 10**10)}",
+            "name": f"Customer {i}" if i % 7 else "",
+            "fields": {
+                "city": rng.choice(CITIES),
+                "state": "Haryana",
+                "plan": rng.choice(PLANS),
+                "services": "GST, Audits" if i % 3 else "",
+                "code": f"SAVE{i % 100}",
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def naive_render(template: str, contact: dict) -> str:
+    """Baseline: re-scan the template with str.replace for every field, per contact"""
+    message = template.replace("{name}", contact.get("name") or "Customer")
+    for field, value in contact["fields"].items():
+        message = message.replace("{" + field + "}", value)
+    return message
+
+
+def compile_cost(repeats: int = 1000) -> float:
+    """Average ns to parse the template, bypassing the compile cache"""
+    started = time.perf_counter_ns()
+    for _ in range(repeats):
+        compile_template.__wrapped__(TEMPLATE)
+    return (time.perf_counter_ns() - started) / repeats
+
+
+def timed(label: str, func, count: int, budget_ns: float) -> float:
+    started = time.perf_counter_ns()
+    func()
+    elapsed = time.perf_counter_ns() - started
+    per_contact = elapsed / count
+    print(f"{label:<34} {elapsed / 1e6:9.1f} ms total  {per_contact:8.0f} ns/contact  "
+          f"{per_contact / budget_ns * 100:6.3f}% of send budget")
+    return per_contact
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=100_000)
+    parser.add_argument("--rate", type=float, default=80.0, help="send rate (msg/s) used for the budget")
+    args = parser.parse_args()
+
+    contacts = make_contacts(args.contacts)
+    budget_ns = 1e9 / args.rate
+
+    print(f"{args.contacts} contacts, {len(TEMPLATE)}-char template, "
+          f"send budget {budget_ns / 1e6:.1f} ms/message\n")
+
+    print(f"compile (once per campaign)         {compile_cost() / 1e3:9.1f} us\n")
+
+    reparse = timed("re-parse template per contact",
+                    lambda: [compile_template.__wrapped__(TEMPLATE).render(contact_values(c)) for c in contacts],
+                    args.contacts, budget_ns)
+
+    template = compile_template(TEMPLATE)
+    naive = timed("naive str.replace per contact", lambda: [naive_render(TEMPLATE, c) for c in contacts],
+                  args.contacts, budget_ns)
+    compiled = timed("compiled render per contact", lambda: [template.render(contact_values(c)) for c in contacts],
+                     args.contacts, budget_ns)
+
+    values = [contact_values(c) for c in contacts]
+    timed("compiled render_batch", lambda: template.render_batch(values), args.contacts, budget_ns)
+
+    ratio = compiled / naive
+    print(f"\ncompiled vs naive str.replace: {ratio:.2f}x the time per contact "
+          f"({'slower' if ratio > 1 else 'faster'}); compiled vs re-parsing: {reparse / compiled:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Micro-benchmark: webhook parsing, old double-parse path vs. the single-pass fast path
+
+Usage:
+    python scripts/bench_webhook_parse.py [--payloads recorded.jsonl] [--count 20000]
+
+--payloads is an NDJSON file with one {"body": "<raw webhook body>"} object
+per line, as captured with WEBHOOK_RECORD_PATH or scripts/webhook_replay.py extract. Without it a synthetic
+mix of text/media messages and status updates is used.
+
+"old" is what receive_webhook did per request: json.loads for the signature
+body and again for request.json(), format the whole body into the INFO log,
+walk it with nested .get() calls and push each message through
+Message(**data).model_dump(). "fast" is loads() once + extract_events() +
+inbound_message_document().
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config refuses to import without these; the benchmark never calls the API
+os.environ.setdefault("WHATSAPP_ACCESS_TOKEN", "bench")
+os.environ.setdefault("WHATSAPP_PHONE_NUMBER_ID", "bench")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from datetime import datetime  # noqa: E402
+from app.models.message import Message  # noqa: E402
+from app.utils import webhook_parser  # noqa: E402
+from app.utils.webhook_parser import extract_events, inbound_message_document, loads  # noqa: E402
+
+
+def synthetic_payloads(count: int):
+    """Payloads shaped like Meta's: mostly status batches, some inbound messages"""
+    rng = random.Random(42)
+    payloads = []
+    for i in range(count):
+        phone = f"91{rng.randrange(10**9, 10**10)}"
+        value = {
+            "messaging_product": "whatsapp",
+            "metadata": {"display_phone_number": "15550000000", "phone_number_id": "1234567890"},
+        }
+        if i % 4 == 0:
+            kind = rng.choice(["text", "text", "image", "document"])
+            message = {"from": phone, "id": f"wamid.in.{i}", "timestamp": str(1700000000 + i), "type": kind}
+            if kind == "text":
+                message["text"] = {"body": "Hello, I would like to know more about the offer " * 2}
+            elif kind == "image":
+                message["image"] = {"id": f"media{i}", "mime_type": "image/jpeg", "caption": "photo"}
+            else:
+                message["document"] = {"id": f"media{i}", "filename": "invoice.pdf"}
+            value["contacts"] = [{"profile": {"name": "Customer"}, "wa_id": phone}]
+            value["messages"] = [message]
+        else:
+            value["statuses"] = [
+                {
+                    "id": f"wamid.out.{i}.{j}",
+                    "status": rng.choice(["sent", "delivered", "read"]),
+                    "timestamp": str(1700000000 + i),
+                    "recipient_id": phone,
+                    "conversation": {"id": "conv", "origin": {"type": "marketing"}},
+                    "pricing": {"billable": True, "pricing_model": "CBP", "category": "marketing"},
+                }
+                for j in range(rng.randint(1, 5))
+            ]
+        body = {"object": "whatsapp_business_account",
+                "entry": [{"id": "1", "changes": [{"value": value, "field": "messages"}]}]}
+        payloads.append(json.dumps(body).encode())
+    return payloads
+
+
+def recorded_payloads(path: str):
+    with open(path, "rb") as recording:
+        return [json.loads(line)["body"].encode() for line in recording if line.strip()]
+
+
+def old_message_data(message: dict) -> dict:
+    """The per-type if/elif chain from the old _process_incoming_message"""
+    message_type = message.get("type")
+    message_data = {
+        "user_id": message["from"],
+        "direction": "inbound",
+        "message_type": message_type,
+        "body": "",
+        "timestamp": datetime.fromtimestamp(int(message["timestamp"])),
+        "status": "received",
+        "message_id": message["id"],
+    }
+    if message_type == "text":
+        message_data["body"] = message.get("text", {}).get("body", "")
+    elif message_type in ("image", "video", "audio", "document"):
+        media = message.get(message_type, {})
+        message_data["body"] = f"[{message_type.capitalize()}]"
+        message_data["media_id"] = media.get("id")
+        message_data["media_type"] = message_type
+        if message_type in ("image", "video") and media.get("caption"):
+            message_data["body"] = media["caption"]
+        if message_type == "document" and media.get("filename"):
+            message_data["body"] = f"[Document: {media['filename']}]"
+    else:
+        message_data["body"] = f"[{message_type.capitalize()}]"
+    return message_data
+
+
+def old_path(raw: bytes) -> int:
+    json.loads(raw)  # signature step kept the bytes; request.json() parsed them again
+    body = json.loads(raw)
+    _ = f"📨 Received webhook: {body}"
+    events = 0
+    for webhook_entry in body.get("entry", []):
+        for change in webhook_entry.get("changes", []):
+            value = change.get("value", {})
+            for message in value.get("messages", []):
+                Message(**old_message_data(message)).model_dump(by_alias=True, exclude_none=True)
+                events += 1
+            for status in value.get("statuses", []):
+                status.get("id"), status.get("status"), status.get("recipient_id")
+                events += 1
+    return events
+
+
+def fast_path(raw: bytes) -> int:
+    events = extract_events(loads(raw))
+    for kind, _, event in events:
+        if kind == "message":
+            inbound_message_document(event)
+        else:
+            event.get("id"), event.get("status"), event.get("recipient_id")
+    return len(events)
+
+
+def timed(label: str, func, payloads) -> float:
+    started = time.perf_counter_ns()
+    events = sum(func(raw) for raw in payloads)
+    elapsed = time.perf_counter_ns() - started
+    per_payload = elapsed / len(payloads)
+    print(f"{label:<10} {elapsed / 1e6:9.1f} ms total  {per_payload / 1000:7.1f} µs/payload  "
+          f"{elapsed / max(events, 1) / 1000:7.1f} µs/event")
+    return per_payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payloads", help="recorded payloads (JSONL with a 'body' per line)")
+    parser.add_argument("--count", type=int, default=20_000, help="synthetic payloads when --payloads is not given")
+    args = parser.parse_args()
+
+    payloads = recorded_payloads(args.payloads) if args.payloads else synthetic_payloads(args.count)
+    size = sum(len(raw) for raw in payloads) / len(payloads)
+    decoder = "orjson" if webhook_parser.orjson is not None else "json (orjson not installed)"
+    print(f"{len(payloads)} payloads, {size:.0f} bytes avg, decoder: {decoder}\n")
+
+    old = timed("old", old_path, payloads)
+    fast = timed("fast", fast_path, payloads)
+    print(f"\nspeed-up: {old / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
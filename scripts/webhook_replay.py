@@ -0,0 +1,219 @@
+"""
+Record-and-replay load testing for the webhook endpoint
+
+Capture:
+    Set WEBHOOK_RECORD_PATH=storage/recordings/webhooks.ndjson on an instance
+    to append every verified payload, or pull payloads out of existing logs:
+
+    python scripts/webhook_replay.py extract [--logs storage/logs] [--out webhooks.ndjson]
+
+    Log extraction understands the JSON log lines written by app.utils.logger:
+    "Received webhook: {...}" (INFO, older builds) and "Webhook body: b'...'"
+    (DEBUG).
+
+Replay:
+    python scripts/webhook_replay.py replay webhooks.ndjson \\
+        [--url http://localhost:8000/webhook] [--rate 200] [--concurrency 50] \\
+        [--loops 1] [--fresh-ids] [--secret $WHATSAPP_APP_SECRET]
+
+Every body is re-signed with the app secret (X-Hub-Signature-256), so replays
+pass signature validation. Requests are sent open-loop at --rate, with at
+most --concurrency in flight; --fresh-ids rewrites message/status ids per
+loop so the idempotency layer doesn't drop repeats. Prints throughput,
+status codes, latency percentiles and a latency histogram.
+"""
+import argparse
+import ast
+import asyncio
+import glob
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+
+INFO_PREFIX = "Received webhook: "
+DEBUG_PREFIX = "Webhook body: "
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+# ---------- capture ----------
+
+def payloads_from_log_line(line: str) -> Optional[str]:
+    """Raw webhook body text from one JSON log line, or None"""
+    try:
+        message = json.loads(line).get("message", "")
+    except (ValueError, AttributeError):
+        return None
+
+    if INFO_PREFIX in message:
+        # str(dict) of the parsed body - turn it back into JSON
+        body = ast.literal_eval(message.split(INFO_PREFIX, 1)[1])
+        return json.dumps(body, ensure_ascii=False, separators=(",", ":"))
+    if message.startswith(DEBUG_PREFIX):
+        # repr() of the exact request bytes
+        return ast.literal_eval(message[len(DEBUG_PREFIX):]).decode("utf-8")
+    return None
+
+
+def extract(args):
+    """Write payloads found in the log files as replayable NDJSON"""
+    files = sorted(glob.glob(os.path.join(args.logs, "*.log")))
+    found = 0
+    with open(args.out, "w", encoding="utf-8") as out:
+        for path in files:
+            with open(path, encoding="utf-8", errors="replace") as log_file:
+                for line in log_file:
+                    try:
+                        body = payloads_from_log_line(line)
+                    except (ValueError, SyntaxError):
+                        continue
+                    if body is None:
+                        continue
+                    out.write(json.dumps({"source": os.path.basename(path), "body": body}) + "\n")
+                    found += 1
+    print(f"Extracted {found} webhook payloads from {len(files)} log files -> {args.out}")
+
+
+def load_recording(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as recording:
+        return [json.loads(line)["body"] for line in recording if line.strip()]
+
+
+# ---------- replay ----------
+
+def sign(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def with_fresh_ids(body: str, suffix: str) -> str:
+    """Make message and status ids unique for this loop"""
+    payload = json.loads(body)
+    for webhook_entry in payload.get("entry") or ():
+        for change in webhook_entry.get("changes") or ():
+            value = change.get("value") or {}
+            for event in (value.get("messages") or []) + (value.get("statuses") or []):
+                if "id" in event:
+                    event["id"] = f"{event['id']}.{suffix}"
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def iter_requests(bodies: List[str], loops: int, fresh_ids: bool) -> Iterator[str]:
+    for loop in range(loops):
+        for index, body in enumerate(bodies):
+            yield with_fresh_ids(body, f"r{loop}.{index}") if fresh_ids else body
+
+
+async def replay(args):
+    bodies = load_recording(args.recording)
+    if not bodies:
+        sys.exit(f"No payloads in {args.recording}")
+    if not args.secret:
+        print("⚠️  No app secret - requests are sent unsigned")
+
+    total = len(bodies) * args.loops
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def send(client: httpx.AsyncClient, body: str):
+        data = body.encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if args.secret:
+            headers["X-Hub-Signature-256"] = sign(data, args.secret)
+        try:
+            started = time.perf_counter()
+            response = await client.post(args.url, content=data, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+        finally:
+            semaphore.release()
+
+    print(f"Replaying {total} payloads ({len(bodies)} x {args.loops}) to {args.url} "
+          f"at {args.rate or 'max'} req/s, concurrency {args.concurrency}")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        tasks = []
+        started = time.perf_counter()
+        for sent, body in enumerate(iter_requests(bodies, args.loops, args.fresh_ids)):
+            if args.rate:
+                # Open loop: request n goes out at n / rate regardless of responses
+                delay = started + sent / args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(send(client, body)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    report(latencies, statuses, elapsed)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def report(latencies: List[float], statuses: Counter, elapsed: float):
+    completed = sum(statuses.values())
+    print(f"\n{completed} requests in {elapsed:.2f}s = {completed / elapsed:.1f} req/s")
+    print("status: " + ", ".join(f"{status} x{count}" for status, count in sorted(statuses.items(), key=str)))
+    if not latencies:
+        return
+
+    values = sorted(latency * 1000 for latency in latencies)
+    print(f"latency ms: min {values[0]:.1f}  p50 {percentile(values, 0.5):.1f}  "
+          f"p90 {percentile(values, 0.9):.1f}  p99 {percentile(values, 0.99):.1f}  max {values[-1]:.1f}\n")
+
+    counts: Dict[str, int] = {}
+    lower = 0
+    for upper in HISTOGRAM_BUCKETS + [None]:
+        label = f"{lower:>5}-{upper:<5} ms" if upper else f"{lower:>5}+{'':<5} ms"
+        counts[label] = sum(1 for value in values if value >= lower and (upper is None or value < upper))
+        lower = upper
+    widest = max(counts.values())
+    for label, count in counts.items():
+        bar = "#" * round(count / widest * 50) if widest else ""
+        print(f"{label} {count:>7}  {bar}")
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    extract_parser = commands.add_parser("extract", help="pull webhook payloads out of JSON logs")
+    extract_parser.add_argument("--logs", default="storage/logs")
+    extract_parser.add_argument("--out", default="webhooks.ndjson")
+
+    replay_parser = commands.add_parser("replay", help="replay recorded payloads against an instance")
+    replay_parser.add_argument("recording", help="NDJSON with a 'body' per line")
+    replay_parser.add_argument("--url", default="http://localhost:8000/webhook")
+    replay_parser.add_argument("--rate", type=float, default=0, help="requests per second (0 = as fast as possible)")
+    replay_parser.add_argument("--concurrency", type=int, default=20)
+    replay_parser.add_argument("--loops", type=int, default=1, help="replay the recording this many times")
+    replay_parser.add_argument("--fresh-ids", action="store_true", help="rewrite message/status ids per request")
+    replay_parser.add_argument("--timeout", type=float, default=30.0)
+    replay_parser.add_argument("--secret", default=os.getenv("WHATSAPP_APP_SECRET"),
+                               help="app secret used to re-sign bodies (default: WHATSAPP_APP_SECRET)")
+
+    args = parser.parse_args()
+    if args.command == "extract":
+        extract(args)
+    else:
+        asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main()
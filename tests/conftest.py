@@ -0,0 +1,28 @@
+import os
+
+# app.config reads these at import time; the tests never call the Graph API
+os.environ.setdefault("WHATSAPP_ACCESS_TOKEN", "test")
+os.environ.setdefault("WHATSAPP_PHONE_NUMBER_ID", "test")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+import mongomock.collection  # noqa: E402
+import pytest  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+from app.database.mongodb import db  # noqa: E402
+
+
+# pymongo passes sort= to bulk updates, which mongomock's builder doesn't accept yet
+_add_update = mongomock.collection.BulkOperationBuilder.add_update
+mongomock.collection.BulkOperationBuilder.add_update = (
+    lambda self, *args, sort=None, **kwargs: _add_update(self, *args, **kwargs)
+)
+
+
+@pytest.fixture
+def database():
+    """In-memory MongoDB wired into the app's db handle"""
+    db.async_client = AsyncMongoMockClient()
+    db.async_db = db.async_client["test"]
+    yield db.async_db
+    db.async_client = None
+    db.async_db = None
@@ -0,0 +1,107 @@
+import asyncio
+import httpx
+import pytest
+from app.services.backoff import BackoffController, BackoffPaused
+
+
+def half_open_controller() -> BackoffController:
+    """A breaker whose cooldown has already elapsed, so the next send is the probe"""
+    controller = BackoffController(failure_threshold=1, cooldown=0)
+    controller.record_failure()
+    assert controller.state == BackoffController.OPEN
+    return controller
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_slot():
+    controller = half_open_controller()
+    probing = asyncio.Event()
+
+    async def probe():
+        async with controller.send_slot():
+            probing.set()
+            await asyncio.sleep(60)
+
+    task = asyncio.create_task(probe())
+    await probing.wait()
+    assert controller.state == BackoffController.HALF_OPEN
+    assert not controller.is_ready()
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # The next caller becomes the probe instead of polling forever
+    assert controller.is_ready()
+    async with asyncio.timeout(1):
+        async with controller.send_slot():
+            assert not controller.is_ready()
+
+
+@pytest.mark.asyncio
+async def test_probe_failing_with_unexpected_error_releases_slot():
+    controller = half_open_controller()
+
+    with pytest.raises(ValueError):
+        async with controller.send_slot():
+            raise ValueError("bad payload")
+
+    assert controller.state == BackoffController.HALF_OPEN
+    assert controller.is_ready()
+
+
+@pytest.mark.asyncio
+async def test_stale_token_does_not_release_next_probe():
+    controller = half_open_controller()
+
+    first = await controller.wait_until_ready()
+    controller.record_success()
+    controller.record_failure()
+    second = await controller.wait_until_ready()
+
+    controller.release_probe(first)
+    assert not controller.is_ready()
+    controller.release_probe(second)
+    assert controller.is_ready()
+
+
+@pytest.mark.asyncio
+async def test_wait_longer_than_max_wait_fails_fast():
+    controller = BackoffController(failure_threshold=5, cooldown=30)
+    controller.throttle(60)
+
+    async with asyncio.timeout(1):
+        with pytest.raises(BackoffPaused) as paused:
+            async with controller.send_slot(max_wait=5):
+                pass
+
+    assert 55 < paused.value.retry_after <= 60
+
+
+@pytest.mark.asyncio
+async def test_wait_within_max_wait_goes_ahead():
+    controller = BackoffController(failure_threshold=5, cooldown=30)
+    controller.throttle(0.05)
+
+    async with asyncio.timeout(1):
+        async with controller.send_slot(max_wait=5):
+            assert controller.is_ready()
+
+
+@pytest.mark.asyncio
+async def test_paused_interactive_send_returns_503_without_waiting(monkeypatch):
+    from app.main import app
+    from app.services import whatsapp
+
+    controller = BackoffController(failure_threshold=5, cooldown=30)
+    controller.throttle(120)
+    monkeypatch.setattr(whatsapp, "get_backoff_controller", lambda key: controller)
+
+    async with asyncio.timeout(2):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/api/messages/send", json={
+                "to": "919876543210", "message": "hi", "message_type": "text"
+            })
+
+    assert response.status_code == 503
+    assert 100 < int(response.headers["Retry-After"]) <= 120
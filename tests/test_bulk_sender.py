@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from app.services.bulk_sender import BulkMessageSender
+
+
+class SlowWhatsApp:
+    """Takes 20ms per send and tracks how many sends overlap"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.bodies = {}
+
+    async def send_text_message(self, to, message, priority=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            self.in_flight -= 1
+        self.bodies[to] = message
+        if to in self.failing:
+            return {"success": False, "message_id": None, "error": "Invalid parameter", "error_code": 100}
+        return {"success": True, "message_id": f"wamid.{to}", "error": None}
+
+
+def contacts(count):
+    return [{"phone": f"9198765432{i:02d}", "name": f"C{i}", "seq": i} for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_send_is_bounded_and_stores_every_result(database):
+    whatsapp = SlowWhatsApp(failing={"919876543203"})
+    sender = BulkMessageSender(whatsapp)
+
+    async with asyncio.timeout(2):
+        result = await sender.send_bulk_messages("Hi {name}", contacts(20), concurrency=5)
+
+    assert whatsapp.max_in_flight == 5
+    assert (result["successful"], result["failed"]) == (19, 1)
+    assert whatsapp.bodies["919876543207"] == "Hi C7"
+    assert await database.messages.count_documents({"status": "sent"}) == 19
+    assert await database.messages.count_documents({"status": "failed"}) == 1
+
+
+@pytest.mark.asyncio
+async def test_streamed_contacts_stop_when_cancelled(database):
+    whatsapp = SlowWhatsApp()
+    sender = BulkMessageSender(whatsapp)
+    cancel = asyncio.Event()
+
+    async def stream():
+        for contact in contacts(50):
+            if contact["seq"] == 10:
+                cancel.set()
+            yield contact
+
+    async with asyncio.timeout(2):
+        result = await sender.send_bulk_messages("Hi", stream(), concurrency=4, total=50,
+                                                 cancel_event=cancel)
+
+    sent = result["successful"] + result["failed"]
+    assert sent < 20
+    assert await database.messages.count_documents({}) == sent
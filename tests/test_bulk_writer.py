@@ -0,0 +1,97 @@
+from datetime import datetime
+import pytest
+from pymongo.errors import AutoReconnect
+from app.services.bulk_writer import BulkResultWriter
+from app.utils.contact_search import search_keys
+
+
+class FlakyMessages:
+    """messages collection whose next `failures` insert_many calls fail"""
+
+    def __init__(self, collection, failures: int):
+        self.collection = collection
+        self.failures = failures
+
+    async def insert_many(self, documents, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("connection reset")
+        return await self.collection.insert_many(documents, ordered=ordered)
+
+
+class FlakyDatabase:
+    def __init__(self, database, failures: int):
+        self.messages = FlakyMessages(database.messages, failures)
+        self.conversations = database.conversations
+
+
+def result(seq):
+    return {
+        "user_id": f"9198765432{seq:02d}", "direction": "outbound", "message_type": "text",
+        "body": "hi", "timestamp": datetime(2025, 1, 1), "status": "sent", "campaign_seq": seq
+    }
+
+
+@pytest.mark.asyncio
+async def test_results_are_reported_only_once_stored(database):
+    reported = []
+
+    async def on_flush(batch):
+        reported.extend(message["campaign_seq"] for message in batch)
+
+    writer = BulkResultWriter(FlakyDatabase(database, failures=1), batch_size=100, on_flush=on_flush)
+    for seq in range(3):
+        await writer.add(result(seq))
+
+    await writer.flush()
+    assert reported == []
+    assert await database.messages.count_documents({}) == 0
+
+    await writer.add(result(3))
+    await writer.flush()
+    assert sorted(reported) == [0, 1, 2, 3]
+    assert await database.messages.count_documents({}) == 4
+    conversation = await database.conversations.find_one({"user_id": "919876543200"})
+    assert conversation["total_messages"] == 1
+
+
+@pytest.mark.asyncio
+async def test_results_failing_twice_are_never_reported(database):
+    reported = []
+
+    async def on_flush(batch):
+        reported.extend(message["campaign_seq"] for message in batch)
+
+    writer = BulkResultWriter(FlakyDatabase(database, failures=2), batch_size=100, on_flush=on_flush)
+    await writer.add(result(0))
+    await writer.flush()
+    await writer.add(result(1))
+    await writer.flush()
+
+    # seq 0 was dropped, seq 1 waits for its retry
+    assert reported == []
+    await writer.flush()
+    assert reported == [1]
+    assert await database.messages.count_documents({}) == 1
+
+
+@pytest.mark.asyncio
+async def test_name_fills_unnamed_conversation_but_never_overwrites(database):
+    await database.conversations.insert_many([
+        {"user_id": "919876543200", "total_messages": 1, "search_keys": ["919876543200"]},
+        {"user_id": "919876543201", "total_messages": 1, "user_name": "Agent Set"}
+    ])
+    writer = BulkResultWriter(database, batch_size=100)
+    for seq in range(3):
+        await writer.add({**result(seq), "user_name": f"Contact {seq}"})
+
+    await writer.flush()
+
+    unnamed, named, created = [
+        await database.conversations.find_one({"user_id": f"9198765432{seq:02d}"}) for seq in range(3)
+    ]
+    assert unnamed["user_name"] == "Contact 0"
+    assert unnamed["search_keys"] == search_keys("919876543200", "Contact 0")
+    assert named["user_name"] == "Agent Set"
+    assert created["user_name"] == "Contact 2"
+    assert created["total_messages"] == 1
@@ -0,0 +1,60 @@
+from datetime import datetime
+import httpx
+import pytest
+from bson import ObjectId
+from app.services.campaigns import campaign_service
+
+
+@pytest.fixture
+def client(database, monkeypatch):
+    from app.main import app
+
+    # Campaigns are stored but never actually sent in these tests
+    monkeypatch.setattr(campaign_service, "start_campaign", lambda campaign_id, campaign=None: None)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_send_returns_campaign_to_track(client, database):
+    async with client:
+        response = await client.post("/api/bulk/send", json={
+            "message_template": "Hello {name}",
+            "contacts": [{"phone": "919876543210", "name": "Rahul"}, {"phone": "919123456789", "name": "Priya"}]
+        })
+        assert response.status_code == 202
+        created = response.json()
+        assert (created["status"], created["total"], created["invalid"]) == ("queued", 2, 0)
+
+        campaign_id = created["campaign_id"]
+        # Results reported by the background job
+        await database.campaigns.update_one({"_id": ObjectId(campaign_id)}, {"$set": {
+            "status": "running", "processed": 1, "successful": 1, "failed": 0
+        }})
+        await database.messages.insert_one({
+            "user_id": "919876543210", "campaign_id": campaign_id, "direction": "outbound",
+            "status": "sent", "message_id": "wamid.1", "body": "Hello Rahul", "timestamp": datetime(2025, 1, 1)
+        })
+
+        progress = (await client.get(f"/api/bulk/campaigns/{campaign_id}")).json()
+        results = (await client.get(f"/api/bulk/campaigns/{campaign_id}/results")).json()
+        listed = (await client.get("/api/bulk/campaigns")).json()
+
+    assert (progress["status"], progress["processed"], progress["success_rate"]) == ("running", 1, 50.0)
+    assert [result["user_id"] for result in results["results"]] == ["919876543210"]
+    assert [campaign["campaign_id"] for campaign in listed["campaigns"]] == [campaign_id]
+
+
+@pytest.mark.asyncio
+async def test_cancel_and_unknown_campaigns(client, database):
+    async with client:
+        created = (await client.post("/api/bulk/send", json={
+            "message_template": "Hi", "contacts": [{"phone": "919876543210", "name": "Rahul"}]
+        })).json()
+
+        cancelled = await client.post(f"/api/bulk/campaigns/{created['campaign_id']}/cancel")
+        missing = await client.get(f"/api/bulk/campaigns/{ObjectId()}")
+        malformed = await client.get("/api/bulk/campaigns/not-an-id")
+
+    assert cancelled.json()["status"] == "cancelling"
+    assert missing.status_code == 404
+    assert malformed.status_code == 404
@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+import pytest
+from app.services.campaigns import campaign_service
+from app.services.suppression import SuppressionReason, suppression_list
+
+
+async def make_campaign(database, phones, status="running"):
+    campaign_id = ObjectId()
+    await database.campaigns.insert_one({
+        "_id": campaign_id, "status": status, "total": len(phones), "message_template": "Hi",
+        "delay": 0, "processed": 0, "skipped_suppressed": 0
+    })
+    await database.campaign_contacts.insert_many([
+        {"campaign_id": str(campaign_id), "seq": seq, "phone": phone, "name": "", "fields": {}}
+        for seq, phone in enumerate(phones)
+    ])
+    return str(campaign_id)
+
+
+async def drain(campaign_id, from_seq=0, skip_sent=False):
+    skipped = []
+    contacts = [
+        contact async for contact in campaign_service._iter_campaign_contacts(
+            campaign_id, from_seq, skip_sent=skip_sent, on_skip=skipped.extend
+        )
+    ]
+    return [contact["seq"] for contact in contacts], sorted(skipped)
+
+
+@pytest.mark.asyncio
+async def test_suppressed_contacts_are_counted_once_across_resumes(database):
+    await suppression_list.load()
+    phones = [f"9198765432{i:02d}" for i in range(5)]
+    campaign_id = await make_campaign(database, phones)
+    await suppression_list.add(phones[3], SuppressionReason.OPT_OUT)
+
+    assert await drain(campaign_id) == ([0, 1, 2, 4], [3])
+    # Restart before the checkpoint passed seq 3
+    assert await drain(campaign_id, from_seq=1) == ([1, 2, 4], [3])
+
+    campaign = await database.campaigns.find_one({"_id": ObjectId(campaign_id)})
+    assert campaign["skipped_suppressed"] == 1
+    assert campaign["processed"] == 1
+    await suppression_list.remove(phones[3])
+
+
+class OutOfOrderSender:
+    """Stores results in the given seq order, then stops as if the worker died"""
+
+    def __init__(self, database, campaign_id, flush_order):
+        self.database = database
+        self.campaign_id = campaign_id
+        self.flush_order = flush_order
+        self.sent = []
+        self.checkpoints = []
+
+    async def send_bulk_messages(self, contacts, on_flush, **kwargs):
+        by_seq = {contact["seq"]: contact async for contact in contacts}
+        self.sent = sorted(by_seq)
+        for seq in self.flush_order:
+            await on_flush([{"campaign_seq": seq, "status": "sent", "user_id": by_seq[seq]["phone"]}])
+            campaign = await self.database.campaigns.find_one({"_id": ObjectId(self.campaign_id)})
+            self.checkpoints.append(campaign["checkpoint_seq"])
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_advances_only_over_contiguous_stored_results(database, monkeypatch):
+    phones = [f"9198765432{i:02d}" for i in range(5)]
+    campaign_id = await make_campaign(database, phones, status="queued")
+    sender = OutOfOrderSender(database, campaign_id, flush_order=[1, 0, 3, 2])
+    monkeypatch.setattr(campaign_service, "bulk_sender", sender)
+    campaign_service._cancel_events[campaign_id] = asyncio.Event()
+
+    try:
+        await campaign_service._run_campaign(campaign_id)
+    finally:
+        campaign_service._forget(campaign_id)
+
+    assert sender.sent == [0, 1, 2, 3, 4]
+    # seq 1 waits for seq 0; seq 3 waits for seq 2; seq 4 never stored
+    assert sender.checkpoints == [0, 2, 2, 4]
+    campaign = await database.campaigns.find_one({"_id": ObjectId(campaign_id)})
+    assert campaign["processed"] == 4
+
+
+@pytest.mark.asyncio
+async def test_resume_skips_contacts_sent_past_the_checkpoint(database, monkeypatch):
+    phones = [f"9198765432{i:02d}" for i in range(5)]
+    campaign_id = await make_campaign(database, phones)
+    # Sent before the restart, but the checkpoint only reached seq 2
+    await database.messages.insert_one({
+        "user_id": phones[3], "campaign_id": campaign_id, "direction": "outbound",
+        "message_type": "text", "body": "Hi", "timestamp": datetime(2025, 1, 1), "status": "sent"
+    })
+    await database.campaigns.update_one({"_id": ObjectId(campaign_id)}, {"$set": {"checkpoint_seq": 2}})
+    campaign = await database.campaigns.find_one({"_id": ObjectId(campaign_id)})
+    campaign["worker_id"] = campaign_service.worker_id
+    sender = OutOfOrderSender(database, campaign_id, flush_order=[4, 2])
+    monkeypatch.setattr(campaign_service, "bulk_sender", sender)
+    campaign_service._cancel_events[campaign_id] = asyncio.Event()
+
+    try:
+        await campaign_service._run_campaign(campaign_id, campaign)
+    finally:
+        campaign_service._forget(campaign_id)
+
+    assert sender.sent == [2, 4]
+    # The skipped seq 3 counts as acknowledged, so the checkpoint passes it
+    assert sender.checkpoints == [2, 5]
@@ -0,0 +1,41 @@
+import pytest
+from app.utils.contact_search import is_phone_query, name_tokens, search_filter, search_keys
+
+
+def test_name_tokens_fold_case_and_accents():
+    assert name_tokens("José  María-López") == ["jose", "maria", "lopez"]
+    assert name_tokens(None) == []
+
+
+def test_search_keys_cover_phone_suffixes_and_name_words():
+    keys = search_keys("+91 98765", "Ana Ana")
+    assert keys == ["p:9198765", "p:198765", "p:98765", "p:8765", "p:765", "p:65", "p:5", "n:ana"]
+
+
+def test_phone_queries_allow_formatting_characters():
+    assert is_phone_query("+91 (987) 65-43")
+    assert not is_phone_query("()-")
+    assert not is_phone_query("saurabh 9")
+    assert search_filter("  ") is None
+    assert search_filter("!!") is None
+
+
+@pytest.mark.asyncio
+async def test_filter_matches_digit_substrings_and_name_prefixes(database):
+    await database.conversations.insert_many([
+        {"user_id": "919876543210", "search_keys": search_keys("919876543210", "Saurabh Kumar")},
+        {"user_id": "918800011122", "search_keys": search_keys("918800011122", "Kumari Devi")},
+        {"user_id": "447700900123", "search_keys": search_keys("447700900123")}
+    ])
+
+    async def matches(query):
+        found = await database.conversations.find(search_filter(query)).to_list(None)
+        return sorted(doc["user_id"] for doc in found)
+
+    assert await matches("98765") == ["919876543210"]
+    assert await matches("+44 7700") == ["447700900123"]
+    assert await matches("91") == ["918800011122", "919876543210"]
+    assert await matches("kum") == ["918800011122", "919876543210"]
+    assert await matches("saur kum") == ["919876543210"]
+    # Names match from the start of a word only
+    assert await matches("urabh") == []
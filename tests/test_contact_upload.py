@@ -0,0 +1,57 @@
+import httpx
+import pytest
+from app.services.campaigns import campaign_service
+
+
+@pytest.fixture
+def client(database, monkeypatch):
+    from app.main import app
+
+    # Campaigns are stored but never actually sent in these tests
+    monkeypatch.setattr(campaign_service, "start_campaign", lambda campaign_id, campaign=None: None)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def upload(client, content: str, filename: str = "contacts.csv"):
+    return await client.post(
+        "/api/bulk/upload",
+        files={"file": (filename, content.encode(), "text/csv")},
+        data={"message_template": "Hello {name}!"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_bad_header_leaves_no_campaign(client, database):
+    async with client:
+        response = await upload(client, "name,city\nRahul,Pune\n")
+
+    assert response.status_code == 400
+    assert "No phone column" in response.json()["detail"]
+    assert await database.campaigns.count_documents({}) == 0
+
+
+@pytest.mark.asyncio
+async def test_invalid_rows_are_numbered_by_file_line(client, database):
+    async with client:
+        response = await upload(client, "Contact,Name\n919876543210,Rahul\n123,Bad\n\"9191\n23\",Split\n")
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["total"] == 1
+    assert [(contact["row"], contact["code"]) for contact in body["invalid_contacts"]] == [
+        (3, "too_short"), (5, "too_short")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_import_error_after_creation_marks_campaign_failed(database):
+    async def batches():
+        yield [{"phone": "919876543210", "name": "Rahul"}]
+        raise ValueError("upload truncated")
+
+    with pytest.raises(ValueError):
+        await campaign_service.create_campaign_from_stream("Hello {name}!", batches())
+
+    campaign = await database.campaigns.find_one({})
+    assert campaign["status"] == "failed"
+    assert "upload truncated" in campaign["error"]
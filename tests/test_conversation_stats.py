@@ -0,0 +1,69 @@
+from datetime import datetime
+import pytest
+from app.services.conversation_stats import ConversationStatsService
+
+
+USER = "919876543210"
+
+
+def message(day, direction="inbound", message_type="text"):
+    return {
+        "message_id": f"wamid.{direction}.{day}", "user_id": USER, "direction": direction,
+        "message_type": message_type, "body": "hi", "timestamp": datetime(2025, 1, day), "status": "received"
+    }
+
+
+@pytest.mark.asyncio
+async def test_first_read_backfills_counters(database):
+    await database.messages.insert_many([message(1), message(2, "outbound"), message(3, message_type="image")])
+    stats = ConversationStatsService()
+
+    result = await stats.get(USER)
+
+    assert result["total_messages"] == 3
+    assert result["inbound_messages"] == 2
+    assert result["outbound_messages"] == 1
+    assert result["message_types"] == {"text": 2, "image": 1}
+    assert result["first_message_date"] == datetime(2025, 1, 1)
+    assert result["last_message_date"] == datetime(2025, 1, 3)
+    stored = await database.conversation_stats.find_one({"_id": USER})
+    assert "backfilling" not in stored
+
+
+@pytest.mark.asyncio
+async def test_messages_stored_during_backfill_are_counted_once(database, monkeypatch):
+    stats = ConversationStatsService()
+    await database.messages.insert_one(message(1))
+    # Stored before the backfill, but its increment only lands once the placeholder exists
+    late_increment = message(2)
+    await database.messages.insert_one(late_increment)
+    aggregate = stats._aggregate
+
+    async def racing_aggregate(user_id, before):
+        await stats.record(late_increment)
+        concurrent = message(3, "outbound")
+        await database.messages.insert_one(concurrent)
+        await stats.record(concurrent)
+        return await aggregate(user_id, before)
+
+    monkeypatch.setattr(stats, "_aggregate", racing_aggregate)
+    await stats.backfill(USER)
+    monkeypatch.undo()
+
+    result = await stats.get(USER)
+    assert result["total_messages"] == 3
+    assert result["inbound_messages"] == 2
+    assert result["outbound_messages"] == 1
+    assert result["last_message_date"] == datetime(2025, 1, 3)
+
+
+@pytest.mark.asyncio
+async def test_increments_without_counters_are_not_kept(database):
+    stats = ConversationStatsService()
+    stored = message(1)
+    await database.messages.insert_one(stored)
+
+    await stats.record(stored)
+
+    assert await database.conversation_stats.count_documents({}) == 0
+    assert (await stats.get(USER))["total_messages"] == 1
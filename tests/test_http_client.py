@@ -0,0 +1,38 @@
+import json
+import httpx
+import pytest
+from app.services import http_client
+from app.services.whatsapp import WhatsAppService
+
+
+@pytest.mark.asyncio
+async def test_client_is_shared_until_closed():
+    client = http_client.get_http_client()
+    assert http_client.get_http_client() is client
+
+    await http_client.close_http_client()
+    assert client.is_closed
+
+    reopened = http_client.get_http_client()
+    assert reopened is not client
+    await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_sends_go_through_the_shared_client(monkeypatch):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"messages": [{"id": "wamid.sent"}]})
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    result = await WhatsAppService().send_text_message("+91 98765 43210", "hi")
+
+    assert result["success"]
+    assert result["message_id"] == "wamid.sent"
+    assert result["latency"] is not None
+    assert requests[0]["to"] == "919876543210"
+    assert requests[0]["text"] == {"body": "hi"}
+    await http_client.close_http_client()
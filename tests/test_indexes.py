@@ -0,0 +1,23 @@
+import pytest
+from app.database.indexes import INDEXES, ensure_indexes, get_index_status, index_names
+
+
+@pytest.mark.asyncio
+async def test_every_registered_index_is_created(database):
+    result = await ensure_indexes(database)
+
+    expected = [f"{collection}.{name}" for collection in INDEXES for name in index_names(collection)]
+    assert result == {"ensured": expected, "failed": []}
+    assert "user_id_1_timestamp_-1__id_-1" in await database.messages.index_information()
+    assert get_index_status() == {"building": False, "ensured": len(expected), "failed": []}
+
+
+@pytest.mark.asyncio
+async def test_duplicates_fail_only_their_unique_index(database):
+    await database.conversations.insert_many([{"user_id": "919876543210"}, {"user_id": "919876543210"}])
+
+    result = await ensure_indexes(database)
+
+    assert result["failed"] == ["conversations.user_id_1"]
+    assert "conversations.search_keys_1" in result["ensured"]
+    assert get_index_status()["failed"] == ["conversations.user_id_1"]
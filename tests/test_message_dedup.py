@@ -0,0 +1,51 @@
+from datetime import datetime
+import pytest
+from app.services.inbox import InboxService
+
+
+def message(message_id, user_id="919876543210"):
+    return {
+        "message_id": message_id, "user_id": user_id, "direction": "inbound",
+        "message_type": "text", "body": "hi", "timestamp": datetime(2025, 1, 1), "status": "received"
+    }
+
+
+@pytest.mark.asyncio
+async def test_dedup_keeps_first_copy_and_fixes_totals(database):
+    first = await database.messages.insert_one(message("wamid.1"))
+    await database.messages.insert_many([message("wamid.1"), message("wamid.1"), message("wamid.2")])
+    await database.messages.insert_many([{**message(None), "message_id": None}, {**message(None), "message_id": None}])
+    await database.conversations.insert_one({"user_id": "919876543210", "total_messages": 7, "unread_count": 5})
+    await database.conversation_stats.insert_one({"_id": "919876543210", "total_messages": 6})
+
+    inbox = InboxService()
+    assert await inbox.dedup_message_ids(dry_run=True) == {
+        "duplicate_message_ids": 1, "documents": 2, "deleted": 0
+    }
+    assert await database.messages.count_documents({}) == 6
+
+    result = await inbox.dedup_message_ids()
+    assert result["deleted"] == 2
+    remaining = await database.messages.find({"message_id": "wamid.1"}).to_list(None)
+    assert [doc["_id"] for doc in remaining] == [first.inserted_id]
+    # Messages without an id are not duplicates of each other
+    assert await database.messages.count_documents({"message_id": None}) == 2
+
+    conversation = await database.conversations.find_one({"user_id": "919876543210"})
+    assert conversation["total_messages"] == 4
+    # The two deleted copies were among the five newest inbound messages
+    assert conversation["unread_count"] == 3
+    assert await database.conversation_stats.count_documents({}) == 0
+
+
+@pytest.mark.asyncio
+async def test_dedup_keeps_unread_count_of_conversation_read_since(database):
+    await database.messages.insert_many([message("wamid.1"), message("wamid.1"), message("wamid.2")])
+    # Read after the redelivered copy was stored; only wamid.2 arrived since
+    await database.conversations.insert_one({"user_id": "919876543210", "total_messages": 3, "unread_count": 1})
+
+    await InboxService().dedup_message_ids()
+
+    conversation = await database.conversations.find_one({"user_id": "919876543210"})
+    assert conversation["total_messages"] == 2
+    assert conversation["unread_count"] == 1
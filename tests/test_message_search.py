@@ -0,0 +1,63 @@
+from datetime import datetime
+import pytest
+from pymongo.errors import OperationFailure
+from app.services.inbox import InboxService
+from app.utils.pagination import decode_cursor
+
+
+def message(day, body, user_id="919876543210"):
+    return {
+        "message_id": f"wamid.{user_id}.{day}", "user_id": user_id, "direction": "inbound",
+        "message_type": "text", "body": body, "timestamp": datetime(2025, 1, day), "status": "received"
+    }
+
+
+@pytest.fixture
+def no_text_index(database, monkeypatch):
+    """Answer $text queries the way MongoDB does before the text index exists"""
+    collection_type = type(database.messages)
+    find = collection_type.find
+
+    def find_without_text_index(self, filter=None, *args, **kwargs):
+        if filter and "$text" in filter:
+            raise OperationFailure("text index required for $text query", code=27)
+        return find(self, filter, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "find", find_without_text_index)
+
+
+@pytest.mark.asyncio
+async def test_search_falls_back_to_regex_without_text_index(database, no_text_index):
+    await database.messages.insert_many([
+        message(1, "Order (#12) shipped"),
+        message(2, "order #12 delayed"),
+        message(3, "Nothing here"),
+        message(5, "Re: order #12"),
+        message(4, "Order #12 again", user_id="447700900123")
+    ])
+    inbox = InboxService()
+
+    page = await inbox.search_messages("order (#12", limit=5)
+    assert [item["body"] for item in page["items"]] == ["Order (#12) shipped"]
+
+    page = await inbox.search_messages("ORDER #12", user_id="919876543210", limit=1)
+    assert [item["body"] for item in page["items"]] == ["Re: order #12"]
+    assert page["has_more"]
+
+    page = await inbox.search_messages("ORDER #12", user_id="919876543210", limit=1,
+                                       cursor=decode_cursor(page["next_cursor"]))
+    assert [item["body"] for item in page["items"]] == ["order #12 delayed"]
+    assert not page["has_more"]
+
+
+@pytest.mark.asyncio
+async def test_other_search_errors_return_no_results(database, monkeypatch):
+    collection_type = type(database.messages)
+
+    def failing_find(self, *args, **kwargs):
+        raise OperationFailure("bad query", code=2)
+
+    monkeypatch.setattr(collection_type, "find", failing_find)
+
+    page = await InboxService().search_messages("order")
+    assert page == {"items": [], "has_more": False, "next_cursor": None, "prev_cursor": None}
@@ -0,0 +1,52 @@
+from datetime import datetime
+import pytest
+from app.models.message import is_status_advance, previous_statuses
+from app.services.inbox import InboxService
+
+
+def outbound(message_id, status="sent"):
+    return {
+        "message_id": message_id, "user_id": "919876543210", "direction": "outbound",
+        "message_type": "text", "body": "hi", "timestamp": datetime(2025, 1, 1), "status": status
+    }
+
+
+def test_statuses_only_move_forward():
+    assert is_status_advance("sent", "delivered")
+    assert is_status_advance("sent", "read")
+    assert is_status_advance(None, "sent")
+    assert not is_status_advance("read", "delivered")
+    assert not is_status_advance("delivered", "delivered")
+    assert is_status_advance("sent", "failed")
+    assert not is_status_advance("delivered", "failed")
+    assert previous_statuses("unknown") == []
+
+
+@pytest.mark.asyncio
+async def test_late_delivered_does_not_undo_read(database):
+    await database.messages.insert_one(outbound("wamid.1"))
+    inbox = InboxService()
+
+    assert await inbox.update_message_status("wamid.1", "read", timestamp=1735689700)
+    assert not await inbox.update_message_status("wamid.1", "delivered", timestamp=1735689600)
+
+    stored = await database.messages.find_one({"message_id": "wamid.1"})
+    assert stored["status"] == "read"
+    assert stored["read_at"] == datetime.utcfromtimestamp(1735689700)
+    # Skipping delivered still records when it must have happened at the latest
+    assert stored["delivered_at"] == datetime.utcfromtimestamp(1735689700)
+
+
+@pytest.mark.asyncio
+async def test_batch_applies_forward_updates_and_reports_unknown_ids(database):
+    await database.messages.insert_many([outbound("wamid.1"), outbound("wamid.2", status="read")])
+
+    result = await InboxService().update_message_statuses([
+        {"message_id": "wamid.1", "status": "delivered"},
+        {"message_id": "wamid.2", "status": "delivered"},
+        {"message_id": "wamid.3", "status": "delivered"}
+    ])
+
+    assert [update["message_id"] for update in result["applied"]] == ["wamid.1"]
+    assert [update["message_id"] for update in result["unmatched"]] == ["wamid.3"]
+    assert (await database.messages.find_one({"message_id": "wamid.2"}))["status"] == "read"
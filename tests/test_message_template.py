@@ -0,0 +1,62 @@
+import httpx
+import pytest
+from app.services.bulk_sender import BulkMessageSender
+from app.utils.message_template import compile_template
+
+
+def test_required_fields_are_placeholders_without_default():
+    template = compile_template("Hi {name}, your {plan|basic} plan renews on {Renewal Date} in {city|}")
+
+    assert template.fields == ["city", "name", "plan", "renewal_date"]
+    assert template.required_fields == ["renewal_date"]
+    assert template.missing_fields({"renewal_date": ""}) == ["renewal_date"]
+    assert template.missing_fields({"renewal_date": "1 May"}) == []
+    # Not a field of this contact: nothing to fill, so nothing is missing
+    assert template.missing_fields({}) == []
+
+
+def test_literal_braces_and_unknown_placeholders_render_as_written():
+    values = {"name": "Rahul", "phone": "919876543210"}
+
+    assert compile_template("Use code {SAVE10} today, {name}").render(values) == "Use code {SAVE10} today, Rahul"
+    assert compile_template('Reply {"ok": true} or { }').render(values) == 'Reply {"ok": true} or { }'
+    assert compile_template("Smile :} {  } { and {{name}}").render(values) == "Smile :} {  } { and {name}"
+    assert compile_template("{").render(values) == "{"
+    assert compile_template("Hi {name}").render({"name": "", "phone": ""}) == "Hi Customer"
+
+
+def test_contacts_missing_required_fields_are_invalid():
+    sender = BulkMessageSender(whatsapp_service=None)
+    template = compile_template("Hi {name}, visit our {city} branch ({plan|basic} plan)")
+
+    validation = sender.validate_contacts([
+        {"phone": "919876543210", "name": "Rahul", "fields": {"city": "Pune"}},
+        {"phone": "919123456789", "name": "Priya", "fields": {"city": ""}},
+        {"phone": "919000000001", "name": "", "fields": {}},
+    ], template=template)
+
+    assert [contact["phone"] for contact in validation["valid"]] == ["919876543210", "919000000001"]
+    assert [(c["row"], c["code"]) for c in validation["invalid"]] == [(2, "missing_field")]
+    assert "city" in validation["invalid"][0]["error"]
+
+
+@pytest.mark.asyncio
+async def test_preview_reports_unresolved_fields():
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/api/bulk/preview", json={
+            "message_template": "Hi {name}, visit our {city} branch, code {SAVE10}",
+            "contacts": [
+                {"phone": "919876543210", "name": "Rahul", "fields": {"city": "Pune"}},
+                {"phone": "919123456789", "name": "Priya", "fields": {"city": ""}},
+            ]
+        })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["required_fields"] == ["city", "save10"]
+    assert body["unresolved"] == 1
+    assert body["previews"][0]["message"] == "Hi Rahul, visit our Pune branch, code {SAVE10}"
+    assert "missing_fields" not in body["previews"][0]
+    assert body["previews"][1]["missing_fields"] == ["city"]
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from app.services.outbound_scheduler import OutboundScheduler, Priority
+
+
+class InstantBucket:
+    """A token for every grant, handed out one event loop turn apart"""
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        await asyncio.sleep(0)
+        return 0.0
+
+    def release(self, tokens: float = 1.0):
+        pass
+
+
+async def grant_order(scheduler, interactive: int, bulk: int):
+    order = []
+
+    async def waiter(lane):
+        await scheduler.acquire(lane)
+        order.append(lane)
+
+    tasks = [asyncio.create_task(waiter(Priority.INTERACTIVE)) for _ in range(interactive)]
+    tasks += [asyncio.create_task(waiter(Priority.BULK)) for _ in range(bulk)]
+    async with asyncio.timeout(2):
+        await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_bulk_gets_its_minimum_share_while_both_lanes_wait():
+    scheduler = OutboundScheduler(InstantBucket(), bulk_min_share=0.2)
+
+    order = await grant_order(scheduler, interactive=100, bulk=100)
+
+    # While interactive work is queued, bulk gets every fifth grant
+    contended = order[:100]
+    assert contended.count(Priority.BULK) == 20
+    assert Priority.BULK in order[:5]
+    assert order[-1] == Priority.BULK
+    stats = scheduler.get_stats()
+    assert stats[Priority.INTERACTIVE]["granted"] == 100
+    assert stats[Priority.BULK]["granted"] == 100
+
+
+@pytest.mark.asyncio
+async def test_zero_share_lets_interactive_go_first():
+    scheduler = OutboundScheduler(InstantBucket(), bulk_min_share=0)
+
+    order = await grant_order(scheduler, interactive=10, bulk=10)
+
+    assert order == [Priority.INTERACTIVE] * 10 + [Priority.BULK] * 10
+
+
+@pytest.mark.asyncio
+async def test_unknown_priority_is_rejected():
+    scheduler = OutboundScheduler(InstantBucket())
+
+    with pytest.raises(ValueError):
+        await scheduler.acquire("urgent")
@@ -0,0 +1,63 @@
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from app.utils.pagination import NEXT, PREV, decode_cursor, encode_cursor, fetch_page
+
+
+async def seed(database):
+    # Ties on timestamp are ordered by _id
+    days = [5, 4, 4, 4, 3, 2, 2]
+    await database.messages.insert_many([
+        {"user_id": "919876543210", "timestamp": datetime(2025, 1, day), "body": str(index)}
+        for index, day in enumerate(days)
+    ])
+    documents = await database.messages.find({}).to_list(None)
+    return [doc["_id"] for doc in sorted(documents, key=lambda doc: (doc["timestamp"], doc["_id"]), reverse=True)]
+
+
+def test_cursor_round_trip():
+    doc_id = ObjectId()
+    cursor = decode_cursor(encode_cursor(datetime(2025, 1, 2, 3, 4, 5), doc_id, PREV))
+    assert cursor == (datetime(2025, 1, 2, 3, 4, 5), doc_id, PREV)
+    assert decode_cursor(encode_cursor(7, doc_id)).direction == NEXT
+
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_pages_forward_then_back_return_every_row_once(database):
+    expected = await seed(database)
+    query = {"user_id": "919876543210"}
+
+    pages, cursor = [], None
+    while True:
+        page = await fetch_page(database.messages, query, "timestamp", 3, cursor=cursor)
+        pages.append([doc["_id"] for doc in page["items"]])
+        assert (page["prev_cursor"] is None) == (cursor is None)
+        if page["next_cursor"] is None:
+            break
+        cursor = decode_cursor(page["next_cursor"])
+
+    assert [len(ids) for ids in pages] == [3, 3, 1]
+    assert [doc_id for ids in pages for doc_id in ids] == expected
+
+    # Walk back from the last page to the first
+    back = [pages[-1]]
+    while page["prev_cursor"] is not None:
+        page = await fetch_page(database.messages, query, "timestamp", 3,
+                                cursor=decode_cursor(page["prev_cursor"]))
+        back.append([doc["_id"] for doc in page["items"]])
+    assert back[::-1] == pages
+    assert page["next_cursor"] is not None
+
+
+@pytest.mark.asyncio
+async def test_skip_without_cursor_still_pages(database):
+    expected = await seed(database)
+
+    page = await fetch_page(database.messages, {}, "timestamp", 3, skip=3)
+
+    assert [doc["_id"] for doc in page["items"]] == expected[3:6]
+    assert page["prev_cursor"] is not None
+    assert page["next_cursor"] is not None
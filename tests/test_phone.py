@@ -0,0 +1,22 @@
+from app.utils.phone import PhoneError, normalize_phone, normalize_phones
+
+
+def test_normalize_phones_keeps_per_row_error_codes():
+    numbers, errors = normalize_phones([
+        "+91 98765 43210", "09876543210", "0044 20 7946 0958", "123", "", None,
+        "1234567890123456", "91987654321", "९८७६५४३२१०", "98765\n43210"
+    ])
+
+    assert numbers == [
+        "919876543210", "919876543210", "442079460958", None, None, None,
+        None, None, "919876543210", "919876543210"
+    ]
+    assert errors == [
+        None, None, None, PhoneError.TOO_SHORT, PhoneError.MISSING, PhoneError.MISSING,
+        PhoneError.TOO_LONG, PhoneError.INVALID_LENGTH, None, None
+    ]
+
+
+def test_normalize_phone_matches_list_form():
+    assert normalize_phone("91-98765-43210") == ("919876543210", None)
+    assert normalize_phone("12") == (None, PhoneError.TOO_SHORT)
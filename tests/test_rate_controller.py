@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+import pytest
+from app.services import rate_controller as module
+from app.services.rate_controller import AimdRateController
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(module, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def controller(**kwargs) -> AimdRateController:
+    options = dict(start_rate=10, min_rate=1, max_rate=40, increase=2, decrease_factor=0.5,
+                   window=1.0, latency_spike_factor=3.0, max_error_rate=0.1)
+    options.update(kwargs)
+    return AimdRateController(**options)
+
+
+def run_window(clock, aimd, sends, **result):
+    """Record `sends` results spread over one window"""
+    for _ in range(sends):
+        clock.now += 1.0 / sends
+        aimd.record({"throttled": False, "server_error": False, "latency": 0.1, **result})
+
+
+def test_busy_healthy_window_increases_additively(clock):
+    aimd = controller()
+
+    run_window(clock, aimd, 10)
+    run_window(clock, aimd, 12)
+
+    assert aimd.current_rate == 14
+    assert aimd.increases == 2
+
+
+def test_idle_window_does_not_increase(clock):
+    aimd = controller()
+
+    run_window(clock, aimd, 2)
+
+    assert aimd.current_rate == 10
+    assert aimd.increases == 0
+
+
+def test_throttle_cuts_once_per_window(clock):
+    aimd = controller()
+
+    aimd.record({"throttled": True})
+    aimd.record({"throttled": True})
+    assert aimd.current_rate == 5
+    assert aimd.decreases == 1
+
+    clock.now += 1.0
+    aimd.record({"throttled": True})
+    assert aimd.current_rate == 2.5
+
+
+def test_server_errors_above_threshold_cut_the_rate(clock):
+    aimd = controller()
+
+    run_window(clock, aimd, 10, server_error=True)
+
+    assert aimd.current_rate == 5
+
+
+def test_latency_spike_over_baseline_cuts_the_rate(clock):
+    aimd = controller()
+    run_window(clock, aimd, 10)
+    assert aimd.baseline_latency == pytest.approx(0.1)
+
+    run_window(clock, aimd, 12, latency=0.5)
+
+    assert aimd.current_rate == 6
+    assert aimd.decreases == 1
+
+
+def test_rate_stays_within_bounds(clock):
+    aimd = controller(start_rate=100)
+    assert aimd.current_rate == 40
+
+    for _ in range(10):
+        clock.now += 1.0
+        aimd.record({"throttled": True})
+    assert aimd.current_rate == 1
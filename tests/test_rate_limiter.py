@@ -0,0 +1,61 @@
+import asyncio
+import time
+import pytest
+from app.services.rate_limiter import TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_burst_is_immediate_then_paced():
+    bucket = TokenBucket(rate=100, capacity=5)
+
+    started = time.monotonic()
+    waits = [await bucket.acquire() for _ in range(10)]
+    elapsed = time.monotonic() - started
+
+    assert max(waits[:5]) < 0.01
+    # Five more tokens at 100/s take about 50ms
+    assert 0.04 <= elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_waiting_does_not_block_the_event_loop():
+    bucket = TokenBucket(rate=20, capacity=1)
+    await bucket.acquire()
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    await bucket.acquire()
+    task.cancel()
+
+    assert ticks >= 3
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_arrival_order():
+    bucket = TokenBucket(rate=200, capacity=1)
+    await bucket.acquire()
+    order = []
+
+    async def waiter(index):
+        await bucket.acquire()
+        order.append(index)
+
+    await asyncio.gather(*(waiter(index) for index in range(5)))
+
+    assert order == [0, 1, 2, 3, 4]
+
+
+def test_release_and_set_rate_respect_capacity():
+    bucket = TokenBucket(rate=10, capacity=4)
+    bucket.release(10)
+    assert bucket.available() == pytest.approx(4, abs=0.01)
+
+    bucket.set_rate(1, capacity=2)
+    assert bucket.rate == 1
+    assert bucket.available() <= 2
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from app.services.backoff import BackoffController
+from app.services.read_receipts import ReadReceiptDispatcher
+
+
+class FakeWhatsApp:
+    def __init__(self):
+        self.backoff = BackoffController(failure_threshold=5, cooldown=30)
+        self.read = []
+
+    async def mark_message_as_read(self, message_id):
+        self.read.append(message_id)
+        return True
+
+
+@pytest.mark.asyncio
+async def test_receipts_coalesce_to_newest_message_per_conversation():
+    dispatcher = ReadReceiptDispatcher(concurrency=2)
+    dispatcher.whatsapp_service = FakeWhatsApp()
+
+    for message_id in ("wamid.a1", "wamid.a2", "wamid.a3"):
+        dispatcher.enqueue("111", message_id)
+    dispatcher.enqueue("222", "wamid.b1")
+
+    await dispatcher.start()
+    async with asyncio.timeout(2):
+        await dispatcher._queue.join()
+    await dispatcher.stop()
+
+    assert sorted(dispatcher.whatsapp_service.read) == ["wamid.a3", "wamid.b1"]
+    stats = dispatcher.get_stats()
+    assert (stats["sent"], stats["coalesced"], stats["pending"]) == (2, 2, 0)
+
+
+@pytest.mark.asyncio
+async def test_receipts_are_held_while_sends_are_paused(monkeypatch):
+    monkeypatch.setattr(ReadReceiptDispatcher, "PAUSE_POLL_INTERVAL", 0.01)
+    dispatcher = ReadReceiptDispatcher(concurrency=1)
+    dispatcher.whatsapp_service = FakeWhatsApp()
+    dispatcher.whatsapp_service.backoff.throttle(0.1)
+
+    dispatcher.enqueue("111", "wamid.a1")
+    await dispatcher.start()
+    await asyncio.sleep(0.03)
+    assert dispatcher.whatsapp_service.read == []
+
+    async with asyncio.timeout(2):
+        await dispatcher._queue.join()
+    await dispatcher.stop()
+    assert dispatcher.whatsapp_service.read == ["wamid.a1"]
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime
+import pytest
+from app.services.status_batcher import StatusUpdateBatcher
+
+
+def outbound(message_id):
+    return {
+        "message_id": message_id, "user_id": "919876543210", "direction": "outbound",
+        "message_type": "text", "body": "hi", "timestamp": datetime(2025, 1, 1), "status": "sent"
+    }
+
+
+@pytest.mark.asyncio
+async def test_status_before_message_is_applied_once_message_is_stored(database):
+    batcher = StatusUpdateBatcher(batch_size=100, flush_interval=0.05, retry_window=5)
+
+    await batcher.add("wamid.1", "delivered", recipient="919876543210", timestamp=1735689600)
+    await batcher.flush()
+    assert batcher.get_stats()["unmatched"] == 1
+
+    # The send result lands after its first status webhook
+    await database.messages.insert_one(outbound("wamid.1"))
+
+    async with asyncio.timeout(2):
+        while batcher.get_stats()["unmatched"]:
+            await asyncio.sleep(0.01)
+
+    stored = await database.messages.find_one({"message_id": "wamid.1"})
+    assert stored["status"] == "delivered"
+    stats = batcher.get_stats()
+    assert stats["written"] == 1
+    assert stats["discarded"] == 0
+    await batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_newer_status_supersedes_held_one(database):
+    batcher = StatusUpdateBatcher(batch_size=100, flush_interval=60, retry_window=5)
+
+    await batcher.add("wamid.1", "delivered")
+    await batcher.flush()
+    await batcher.add("wamid.1", "read")
+    await database.messages.insert_one(outbound("wamid.1"))
+    await batcher.flush()
+
+    stored = await database.messages.find_one({"message_id": "wamid.1"})
+    assert stored["status"] == "read"
+    assert stored["delivered_at"] is not None
+    await batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_status_for_message_never_stored_is_discarded(database):
+    batcher = StatusUpdateBatcher(batch_size=100, flush_interval=60, retry_window=0)
+
+    await batcher.add("wamid.missing", "delivered")
+    await batcher.flush()
+
+    stats = batcher.get_stats()
+    assert stats["unmatched"] == 0
+    assert stats["discarded"] == 1
+    await batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_update_that_loses_race_is_not_broadcast_or_counted(database, monkeypatch):
+    from app.services import status_batcher as module
+
+    batcher = StatusUpdateBatcher(batch_size=100, flush_interval=60, retry_window=5)
+    await database.messages.insert_many([outbound("wamid.1"), outbound("wamid.2")])
+    collection_type = type(database.messages)
+    bulk_write = collection_type.bulk_write
+
+    async def racing_bulk_write(self, operations, **kwargs):
+        # Another worker marks wamid.2 read between the pre-read and our write
+        await database.messages.update_one({"message_id": "wamid.2"}, {"$set": {"status": "read"}})
+        return await bulk_write(self, operations, **kwargs)
+
+    monkeypatch.setattr(collection_type, "bulk_write", racing_bulk_write)
+    broadcasts = []
+
+    async def broadcast(message):
+        broadcasts.append(message["data"]["message_id"])
+
+    monkeypatch.setattr(module.manager, "active_connections", [object()])
+    monkeypatch.setattr(module.manager, "broadcast", broadcast)
+
+    await batcher.add("wamid.1", "delivered")
+    await batcher.add("wamid.2", "delivered")
+    await batcher.flush()
+
+    stats = batcher.get_stats()
+    assert stats["written"] == 1
+    assert stats["stale"] == 1
+    assert broadcasts == ["wamid.1"]
+    assert (await database.messages.find_one({"message_id": "wamid.2"}))["status"] == "read"
+    await batcher.stop()
@@ -0,0 +1,53 @@
+import pytest
+from app.services.suppression import SuppressionList, SuppressionReason
+
+
+@pytest.mark.asyncio
+async def test_start_does_not_lift_manual_block(database):
+    suppressions = SuppressionList()
+    await suppressions.load()
+
+    assert await suppressions.add("+91 98765 43210", SuppressionReason.MANUAL, source="api")
+    assert await suppressions.add("919876543210", SuppressionReason.OPT_OUT, source="inbound")
+
+    stored = await database.suppressions.find_one({"phone": "919876543210"})
+    assert sorted(stored["reasons"]) == [SuppressionReason.MANUAL, SuppressionReason.OPT_OUT]
+
+    # START only lifts the opt-out
+    assert not await suppressions.remove("919876543210", reason=SuppressionReason.OPT_OUT)
+    assert suppressions.is_suppressed("919876543210")
+    stored = await database.suppressions.find_one({"phone": "919876543210"})
+    assert stored["reasons"] == [SuppressionReason.MANUAL]
+
+    # A second START has nothing left to lift
+    assert not await suppressions.remove("919876543210", reason=SuppressionReason.OPT_OUT)
+    assert suppressions.is_suppressed("919876543210")
+
+    # Reloading from the database keeps the block
+    await suppressions.load()
+    assert suppressions.is_suppressed("919876543210")
+
+
+@pytest.mark.asyncio
+async def test_start_lifts_opt_out_only_entry(database):
+    suppressions = SuppressionList()
+    await suppressions.load()
+
+    await suppressions.add("919876543210", SuppressionReason.OPT_OUT)
+    assert await suppressions.remove("919876543210", reason=SuppressionReason.OPT_OUT)
+    assert not suppressions.is_suppressed("919876543210")
+    assert await database.suppressions.count_documents({}) == 0
+
+
+@pytest.mark.asyncio
+async def test_legacy_single_reason_entries_are_migrated(database):
+    await database.suppressions.insert_one({"phone": "919876543210", "reason": SuppressionReason.HARD_FAILURE})
+
+    suppressions = SuppressionList()
+    await suppressions.load()
+    assert suppressions.is_suppressed("919876543210")
+
+    stored = await database.suppressions.find_one({"phone": "919876543210"})
+    assert stored["reasons"] == [SuppressionReason.HARD_FAILURE]
+    assert "reason" not in stored
+    assert (await suppressions.list_suppressions(SuppressionReason.HARD_FAILURE))["total"] == 1
@@ -0,0 +1,123 @@
+import asyncio
+import json
+from datetime import datetime
+import pytest
+from app.services.webhook_ingest import WebhookIngestService
+
+
+class FakeQueue:
+    """In-memory stand-in for MongoDBQueue: pops whatever was pushed, records outcomes"""
+
+    def __init__(self):
+        self.pending = []
+        self.outcomes = []
+
+    def push(self, item_id, events):
+        now = datetime.utcnow()
+        self.pending.append({"_id": item_id, "data": json.dumps(events), "created_at": now, "locked_at": now})
+
+    async def pop(self):
+        return self.pending.pop(0) if self.pending else None
+
+    async def complete(self, item_id, success=True):
+        self.outcomes.append((item_id, success))
+
+    async def release(self, item_ids):
+        pass
+
+    async def touch(self, item_ids):
+        pass
+
+    async def requeue_stale(self, timeout_seconds):
+        return 0
+
+    async def retry_failed(self, max_attempts=3):
+        return 0
+
+    async def cleanup_old_items(self, hours_old=24):
+        pass
+
+
+def split(events):
+    return [(event["kind"], event["user"], event) for event in events]
+
+
+async def started_service(handler) -> WebhookIngestService:
+    service = WebhookIngestService(concurrency=2)
+    service.queue = FakeQueue()
+    await service.start(handler, split)
+    return service
+
+
+async def wait_for(condition, timeout=2.0):
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_failed_event_marks_payload_failed_and_consumer_survives():
+    handled = []
+
+    async def handler(kind, event):
+        if event.get("boom"):
+            raise RuntimeError("database unavailable")
+        handled.append(event["n"])
+
+    service = await started_service(handler)
+    try:
+        service.queue.push("a", [{"kind": "message", "user": "u1", "n": 1},
+                                 {"kind": "message", "user": "u1", "n": 2, "boom": True}])
+        service.queue.push("b", [{"kind": "message", "user": "u1", "n": 3}])
+        service._wakeup.set()
+
+        await wait_for(lambda: len(service.queue.outcomes) == 2)
+        assert service.queue.outcomes == [("a", False), ("b", True)]
+        # Same shard kept consuming after the failure
+        assert handled == [1, 3]
+
+        stats = service.get_stats()
+        assert stats["payloads_failed"] == 1
+        assert stats["payloads_completed"] == 1
+        assert stats["events_failed"] == 1
+        assert stats["payloads_in_flight"] == 0
+    finally:
+        await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_requeued_payload_in_flight_is_not_dispatched_twice():
+    release = asyncio.Event()
+    handled = []
+
+    async def handler(kind, event):
+        if event["n"] == 1:
+            await release.wait()
+        handled.append(event["n"])
+
+    service = await started_service(handler)
+    try:
+        # u1 and u4 land on different shards, so n=2 finishes while n=1 waits
+        service.queue.push("a", [{"kind": "message", "user": "u1", "n": 1},
+                                 {"kind": "message", "user": "u4", "n": 2}])
+        service._wakeup.set()
+        await wait_for(lambda: handled == [2])
+
+        # The sweep of another worker put "a" back to pending while we hold it
+        service.queue.push("a", [{"kind": "message", "user": "u1", "n": 1},
+                                 {"kind": "message", "user": "u4", "n": 2}])
+        service._wakeup.set()
+        await wait_for(lambda: not service.queue.pending)
+
+        release.set()
+        await wait_for(lambda: service.queue.outcomes == [("a", True)])
+
+        # Consumers are still alive and the bookkeeping is clean
+        service.queue.push("b", [{"kind": "message", "user": "u1", "n": 3}])
+        service._wakeup.set()
+        await wait_for(lambda: len(service.queue.outcomes) == 2)
+        assert service.queue.outcomes == [("a", True), ("b", True)]
+        assert handled == [2, 1, 3]
+        assert service.get_stats()["payloads_in_flight"] == 0
+    finally:
+        await service.stop()
@@ -0,0 +1,51 @@
+from datetime import datetime
+from app.models.message import Message
+from app.utils.webhook_parser import extract_events, inbound_message_document, loads
+
+
+def inbound(message_type, **content):
+    return {"from": "919876543210", "id": "wamid.1", "timestamp": "1735689600",
+            "type": message_type, **content}
+
+
+def test_events_come_out_in_delivery_order():
+    body = loads(b'''{"entry": [
+        {"changes": [{"value": {
+            "messages": [{"id": "wamid.1", "from": "111"}],
+            "statuses": [{"id": "wamid.2", "recipient_id": "222", "status": "read"}]
+        }}, {"value": null}]},
+        {"changes": [{"value": {"messages": [{"id": "wamid.3", "from": "333"}]}}]}
+    ]}''')
+
+    events = extract_events(body)
+
+    assert [(event.kind, event.user_id, event.data["id"]) for event in events] == [
+        ("message", "111", "wamid.1"), ("status", "222", "wamid.2"), ("message", "333", "wamid.3")
+    ]
+    assert extract_events({}) == []
+
+
+def test_inbound_documents_have_the_stored_message_shape():
+    document = inbound_message_document(inbound("text", text={"body": "hello"}))
+
+    assert document["body"] == "hello"
+    assert document["timestamp"] == datetime.fromtimestamp(1735689600)
+    assert document["status"] == "received"
+    stored = Message(**document).model_dump(by_alias=True, exclude_none=True)
+    assert {key: stored[key] for key in ("user_id", "body", "message_id")} == {
+        "user_id": "919876543210", "body": "hello", "message_id": "wamid.1"
+    }
+
+
+def test_media_and_other_bodies():
+    assert inbound_message_document(inbound("image", image={"id": "m1", "caption": "look"}))["body"] == "look"
+    image = inbound_message_document(inbound("image", image={"id": "m1"}))
+    assert (image["body"], image["media_type"], image["media_id"]) == ("[Image]", "image", "m1")
+    assert inbound_message_document(
+        inbound("document", document={"filename": "invoice.pdf"})
+    )["body"] == "[Document: invoice.pdf]"
+    assert inbound_message_document(
+        inbound("location", location={"latitude": 1.5, "longitude": 2})
+    )["body"] == "[Location: 1.5, 2]"
+    assert inbound_message_document(inbound("contacts"))["body"] == "[Contact Card]"
+    assert inbound_message_document(inbound("reaction"))["body"] == "[Reaction]"
@@ -0,0 +1,47 @@
+import json
+import pytest
+from app.utils.webhook_recorder import WebhookRecorder
+from scripts.webhook_replay import load_recording, with_fresh_ids
+
+
+BODY = {"entry": [{"changes": [{"value": {
+    "messages": [{"id": "wamid.1", "from": "919876543210"}],
+    "statuses": [{"id": "wamid.2", "status": "read"}]
+}}]}]}
+
+
+@pytest.mark.asyncio
+async def test_recorded_payloads_are_written_off_the_request_path(tmp_path):
+    path = tmp_path / "recordings" / "webhooks.ndjson"
+    recorder = WebhookRecorder(str(path))
+
+    recorder.record(json.dumps(BODY).encode(), "sha256=abc")
+    recorder.record(b'{"entry": []}')
+    # Nothing touches the disk until the writer task runs
+    assert not path.exists()
+
+    await recorder.close()
+
+    assert recorder.recorded == 2
+    assert load_recording(str(path)) == [json.dumps(BODY), '{"entry": []}']
+    assert json.loads(path.read_text().splitlines()[0])["signature"] == "sha256=abc"
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_instead_of_waiting(tmp_path, monkeypatch):
+    monkeypatch.setattr(WebhookRecorder, "MAX_QUEUED", 1)
+    recorder = WebhookRecorder(str(tmp_path / "webhooks.ndjson"))
+
+    recorder.record(b"{}")
+    recorder.record(b"{}")
+    await recorder.close()
+
+    assert recorder.recorded == 1
+    assert recorder.dropped == 1
+
+
+def test_replay_rewrites_message_and_status_ids():
+    body = json.loads(with_fresh_ids(json.dumps(BODY), "3"))
+    value = body["entry"][0]["changes"][0]["value"]
+    assert value["messages"][0]["id"] == "wamid.1.3"
+    assert value["statuses"][0]["id"] == "wamid.2.3"